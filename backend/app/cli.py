@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the Football Team Selector database.
+
+Run from the backend directory:
+    python -m app.cli rebuild-stats [--db football_teams.db]
+"""
+import argparse
+import os
+from app.services.database import DEFAULT_DB_PATH, DatabaseService
+
+
+def rebuild_stats(args: argparse.Namespace):
+    """Recompute the player_stats aggregates from the raw games"""
+    database = DatabaseService(args.db)
+    try:
+        players = database.rebuild_player_stats()
+        print(f"Rebuilt stats for {players} players")
+    finally:
+        database.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Football Team Selector maintenance commands")
+    parser.add_argument("--db", default=os.environ.get("FOOTBALL_DB_PATH") or DEFAULT_DB_PATH,
+                        help="Path to the SQLite database (default FOOTBALL_DB_PATH or football_teams.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    commands.add_parser("rebuild-stats", help=rebuild_stats.__doc__).set_defaults(handler=rebuild_stats)
+    
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
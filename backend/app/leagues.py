@@ -0,0 +1,309 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+from fastapi.responses import JSONResponse
+from app.resources import Resources, _scoped
+from app.services.connection_pool import BUSY_TIMEOUT
+from app.services.database import DatabaseService
+from app.services.executor import BoundedExecutor, ExecutorSaturated
+from app.services.simulator import SimulationPool
+from app.settings import Settings
+
+
+# League names double as file names: lower-case letters, digits, '-' and '_'
+LEAGUE_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
+# Routes under this prefix are served for one league
+LEAGUE_PREFIX = "/leagues/"
+
+SUMMARY_QUERY = '''
+    SELECT (SELECT COUNT(*) FROM players), (SELECT COUNT(*) FROM games), data_version, modified_at
+    FROM meta
+'''
+
+PLAYER_QUERY = '''
+    SELECT p.attacking, p.defending, p.goalkeeping, p.energy, p.available, COALESCE(s.games, 0)
+    FROM players p LEFT JOIN player_stats s ON s.player_name = p.name
+    WHERE p.name = ?
+'''
+
+
+class LeagueNotFound(KeyError):
+    """Raised for a league that has no database"""
+
+
+class LeagueExists(ValueError):
+    """Raised when creating a league that already has a database"""
+
+
+class _OpenLeague:
+    """A league's resources and how they are being used"""
+    
+    __slots__ = ("resources", "leases", "last_used")
+    
+    def __init__(self, resources: Resources, now: float):
+        self.resources = resources
+        self.leases = 0
+        self.last_used = now
+
+
+class Leagues:
+    """
+    One SQLite database per league, with a bounded number kept open.
+    
+    Each league's players and games live in <leagues_dir>/<league>.db, so
+    names only need to be unique within a league and one league's slow
+    queries never hold another's locks or page cache. An open league has its
+    own Resources (pooled connections, roster, ratings and caches) built on
+    first use. At most max_open_leagues stay open, the least recently used
+    being closed first, and evict_idle() closes any unused for
+    league_idle_seconds. A league serving a request is leased and never
+    closed under it, so the limit can briefly be exceeded.
+    
+    Every league shares one executor and one pool of simulator processes,
+    so neither threads nor processes grow with leagues, and finding an open
+    league is one dictionary lookup however many exist.
+    """
+    
+    def __init__(self, settings: Settings, executor: BoundedExecutor,
+                 simulation_pool: Optional[SimulationPool] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            settings: Directory, cache limits and the settings each league's Resources use
+            executor: Thread pool shared by every league
+            simulation_pool: Simulator processes shared by every league; one is
+                made for them if not given, and stopped by close()
+            clock: Monotonic seconds, replaceable in tests
+        """
+        self.settings = settings
+        self.directory = settings.leagues_dir
+        self.executor = executor
+        self._owns_simulation_pool = simulation_pool is None
+        self.simulation_pool = (simulation_pool if simulation_pool is not None
+                                else SimulationPool(settings.simulator_processes))
+        self._clock = clock
+        self._open: "OrderedDict[str, _OpenLeague]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def path(self, league: str) -> str:
+        """
+        Database file of a league.
+        
+        Raises:
+            ValueError: If the name is not a valid league name
+        """
+        if not LEAGUE_NAME.fullmatch(league):
+            raise ValueError(f"Invalid league name {league!r}: use lower-case letters, digits, '-' and '_'")
+        return os.path.join(self.directory, f"{league}.db")
+    
+    def exists(self, league: str) -> bool:
+        return LEAGUE_NAME.fullmatch(league) is not None and os.path.exists(self.path(league))
+    
+    def names(self) -> List[str]:
+        """Every league with a database, in name order"""
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-3] for name in files if name.endswith(".db") and LEAGUE_NAME.fullmatch(name[:-3]))
+    
+    def create(self, league: str):
+        """
+        Create an empty database for a new league.
+        
+        Raises:
+            ValueError: If the name is not a valid league name
+            LeagueExists: If the league already has a database
+        """
+        path = self.path(league)
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            # Claim the file atomically, so two creators cannot both succeed
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise LeagueExists(f"League {league} already exists")
+        DatabaseService(path).close()
+    
+    def acquire(self, league: str) -> Resources:
+        """
+        Lease a league's resources, opening and loading the league if need be.
+        
+        Blocking: loading reads the league's players and replays its games,
+        and evicting closes other leagues' connections, so call it on the
+        executor. Every acquire must be matched by a release().
+        
+        Raises:
+            LeagueNotFound: If the league has no database
+        """
+        closing: List[Resources] = []
+        with self._lock:
+            now = self._clock()
+            entry = self._open.get(league)
+            if entry is None:
+                if not self.exists(league):
+                    raise LeagueNotFound(league)
+                settings = self.settings._replace(db_path=self.path(league))
+                entry = _OpenLeague(Resources(settings, executor=self.executor,
+                                              simulation_pool=self.simulation_pool), now)
+                entry.leases += 1
+                self._open[league] = entry
+                closing = self._evict(now)
+            else:
+                self._open.move_to_end(league)
+                entry.last_used = now
+                entry.leases += 1
+        for resources in closing:
+            resources.close()
+        try:
+            entry.resources.load()
+        except BaseException:
+            self.release(league)
+            raise
+        return entry.resources
+    
+    def release(self, league: str):
+        """End a lease taken by acquire()"""
+        with self._lock:
+            entry = self._open.get(league)
+            if entry is not None:
+                entry.leases -= 1
+                entry.last_used = self._clock()
+    
+    def open_leagues(self) -> List[str]:
+        """Leagues currently open, least recently used first"""
+        with self._lock:
+            return list(self._open)
+    
+    def open_resources(self) -> List[Resources]:
+        """Resources of the leagues currently open, least recently used first"""
+        with self._lock:
+            return [entry.resources for entry in self._open.values()]
+    
+    def evict_idle(self) -> int:
+        """
+        Close leagues left unused for longer than the idle timeout.
+        
+        Returns:
+            Number of leagues closed
+        """
+        with self._lock:
+            closing = self._evict(self._clock())
+        for resources in closing:
+            resources.close()
+        return len(closing)
+    
+    def close(self):
+        """Close every open league"""
+        with self._lock:
+            closing = [entry.resources for entry in self._open.values()]
+            self._open.clear()
+        for resources in closing:
+            resources.close()
+        if self._owns_simulation_pool:
+            self.simulation_pool.close()
+    
+    def summaries(self) -> List[Dict[str, Any]]:
+        """
+        Player and game counts and last write of every league.
+        
+        Reads each database over a short-lived read-only connection rather
+        than opening the league, so the open leagues and their caches are left
+        as they were.
+        """
+        summaries = []
+        for league in self.names():
+            row = self._read(league, SUMMARY_QUERY)
+            if row is not None:
+                players, games, version, modified_at = row
+                summaries.append({"league": league, "players": players, "games": games,
+                                  "data_version": version, "modified_at": modified_at})
+        return summaries
+    
+    def find_player(self, name: str) -> List[Dict[str, Any]]:
+        """Every league with a player of this name, with their attributes and games played"""
+        found = []
+        for league in self.names():
+            row = self._read(league, PLAYER_QUERY, (name,))
+            if row is not None:
+                attacking, defending, goalkeeping, energy, available, games = row
+                found.append({
+                    "league": league,
+                    "attributes": {"attacking": attacking, "defending": defending,
+                                   "goalkeeping": goalkeeping, "energy": energy},
+                    "available": bool(available),
+                    "games": games
+                })
+        return found
+    
+    def _read(self, league: str, query: str, parameters: tuple = ()) -> Optional[tuple]:
+        uri = f"file:{quote(os.path.abspath(self.path(league)))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT)
+        try:
+            return conn.execute(query, parameters).fetchone()
+        except sqlite3.OperationalError:
+            # Not (yet) a league database, e.g. mid-creation
+            return None
+        finally:
+            conn.close()
+    
+    def _evict(self, now: float) -> List[Resources]:
+        # Called with the lock held; oldest first, so stop at the first league worth keeping
+        closing = []
+        excess = len(self._open) - self.settings.max_open_leagues
+        for league, entry in list(self._open.items()):
+            if entry.leases:
+                continue
+            if excess <= 0 and now - entry.last_used < self.settings.league_idle_seconds:
+                break
+            del self._open[league]
+            closing.append(entry.resources)
+            excess -= 1
+        return closing
+
+
+class LeagueMiddleware:
+    """
+    ASGI middleware serving /leagues/{league}/... with the same routes as the default league.
+    
+    The league is leased, and opened if need be, on the executor for the
+    whole request, including any streamed body. Its Resources are made
+    current for the route handlers, and the prefix is stripped from the path
+    before routing. Unknown leagues get 404.
+    """
+    
+    def __init__(self, app, leagues: Leagues):
+        self.app = app
+        self.leagues = leagues
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(LEAGUE_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        
+        league, _, rest = scope["path"][len(LEAGUE_PREFIX):].partition("/")
+        try:
+            resources = await self.leagues.executor.run(self.leagues.acquire, league)
+        except LeagueNotFound:
+            await JSONResponse(status_code=404, content={"detail": f"League {league} not found"})(scope, receive, send)
+            return
+        except ExecutorSaturated:
+            # Outside the app's exception handlers, so shed load here as they would
+            await JSONResponse(status_code=503, content={"detail": "Server busy, try again shortly"},
+                               headers={"Retry-After": "1"})(scope, receive, send)
+            return
+        
+        prefix = LEAGUE_PREFIX + league
+        scope = {**scope, "path": "/" + rest, "root_path": scope.get("root_path", "") + prefix, "league": league}
+        if scope.get("raw_path"):
+            scope["raw_path"] = scope["raw_path"][len(prefix):]
+        token = _scoped.set(resources)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scoped.reset(token)
+            self.leagues.release(league)
@@ -1,36 +1,105 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
-from pydantic import BaseModel
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
+from pydantic import BaseModel, Field
+import numpy as np
 from app.models.player import Player
 from app.models.game import Team, Game, GameScore
+from app.leagues import LeagueExists, LeagueMiddleware, Leagues
+from app.resources import Resources, SyncMiddleware, scoped_resources
 from app.services.team_balancer import TeamBalancer
-from app.services.game_recorder import GameRecorder
-from app.services.database import DatabaseService
+from app.services.database import DatabaseService, DataVersion
+from app.services.events import TooManySubscribers
+from app.services.executor import ExecutorSaturated
+from app.services.response_cache import CachedResponse
+from app.services.simulator import MAX_SIMULATIONS
+from app.services import events, fast_json, metrics, profiler
+from app.services.player_import import (
+    PlayerImportError, parse_availability, parse_players, players_to_csv
+)
+from app.settings import Settings
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(
-    title="Football Team Selector",
-    description="An application for creating balanced football teams",
-    version="1.0.0"
-)
+router = APIRouter()
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# The process's database, in-memory state and caches, set by create_app
+resources: Resources
+
+# The other leagues' databases, each opened when first asked for, set by create_app
+leagues: Leagues
+
+# Sampling profiles and per-request cProfile traces, only when profiling is switched on
+profiles = profiler.ProfileStore()
+sampling_profiler = profiler.SamplingProfiler()
 
-# Initialize database service
-database = DatabaseService()
-game_recorder = GameRecorder()
+# /admin endpoints are only served when this is set, and require it in an X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("FOOTBALL_ADMIN_TOKEN")
 
 
 class BalanceTeamsRequest(BaseModel):
     """Request model for team balancing"""
     players: List[Player]
+    strategy: str = "greedy"
+    weights: Optional[Dict[str, float]] = None
+    score_source: str = "attributes"
+    repeat_penalty: float = Field(
+        default=0.0, ge=0, description="Score difference worth giving up to split recent teammates"
+    )
+
+
+class BalanceAvailableRequest(BaseModel):
+    """Request model for balancing players already stored in the database"""
+    names: Optional[List[str]] = Field(
+        default=None, description="Players to balance; everyone marked available when omitted"
+    )
+    strategy: str = "greedy"
+    weights: Optional[Dict[str, float]] = None
+    score_source: str = "attributes"
+    repeat_penalty: float = Field(
+        default=0.0, ge=0, description="Score difference worth giving up to split recent teammates"
+    )
+
+
+class TopSplitsRequest(BaseModel):
+    """Request model for listing several good splits"""
+    players: List[Player]
+    k: int = Field(default=5, ge=1, le=50, description="Number of splits to return")
+    together: List[Tuple[str, str]] = Field(default_factory=list, description="Pairs who must play together")
+    apart: List[Tuple[str, str]] = Field(default_factory=list, description="Pairs who must play against each other")
+    pinned: Dict[str, str] = Field(default_factory=dict, description="Team (Red or Yellows) by player name")
+    avoid_recent: int = Field(default=0, ge=0, le=100, description="Recent games the splits must differ from")
+    min_distance: int = Field(default=1, ge=0, description="Players who must change team from each recent game")
+    score_source: str = "attributes"
+
+
+class PartitionTeamsRequest(BaseModel):
+    """Request model for splitting players across several teams"""
+    players: List[Player]
+    num_teams: int = Field(default=2, ge=2, description="Number of teams to create, e.g. two per pitch")
+    strategy: str = "differencing"
+    score_source: str = "attributes"
+
+
+class SimulateMatchRequest(BaseModel):
+    """Request model for simulating a match between two teams"""
+    red_team: Team
+    yellow_team: Team
+    simulations: int = Field(default=20000, ge=1, le=MAX_SIMULATIONS, description="Matches to simulate")
+    seed: Optional[int] = Field(default=None, ge=0, description="Seed for reproducible results")
+
+
+class CreateLeagueRequest(BaseModel):
+    """Request model for creating a league"""
+    name: str = Field(description="Lower-case letters, digits, '-' and '_'; used in /leagues/{name}/ routes")
 
 
 class RecordGameRequest(BaseModel):
@@ -41,76 +110,617 @@ class RecordGameRequest(BaseModel):
     score: GameScore
 
 
-@app.get("/")
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    """Shed load instead of queueing without bound"""
+    return JSONResponse(status_code=503, content={"detail": "Server busy, try again shortly"},
+                        headers={"Retry-After": "1"})
+
+
+def _league() -> Resources:
+    """Resources of the league the request is for: the one in a /leagues/{league}/ path, else the default"""
+    scoped = scoped_resources()
+    return scoped if scoped is not None else resources
+
+
+def _etag(version: DataVersion, key: Hashable) -> str:
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=6).hexdigest()
+    return f'"{version.instance[:12]}-{version.version}-{digest}"'
+
+
+def _not_modified(request: Request, etag: str, modified_at: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since; weak comparison as in RFC 9110
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def _cached_read(request: Request, key: Hashable, render: Callable[[], CachedResponse]) -> Response:
+    """
+    Serve a read endpoint from pre-serialised bytes, or 304 if the client's copy is current.
+    
+    Responses only change when the data version does, so the ETag comes from
+    the version and the request alone. The version is the one the database
+    service keeps in memory, brought up to date by its own commits and, with
+    several workers, by SyncMiddleware, so a revalidation or cache hit never
+    leaves the event loop; only rendering runs on the executor.
+    """
+    league = _league()
+    version = league.database.data_version
+    etag = _etag(version, key)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(version.modified_at, usegmt=True),
+        # Let browsers keep a copy but check back on every use
+        "Cache-Control": "no-cache"
+    }
+    if _not_modified(request, etag, version.modified_at):
+        return Response(status_code=304, headers=headers)
+    
+    cached = league.response_cache.get(version[:2], key)
+    if cached is None:
+        cached = await league.executor.run(render)
+        league.response_cache.put(version[:2], key, cached)
+    content, extra_headers = cached
+    return Response(content=content, media_type="application/json", headers={**headers, **extra_headers})
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, database and balancing timings in the Prometheus text format"""
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled; start the server with FOOTBALL_METRICS=1")
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+def _require_admin(request: Request):
+    """Hide the admin endpoints unless a token is configured, and check the request carries it"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled; set FOOTBALL_ADMIN_TOKEN")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _require_profiling(request: Request):
+    """Hide the profiling endpoints unless enabled, and require the admin token"""
+    if not profiler.ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; start the server with FOOTBALL_PROFILING=1")
+    _require_admin(request)
+
+
+@router.get("/admin/profile", include_in_schema=False)
+async def sample_profile(
+    request: Request,
+    seconds: float = Query(default=5.0, gt=0, le=profiler.MAX_DURATION),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+    include_idle: bool = Query(default=False)
+):
+    """Sample every thread's stack for a while and return collapsed stacks for a flame graph"""
+    _require_profiling(request)
+    # The loop's default pool rather than the bounded executor, so the sampler
+    # neither takes a worker from the requests it is watching nor shows up as one
+    try:
+        stacks, rounds = await asyncio.get_running_loop().run_in_executor(
+            None, sampling_profiler.sample, seconds, interval_ms / 1000, include_idle)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=profiler.collapsed(stacks), media_type="text/plain",
+                    headers={"X-Profile-Samples": str(rounds)})
+
+
+@router.get("/admin/profile/requests/{profile_id}", include_in_schema=False)
+async def get_request_profile(request: Request, profile_id: str):
+    """cProfile summary of a request sent with an X-Profile header"""
+    _require_profiling(request)
+    summary = profiles.get(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No profile with id {profile_id}")
+    return Response(content=summary, media_type="text/plain")
+
+
+@router.get("/admin/leagues")
+async def list_leagues(request: Request):
+    """Player and game counts of every league, and which are open in this process"""
+    _require_admin(request)
+    summaries = await resources.executor.run(leagues.summaries)
+    return {"leagues": summaries, "open": leagues.open_leagues()}
+
+
+@router.post("/admin/leagues", status_code=201)
+async def create_league(request: Request, body: CreateLeagueRequest):
+    """Create an empty league, served under /leagues/{name}/"""
+    _require_admin(request)
+    try:
+        await resources.executor.run(leagues.create, body.name)
+    except LeagueExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": body.name}
+
+
+@router.get("/admin/leagues/players/{player_name}")
+async def find_player_in_leagues(request: Request, player_name: str):
+    """Every league with a player of this name"""
+    _require_admin(request)
+    found = await resources.executor.run(leagues.find_player, player_name)
+    return {"name": player_name, "leagues": found}
+
+
+@router.get("/")
 async def root():
     """Root endpoint"""
     return {"message": "Football Team Selector API"}
 
 
-@app.post("/players/", status_code=201)
+@router.post("/players/", status_code=201)
 async def create_player(player: Player):
     """Create a new player"""
-    database.save_player(player)
+    league = _league()
+    await league.executor.run(league.database.save_player, player)
     return player
 
 
-@app.get("/players/", response_model=List[Player])
-async def get_players():
+@router.get("/events")
+async def stream_events(request: Request):
+    """Server-Sent Events of saved players, balanced teams and recorded games, so clients need not refetch"""
+    league = _league()
+    try:
+        body = await league.events.stream(request.headers.get("last-event-id"), duration=events.STREAM_SECONDS)
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many event streams open, try again shortly",
+                            headers={"Retry-After": "5"})
+    # no-transform and X-Accel-Buffering stop proxies from holding events back
+    return StreamingResponse(body, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
+
+@router.get("/players/", response_model=List[Player])
+async def get_players(request: Request):
     """Get all players"""
-    return database.get_all_players()
+    league = _league()
+    # Stored rows were validated on the way in, so they go straight to JSON bytes
+    return await _cached_read(request, "players",
+                              lambda: (fast_json.dumps(league.database.get_all_player_records()), {}))
+
+
+@router.post("/players/bulk")
+async def import_players(request: Request):
+    """Create or replace many players from a JSON array, NDJSON or CSV body"""
+    league = _league()
+    body = await request.body()
+    try:
+        players = await league.executor.run(parse_players, body, request.headers.get("content-type"))
+    except PlayerImportError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    saved = await league.executor.run(league.database.save_players, players)
+    return {"saved": saved}
+
+
+@router.patch("/players/availability")
+async def update_availability(request: Request):
+    """Set availability for many players from a JSON array, NDJSON or CSV body"""
+    league = _league()
+    body = await request.body()
+    try:
+        availability = await league.executor.run(parse_availability, body, request.headers.get("content-type"))
+    except PlayerImportError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    missing = await league.executor.run(league.database.set_availability, availability)
+    return {"updated": len(availability) - len(missing), "missing": missing}
 
 
-@app.put("/players/{player_name}")
+# Players fetched per database round trip while exporting
+PLAYER_EXPORT_BATCH_SIZE = 1000
+
+
+@router.get("/players/export")
+async def export_players(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv")
+):
+    """Stream every player as newline-delimited JSON or CSV"""
+    league = _league()
+    
+    def batch(after: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        if format == "csv":
+            players = league.database.list_players(after, PLAYER_EXPORT_BATCH_SIZE)
+            text = players_to_csv(players, header=after is None).encode()
+            last = players[-1].name if players else None
+        else:
+            players = league.database.list_player_records(after, PLAYER_EXPORT_BATCH_SIZE)
+            text = fast_json.dumps_lines(players)
+            last = players[-1]["name"] if players else None
+        return text, last if len(players) == PLAYER_EXPORT_BATCH_SIZE else None
+    
+    async def lines() -> AsyncIterator[bytes]:
+        after = None
+        while True:
+            text, after = await league.executor.run(batch, after)
+            yield text
+            if after is None:
+                break
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(lines(), media_type=media_type)
+
+
+@router.put("/players/{player_name}")
 async def update_player(player_name: str, player: Player):
     """Update an existing player"""
+    league = _league()
     # Ensure the player name in the URL matches the player data
     if player.name != player_name:
         raise HTTPException(status_code=400, detail="Player name in URL must match player data")
     
     # Check if player exists
-    existing_player = database.get_player(player_name)
+    existing_player = await league.executor.run(league.database.get_player, player_name)
     if not existing_player:
         raise HTTPException(status_code=404, detail="Player not found")
     
     # Update the player
-    database.update_player(player)
+    await league.executor.run(league.database.update_player, player)
     return player
 
 
-@app.get("/players/{player_name}/stats")
-async def get_player_stats(player_name: str):
+@router.get("/players/{player_name}/stats")
+async def get_player_stats(request: Request, player_name: str):
     """Get performance statistics for a player"""
-    stats = game_recorder.get_player_performance_stats(player_name)
-    return stats
+    league = _league()
+    
+    def render() -> CachedResponse:
+        return json.dumps(league.game_recorder.get_player_performance_stats(player_name)).encode(), {}
+    
+    return await _cached_read(request, ("stats", player_name), render)
+
+
+@router.get("/stats/partnerships")
+async def get_partnership_stats(
+    top_k: int = Query(5, ge=1, le=100, description="Partnerships to list in each direction"),
+    min_games: int = Query(3, ge=1, description="Minimum games played together")
+):
+    """Get the strongest and weakest partnerships between teammates"""
+    league = _league()
+    return await league.executor.run(league.game_recorder.get_team_correlation_stats,
+                                     top_k=top_k, min_games=min_games)
+
+
+@router.get("/ratings/")
+async def get_ratings():
+    """Get every player's skill rating learned from recorded games"""
+    league = _league()
+    return await league.executor.run(league.game_recorder.get_ratings)
 
 
-@app.post("/teams/balance")
+@router.post("/teams/balance")
 async def balance_teams(request: BalanceTeamsRequest):
     """Balance players into two teams"""
+    return await _balance(request.players, request.strategy, request.weights, request.score_source,
+                          request.repeat_penalty)
+
+
+@router.post("/teams/balance/top")
+async def top_splits(request: TopSplitsRequest):
+    """List the most balanced different splits that satisfy the constraints"""
+    league = _league()
+    try:
+        balancer = TeamBalancer(cache=league.balance_cache, score_source=request.score_source,
+                                ratings=league.game_recorder.ratings)
+        previous = await league.executor.run(league.game_recorder.recent_lineups, request.avoid_recent)
+        splits = await league.executor.run(balancer.top_splits, request.players, request.k, request.together,
+                                           request.apart, request.pinned, previous, request.min_distance)
+        return {"splits": splits}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/teams/balance/available")
+async def balance_available_players(request: BalanceAvailableRequest):
+    """Balance stored players into two teams, by name or by their availability flag"""
+    league = _league()
+    
+    def select() -> np.ndarray:
+        # Straight from the in-memory roster; no database read
+        roster = league.roster
+        if request.names is None:
+            ids = roster.available_ids()
+        else:
+            missing = sorted({name for name in request.names if name not in roster})
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Unknown players: {', '.join(missing)}")
+            # Naming a player picks them, whatever their availability flag says
+            ids = roster.ids(list(dict.fromkeys(request.names)))
+        # Name order, as the players table lists them
+        return ids[np.argsort([roster.index.names[player_id] for player_id in ids.tolist()], kind="stable")]
+    
+    ids = await league.executor.run(select)
+    return await _balance(None, request.strategy, request.weights, request.score_source,
+                          request.repeat_penalty, ids=ids)
+
+
+async def _balance(players: Optional[List[Player]], strategy: str, weights: Optional[Dict[str, float]],
+                   score_source: str, repeat_penalty: float, ids: Optional[np.ndarray] = None) -> Dict:
+    # Balances the players given, or else the roster's players with these ids
+    league = _league()
     try:
-        balancer = TeamBalancer()
-        red_team, yellow_team = balancer.balance_teams(request.players)
-        return {
-            "red_team": red_team,
-            "yellow_team": yellow_team
-        }
+        balancer = TeamBalancer(strategy=strategy, weights=weights, cache=league.balance_cache,
+                                score_source=score_source, ratings=league.game_recorder.ratings,
+                                history=league.game_recorder.recent_pairs, repeat_penalty=repeat_penalty)
+        if strategy == "pareto":
+            if players is None:
+                front = await league.executor.run(balancer.pareto_front_roster, league.roster, ids)
+            else:
+                front = await league.executor.run(balancer.pareto_front, players)
+            result = {
+                "red_team": front[0]["red_team"],
+                "yellow_team": front[0]["yellow_team"],
+                "pareto_front": front
+            }
+        else:
+            if players is None:
+                red_team, yellow_team = await league.executor.run(balancer.balance_roster, league.roster, ids)
+            else:
+                red_team, yellow_team = await league.executor.run(balancer.balance_teams, players)
+            result = {
+                "red_team": red_team,
+                "yellow_team": yellow_team
+            }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # Names only: clients already have the players from the roster
+    league.events.publish("balance", {
+        "red_players": [player.name for player in result["red_team"].players],
+        "yellow_players": [player.name for player in result["yellow_team"].players]
+    })
+    return result
 
 
-@app.post("/games/", status_code=201)
+@router.post("/teams/partition")
+async def partition_teams(request: PartitionTeamsRequest):
+    """Balance players into any number of teams"""
+    league = _league()
+    try:
+        balancer = TeamBalancer(strategy=request.strategy, cache=league.balance_cache,
+                                score_source=request.score_source, ratings=league.game_recorder.ratings)
+        teams = await league.executor.run(balancer.partition_teams, request.players, request.num_teams)
+        return {"teams": teams}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/teams/simulate")
+async def simulate_match(request: SimulateMatchRequest):
+    """Predict win, draw and loss probabilities for two teams from their players' ratings"""
+    league = _league()
+    try:
+        return await league.executor.run(league.simulator.simulate, request.red_team, request.yellow_team,
+                                         request.simulations, request.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/games/", status_code=201)
 async def record_game(request: RecordGameRequest):
     """Record a new game"""
-    game = game_recorder.record_game(
+    league = _league()
+    game = await league.executor.run(
+        league.game_recorder.record_game,
         date=request.date,
         red_team=request.red_team,
         yellow_team=request.yellow_team,
         score=request.score
     )
+    # Same shape as the summary view of /games/
+    league.events.publish("game", {
+        "id": game.id,
+        "date": game.date,
+        "red_players": [player.name for player in game.red_team.players],
+        "yellow_players": [player.name for player in game.yellow_team.players],
+        "red_score": game.score.red_score,
+        "yellow_score": game.score.yellow_score
+    })
     return game
 
 
-@app.get("/games/", response_model=List[Game])
-async def get_game_history():
-    """Get all recorded games"""
-    return game_recorder.get_game_history() 
\ No newline at end of file
+def _encode_cursor(date: str, game_id: int) -> str:
+    """Opaque pagination cursor pointing just after a game"""
+    return base64.urlsafe_b64encode(json.dumps([date, game_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        date, game_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(date), int(game_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _game_page(database: DatabaseService, view: str, after: Optional[Tuple[str, int]], limit: int,
+               date_from: Optional[str], date_to: Optional[str], player: Optional[str]) -> List:
+    if view == "summary":
+        return database.list_game_summaries(after, limit, date_from, date_to, player)
+    return database.list_game_records(after, limit, date_from, date_to, player)
+
+
+def _cursor_of(game: Dict) -> Tuple[str, int]:
+    return game["date"], game["id"]
+
+
+def _render_game_page(database: DatabaseService, view: str, after: Optional[Tuple[str, int]], limit: int,
+                      date_from: Optional[str], date_to: Optional[str],
+                      player: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    # Runs on the executor: encoding a large page is as slow as fetching it
+    # Fetch one extra game to find out whether there is another page
+    games = _game_page(database, view, after, limit + 1, date_from, date_to, player)
+    next_cursor = None
+    if len(games) > limit:
+        games = games[:limit]
+        next_cursor = _encode_cursor(*_cursor_of(games[-1]))
+    return fast_json.dumps(games), next_cursor
+
+
+@router.get("/games/")
+async def get_game_history(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of games to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header from the previous page"),
+    date_from: Optional[str] = Query(None, description="Only games on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Only games on or before this date (YYYY-MM-DD)"),
+    player: Optional[str] = Query(None, description="Only games this player took part in"),
+    view: str = Query("full", pattern="^(full|summary)$", description="full games or names and score only")
+):
+    """Get recorded games, oldest first, one page at a time"""
+    league = _league()
+    after = _decode_cursor(cursor) if cursor else None
+    
+    def render() -> CachedResponse:
+        content, next_cursor = _render_game_page(league.database, view, after, limit,
+                                                 date_from, date_to, player)
+        return content, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    
+    return await _cached_read(request, ("games", view, after, limit, date_from, date_to, player), render)
+
+
+# Games fetched per database round trip while exporting
+EXPORT_BATCH_SIZE = 500
+
+
+@router.get("/games/export")
+async def export_games(
+    date_from: Optional[str] = Query(None, description="Only games on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Only games on or before this date (YYYY-MM-DD)"),
+    player: Optional[str] = Query(None, description="Only games this player took part in"),
+    view: str = Query("full", pattern="^(full|summary)$", description="full games or names and score only")
+):
+    """Stream every matching game as newline-delimited JSON"""
+    league = _league()
+    
+    def batch(after: Optional[Tuple[str, int]]) -> Tuple[bytes, Optional[Tuple[str, int]]]:
+        games = _game_page(league.database, view, after, EXPORT_BATCH_SIZE, date_from, date_to, player)
+        return fast_json.dumps_lines(games), _cursor_of(games[-1]) if len(games) == EXPORT_BATCH_SIZE else None
+    
+    async def lines() -> AsyncIterator[bytes]:
+        # Page through by keyset so only one batch is ever held in memory
+        after = None
+        while True:
+            text, after = await league.executor.run(batch, after)
+            yield text
+            if after is None:
+                break
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _evict_idle_leagues(application_leagues: Leagues):
+    while True:
+        await asyncio.sleep(application_leagues.settings.league_idle_seconds / 2)
+        try:
+            # Closing connections blocks
+            await application_leagues.executor.run(application_leagues.evict_idle)
+        except ExecutorSaturated:
+            pass
+
+
+# Seconds between checks for other workers' writes while clients are streaming events
+OTHER_WORKERS_POLL_SECONDS = 1.0
+
+
+async def _follow_other_workers(application_resources: Resources, application_leagues: Leagues):
+    # Event streams make no requests, so SyncMiddleware never brings their
+    # league up to date; catching up here sends their subscribers a resync
+    while True:
+        await asyncio.sleep(OTHER_WORKERS_POLL_SECONDS)
+        for league in [application_resources, *application_leagues.open_resources()]:
+            if league.events.subscribers:
+                try:
+                    await league.executor.run(league.sync)
+                except ExecutorSaturated:
+                    # Busy serving requests, which sync it anyway; try again next time
+                    pass
+
+
+@asynccontextmanager
+async def _lifespan(application: FastAPI) -> AsyncIterator[None]:
+    # Open the database and load the in-memory state in the serving process,
+    # after any fork, so the first request does not pay for it
+    await application.state.resources.executor.run(application.state.resources.load)
+    # Likewise the simulator's worker processes, which take longer to spawn than a simulation's budget
+    await application.state.resources.executor.run(application.state.resources.simulation_pool.start)
+    tasks = [asyncio.create_task(_evict_idle_leagues(application.state.leagues))]
+    if application.state.resources.settings.workers > 1:
+        tasks.append(asyncio.create_task(
+            _follow_other_workers(application.state.resources, application.state.leagues)))
+    yield
+    for task in tasks:
+        task.cancel()
+    application.state.leagues.close()
+    application.state.resources.close()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the API application.
+    
+    Nothing is opened here: the database and in-memory state are loaded by
+    the lifespan when the server starts, or on first use otherwise. The routes
+    serve from the module's resources and leagues, so there is one app per
+    process.
+    
+    Args:
+        settings: Server configuration, read from the environment by default
+    
+    Returns:
+        FastAPI application
+    """
+    global resources, leagues
+    settings = settings if settings is not None else Settings.from_env()
+    resources = Resources(settings)
+    leagues = Leagues(settings, executor=resources.executor, simulation_pool=resources.simulation_pool)
+    
+    application = FastAPI(
+        title="Football Team Selector",
+        description="An application for creating balanced football teams",
+        version="1.0.0",
+        lifespan=_lifespan
+    )
+    application.state.resources = resources
+    application.state.leagues = leagues
+    
+    # Add CORS middleware
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Paged responses point to the next page in a header the browser must be allowed to read
+        expose_headers=["X-Next-Cursor"],
+    )
+    
+    # Other workers' writes must reach this process's in-memory state
+    if settings.workers > 1:
+        application.add_middleware(SyncMiddleware, resources=resources)
+    
+    # Per-route latency and status counts, only when metrics are switched on
+    if metrics.ENABLED:
+        application.add_middleware(metrics.MetricsMiddleware)
+    
+    # Outside the two above, so they see the league's resources and the route without the prefix
+    application.add_middleware(LeagueMiddleware, leagues=leagues)
+    
+    # Per-request cProfile traces, only when profiling is switched on
+    if profiler.ENABLED:
+        application.add_middleware(profiler.ProfilingMiddleware, store=profiles, token=ADMIN_TOKEN)
+    
+    application.add_exception_handler(ExecutorSaturated, executor_saturated_handler)
+    application.include_router(router)
+    return application
+
+
+app = create_app()
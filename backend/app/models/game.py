@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Optional
 from .player import Player
 
 
@@ -46,6 +46,7 @@ class Game(BaseModel):
         }
     )
     
+    id: Optional[int] = Field(default=None, description="Game id, assigned when the game is saved")
     date: str = Field(..., description="Game date (YYYY-MM-DD format)")
     red_team: Team
     yellow_team: Team
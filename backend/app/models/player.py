@@ -29,4 +29,10 @@ class Player(BaseModel):
     
     name: str = Field(..., min_length=1, description="Player name")
     attributes: PlayerAttributes
-    available: bool = Field(default=True, description="Whether the player is available for games") 
\ No newline at end of file
+    available: bool = Field(default=True, description="Whether the player is available for games") 
+
+
+class PlayerAvailability(BaseModel):
+    """Availability update for one player"""
+    name: str = Field(..., min_length=1, description="Player name")
+    available: bool = Field(..., description="Whether the player is available for games")
\ No newline at end of file
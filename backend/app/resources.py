@@ -0,0 +1,227 @@
+import contextvars
+import threading
+from typing import NamedTuple, Optional
+from fastapi.responses import JSONResponse
+from app.models.player import Player
+from app.services.balance_cache import BalanceCache
+from app.services.database import DatabaseService
+from app.services.events import EventHub
+from app.services.executor import BoundedExecutor, ExecutorSaturated
+from app.services.game_recorder import GameRecorder
+from app.services.response_cache import ResponseCache
+from app.services.roster import Roster
+from app.services.simulator import MatchSimulator, SimulationPool
+from app.settings import Settings
+
+
+class _State(NamedTuple):
+    """In-memory state derived from the database, replaced as a whole when reloaded"""
+    roster: Roster
+    game_recorder: GameRecorder
+    simulator: MatchSimulator
+    balance_cache: BalanceCache
+    instance: str
+    version: int
+
+
+class Resources:
+    """
+    The API's long-lived objects, each process building its own on first use.
+    
+    Creating Resources opens nothing, so importing the app is cheap and has no
+    side effects. The database is opened (and created, migrated and seeded if
+    need be) and the in-memory state loaded from it the first time either is
+    needed, normally by the app's lifespan as each worker process starts.
+    
+    Player writes reach the in-memory state through DatabaseService listeners
+    and games through the GameRecorder, but only for this process. When
+    several processes share the database, sync() catches the state up on
+    writes made elsewhere: the players are read again and only the games
+    recorded since are applied. Saved players are also published to the
+    events hub, and catching up sends its subscribers a resync.
+    """
+    
+    def __init__(self, settings: Settings, executor: Optional[BoundedExecutor] = None,
+                 simulation_pool: Optional[SimulationPool] = None):
+        """
+        Args:
+            settings: Database path and process counts
+            executor: Thread pool to share with other Resources, e.g. one per league
+            simulation_pool: Simulator worker processes to share with other Resources,
+                left running by close(); without one these Resources start and stop their own
+        """
+        self.settings = settings
+        # Database calls and balancing block, so they run here rather than on the event loop
+        self.executor = executor if executor is not None else BoundedExecutor()
+        # Large simulation batches run in these processes
+        self._owns_simulation_pool = simulation_pool is None
+        self.simulation_pool = (simulation_pool if simulation_pool is not None
+                                else SimulationPool(settings.simulator_processes))
+        # Serialised read responses, reused until the next write
+        self.response_cache = ResponseCache(maxsize=128)
+        # Changes pushed to connected clients
+        self.events = EventHub()
+        self._database: Optional[DatabaseService] = None
+        self._state: Optional[_State] = None
+        self._lock = threading.RLock()
+    
+    @property
+    def database(self) -> DatabaseService:
+        database = self._database
+        if database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = DatabaseService(self.settings.db_path)
+                    self._database.add_player_listener(self._player_saved)
+                database = self._database
+        return database
+    
+    @property
+    def loaded(self) -> bool:
+        """Whether the in-memory state has been built"""
+        return self._state is not None
+    
+    @property
+    def roster(self) -> Roster:
+        """Columnar copy of the players table, kept in step with every player write"""
+        return self._current().roster
+    
+    @property
+    def game_recorder(self) -> GameRecorder:
+        return self._current().game_recorder
+    
+    @property
+    def simulator(self) -> MatchSimulator:
+        """Predicts match outcomes from the learned ratings; worker processes start on the first large batch"""
+        return self._current().simulator
+    
+    @property
+    def balance_cache(self) -> BalanceCache:
+        """Balancing results, reused while the same players stay available"""
+        return self._current().balance_cache
+    
+    def load(self):
+        """Open the database and build the in-memory state, if not done already"""
+        self._current()
+    
+    def changed(self) -> bool:
+        """
+        Check whether the database has been written to since the state was loaded or last synced.
+        
+        One primary-key read, but still a blocking database call, so run it
+        on the executor. Always False before the state is first loaded.
+        """
+        state = self._state
+        if state is None:
+            return False
+        return self.database.get_data_version()[:2] != (state.instance, state.version)
+    
+    def sync(self):
+        """
+        Bring the in-memory state up to date with writes other processes made since it was loaded or last synced.
+        
+        Cheap when nothing changed: one primary-key read, without taking the
+        lock. After another process's writes the players are read again and
+        only the games recorded since are applied; the state is rebuilt from
+        scratch only if the database itself was replaced.
+        """
+        if not self.changed():
+            return
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            version = self.database.get_data_version()
+            if version.instance != state.instance:
+                self._reload()
+                return
+            if not self.database.wrote_every_version(state.version, version.version):
+                # Replaces players in place; their cached balances may be stale, and so may
+                # any balance using ratings or recent teammates once new games are applied
+                state.roster.load(self.database.get_all_players())
+                state.game_recorder.catch_up()
+                state.balance_cache.clear()
+                # Clients only heard about this process's writes; have them refetch
+                self.events.resync()
+            # Otherwise every write since came through this process and the listeners have applied it
+            if version.version > state.version:
+                self._state = state._replace(version=version.version)
+    
+    def close(self):
+        """End event streams, stop any simulator processes of their own and close the database; the next use opens everything again"""
+        self.events.close()
+        with self._lock:
+            state, self._state = self._state, None
+            if self._owns_simulation_pool:
+                self.simulation_pool.close()
+            if self._database is not None:
+                self._database.close()
+    
+    def _current(self) -> _State:
+        state = self._state
+        if state is None:
+            with self._lock:
+                if self._state is None:
+                    self._reload()
+                state = self._state
+        return state
+    
+    def _reload(self):
+        database = self.database
+        # Read the version first: a write landing during the load then only
+        # causes one more reload rather than going unnoticed
+        version = database.get_data_version()
+        roster = Roster()
+        roster.load(database.get_all_players())
+        game_recorder = GameRecorder(database)
+        simulator = MatchSimulator(game_recorder.ratings, pool=self.simulation_pool)
+        previous, self._state = self._state, _State(
+            roster, game_recorder, simulator, BalanceCache(maxsize=256), version.instance, version.version)
+        if previous is not None:
+            # Clients only heard about this process's writes; have them refetch
+            self.events.resync()
+    
+    def _player_saved(self, player: Player):
+        state = self._state
+        if state is not None:
+            state.roster.upsert(player)
+            state.balance_cache.invalidate_player(player)
+        self.events.publish("player", player.model_dump())
+
+
+# Resources of the league the current request is for, set by LeagueMiddleware
+_scoped: contextvars.ContextVar[Optional[Resources]] = contextvars.ContextVar("scoped_resources", default=None)
+
+
+def scoped_resources() -> Optional[Resources]:
+    """Resources of the league the current request is for, or None outside league routes"""
+    return _scoped.get()
+
+
+class SyncMiddleware:
+    """
+    ASGI middleware bringing a worker's in-memory state up to date before each request.
+    
+    Only installed when several worker processes share the database. The
+    version check and any catching up run on the executor, keeping database
+    reads off the event loop. League routes sync the league's resources, so
+    it must run inside LeagueMiddleware.
+    """
+    
+    def __init__(self, app, resources: Resources):
+        self.app = app
+        self.resources = resources
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            resources = _scoped.get()
+            if resources is None:
+                resources = self.resources
+            try:
+                await resources.executor.run(resources.sync)
+            except ExecutorSaturated:
+                # Outside the app's exception handlers, so shed load here as they would
+                await JSONResponse(status_code=503, content={"detail": "Server busy, try again shortly"},
+                                   headers={"Retry-After": "1"})(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from app.models.player import Player
+
+
+class BalanceCache:
+    """LRU cache of balancing results keyed on the set of available players"""
+    
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._keys_by_player: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def snapshot(players: List[Player]) -> Tuple[Tuple, ...]:
+        """Sorted (name, attacking, defending, goalkeeping, energy) rows of the available players"""
+        return tuple(sorted(
+            (p.name, p.attributes.attacking, p.attributes.defending, p.attributes.goalkeeping, p.attributes.energy)
+            for p in players if p.available
+        ))
+    
+    @staticmethod
+    def snapshot_key(snapshot: Tuple[Tuple, ...], *params: Hashable) -> Hashable:
+        """Cache key for a snapshot that was already built, e.g. from the roster's columns"""
+        return snapshot, params
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached result, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a result, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            for snapshot in key[0]:
+                self._keys_by_player.setdefault(snapshot[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+    
+    def invalidate_player(self, player: Player):
+        """
+        Drop cached results that used different attributes for this player.
+        
+        Args:
+            player: Player as it now exists in the database
+        """
+        current = (player.name, player.attributes.attacking, player.attributes.defending,
+                   player.attributes.goalkeeping, player.attributes.energy)
+        with self._lock:
+            stale = [
+                key for key in self._keys_by_player.get(player.name, ())
+                if current not in key[0]
+            ]
+            for key in stale:
+                del self._entries[key]
+                self._forget(key)
+    
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_player.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _forget(self, key: Hashable):
+        for snapshot in key[0]:
+            keys = self._keys_by_player.get(snapshot[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_player[snapshot[0]]
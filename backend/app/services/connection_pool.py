@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# and NORMAL sync is durable in WAL mode apart from the last commits on power loss.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # 16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Compiled statements kept per connection, keyed on the SQL text
+STATEMENT_CACHE_SIZE = 256
+
+# Seconds a writer waits for the database lock before giving up
+BUSY_TIMEOUT = 5.0
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections, one per thread.
+    
+    Connections stay open for the life of the pool, so SQLite's per-connection
+    statement cache turns repeated queries into prepared-statement reuse.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # SQLite connections must not cross a fork, so a child process starts with none
+        if hasattr(os, "register_at_fork"):
+            pool = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: _forget_connections(pool()))
+    
+    def connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=BUSY_TIMEOUT,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                # Each connection is only used by its own thread; close() may run elsewhere
+                check_same_thread=False
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Use the calling thread's connection, committing on success and rolling back on error"""
+        conn = self.connection()
+        with conn:
+            yield conn
+    
+    def close(self):
+        """Close every connection opened by the pool"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        # Threads that had a connection open a fresh one on next use
+        self._local = threading.local()
+
+
+def _forget_connections(pool: "ConnectionPool"):
+    # Runs in a freshly forked child. The parent still owns the connections,
+    # so they are dropped without being closed and each thread opens its own.
+    if pool is not None:
+        pool._local = threading.local()
+        pool._connections = []
+        pool._lock = threading.Lock()
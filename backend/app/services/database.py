@@ -1,23 +1,111 @@
-import sqlite3
 import json
-from typing import List, Optional
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from app.models.player import Player, PlayerAttributes
 from app.models.game import Team, Game, GameScore
+from app.services import metrics
+from app.services.connection_pool import ConnectionPool
+
+
+# Bumped whenever a migration is added to _create_tables
+#   1 - games split into games + game_participants (was JSON blobs per team)
+#   2 - player_stats aggregates maintained on every saved game
+#   3 - meta row with the data version bumped by every write
+SCHEMA_VERSION = 3
+
+# Database file used when no path is given; the only one seeded with the default squad
+DEFAULT_DB_PATH = "football_teams.db"
+
+# Data versions of recent writes remembered per instance, see wrote_every_version
+OWN_WRITES_KEPT = 256
+
+INSERT_PARTICIPANT = '''
+    INSERT INTO game_participants
+    (game_id, player_name, team, position, attacking, defending, goalkeeping, energy, available)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPSERT_PLAYER = '''
+    INSERT OR REPLACE INTO players
+    (name, attacking, defending, goalkeeping, energy, available)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_PLAYERS = '''
+    SELECT name, attacking, defending, goalkeeping, energy, available
+    FROM players
+'''
 
+# Run in the same transaction as every write, so readers can tell whether anything changed
+BUMP_DATA_VERSION = '''
+    UPDATE meta SET data_version = data_version + 1, modified_at = ?
+    RETURNING instance, data_version, modified_at
+'''
 
+# Adds one game's result to a player's running totals
+UPSERT_PLAYER_STATS = '''
+    INSERT INTO player_stats (player_name, games, wins, losses, draws)
+    VALUES (?, 1, ?, ?, ?)
+    ON CONFLICT (player_name) DO UPDATE SET
+        games = games + 1,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        draws = draws + excluded.draws
+'''
+
+# Recomputes every player's totals from the raw games
+REBUILD_PLAYER_STATS = '''
+    INSERT INTO player_stats (player_name, games, wins, losses, draws)
+    SELECT gp.player_name,
+           COUNT(*),
+           SUM(CASE WHEN (gp.team = 'red' AND g.red_score > g.yellow_score)
+                      OR (gp.team = 'yellow' AND g.yellow_score > g.red_score) THEN 1 ELSE 0 END),
+           SUM(CASE WHEN (gp.team = 'red' AND g.red_score < g.yellow_score)
+                      OR (gp.team = 'yellow' AND g.yellow_score < g.red_score) THEN 1 ELSE 0 END),
+           SUM(CASE WHEN g.red_score = g.yellow_score THEN 1 ELSE 0 END)
+    FROM game_participants gp JOIN games g ON g.id = gp.game_id
+    GROUP BY gp.player_name
+'''
+
+
+class DataVersion(NamedTuple):
+    """Identifies the state of the data at one point in time"""
+    instance: str  # Random per database file, so a recreated database never reuses versions
+    version: int  # Bumped by every committed write
+    modified_at: float  # Unix time of the last write
+
+
+@metrics.instrument(metrics.DATABASE_CALL_SECONDS)
 class DatabaseService:
     """Service for database operations using SQLite"""
     
-    def __init__(self, db_path: str = "football_teams.db"):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
         self.db_path = db_path
+        self._pool = ConnectionPool(db_path)
+        self._player_listeners: List[Callable[[Player], None]] = []
+        # Data versions written through this instance, newest last
+        self._own_writes: deque = deque(maxlen=OWN_WRITES_KEPT)
+        # Latest data version read or committed through this instance, and the
+        # one each thread's open write transaction has bumped to
+        self._data_version: Optional[DataVersion] = None
+        self._data_version_lock = threading.Lock()
+        self._written = threading.local()
         self._create_tables()
-        if self.db_path == "football_teams.db":
+        if self.db_path == DEFAULT_DB_PATH:
             self.initialize_default_players()
+        self.get_data_version()
     
     def _create_tables(self):
-        """Create database tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        """Create database tables if they don't exist and migrate older schemas"""
+        with self._writing() as conn:
             cursor = conn.cursor()
+            # Schema changes and migrations either all apply or none do
+            cursor.execute('BEGIN')
             
             # Players table
             cursor.execute('''
@@ -31,183 +119,644 @@ class DatabaseService:
                 )
             ''')
             
+            # Move games stored as JSON blobs aside so the new schema can be created
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            migrate_blobs = version < 1 and self._has_legacy_games_table(cursor)
+            if migrate_blobs:
+                cursor.execute('ALTER TABLE games RENAME TO games_legacy')
+            
             # Games table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS games (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     date TEXT,
-                    red_team_data TEXT,
-                    yellow_team_data TEXT,
                     red_score INTEGER,
                     yellow_score INTEGER
                 )
             ''')
             
-            conn.commit()
+            # One row per player per game, with the attributes they had on the day
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS game_participants (
+                    game_id INTEGER NOT NULL REFERENCES games(id),
+                    player_name TEXT NOT NULL,
+                    team TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    attacking INTEGER,
+                    defending INTEGER,
+                    goalkeeping INTEGER,
+                    energy INTEGER,
+                    available BOOLEAN
+                )
+            ''')
+            
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_date ON games (date, id)')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_participants_game
+                ON game_participants (game_id, team, position)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_participants_player
+                ON game_participants (player_name, game_id)
+            ''')
+            
+            # Running win/loss/draw totals per player, kept in step with games
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS player_stats (
+                    player_name TEXT PRIMARY KEY,
+                    games INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # Single row identifying the current state of the data
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    instance TEXT NOT NULL,
+                    data_version INTEGER NOT NULL,
+                    modified_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('INSERT OR IGNORE INTO meta VALUES (1, ?, 0, ?)', (uuid.uuid4().hex, time.time()))
+            
+            if migrate_blobs:
+                self._migrate_game_blobs(cursor)
+            if version < 2:
+                self._rebuild_player_stats(cursor)
+            if migrate_blobs or version < 2:
+                self._bump_data_version(cursor)
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
+    @staticmethod
+    def _has_legacy_games_table(cursor) -> bool:
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(games)')]
+        return "red_team_data" in columns
+    
+    def _migrate_game_blobs(self, cursor):
+        """
+        One-shot migration of games stored as JSON blobs to the normalized schema.
+        
+        Runs inside the caller's transaction, so a failure leaves the old table intact.
+        """
+        rows = cursor.execute('''
+            SELECT id, date, red_team_data, yellow_team_data, red_score, yellow_score FROM games_legacy
+        ''').fetchall()
+        for game_id, date, red_team_data, yellow_team_data, red_score, yellow_score in rows:
+            cursor.execute('''
+                INSERT INTO games (id, date, red_score, yellow_score)
+                VALUES (?, ?, ?, ?)
+            ''', (game_id, date, red_score, yellow_score))
+            participants = []
+            for team, team_data in (("red", red_team_data), ("yellow", yellow_team_data)):
+                for position, player_data in enumerate(json.loads(team_data or "[]")):
+                    attributes = player_data["attributes"]
+                    participants.append((
+                        game_id, player_data["name"], team, position,
+                        attributes["attacking"], attributes["defending"],
+                        attributes["goalkeeping"], attributes["energy"],
+                        player_data.get("available", True)
+                    ))
+            cursor.executemany(INSERT_PARTICIPANT, participants)
+        
+        cursor.execute('DROP TABLE games_legacy')
+        print(f"Migrated {len(rows)} games to the game_participants schema")
+    
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.close()
+    
+    def get_data_version(self) -> DataVersion:
+        """
+        Get the current data version.
+        
+        A single-row primary-key read that in WAL mode never waits for a
+        writer. Also brings data_version up to date with writes made by
+        other processes.
+        """
+        conn = self._pool.connection()
+        version = DataVersion(*conn.execute('SELECT instance, data_version, modified_at FROM meta').fetchone())
+        self._advance_data_version(version)
+        return version
+    
+    @property
+    def data_version(self) -> DataVersion:
+        """
+        The latest data version this instance has read or committed, without touching the database.
+        
+        Current as long as every write goes through this instance; writes by
+        other processes only show up here once get_data_version() has read them.
+        """
+        return self._data_version
+    
+    @contextmanager
+    def _writing(self) -> Iterator[sqlite3.Connection]:
+        """The pool's transaction, making the data version it bumped to current once it has committed"""
+        self._written.version = None
+        with self._pool.transaction() as conn:
+            yield conn
+        version, self._written.version = self._written.version, None
+        if version is not None:
+            self._advance_data_version(version)
+    
+    def _bump_data_version(self, cursor):
+        version = DataVersion(*cursor.execute(BUMP_DATA_VERSION, (time.time(),)).fetchone())
+        self._own_writes.append(version.version)
+        # Published by _writing after the commit: a reader keying a response on
+        # it must never read the data from before the write
+        self._written.version = version
+    
+    def _advance_data_version(self, version: DataVersion):
+        with self._data_version_lock:
+            current = self._data_version
+            if current is None or current.instance != version.instance or current.version < version.version:
+                self._data_version = version
+    
+    def wrote_every_version(self, since: int, until: int) -> bool:
+        """
+        Check whether every write after one data version, up to another, was made through this instance.
+        
+        Another process sharing the database file makes writes this instance
+        never sees, so in-memory state kept in step by the listeners is only
+        current if this returns True.
+        
+        Args:
+            since: Data version the state was last known to match
+            until: Current data version
+        """
+        own = set(self._own_writes)
+        return all(version in own for version in range(since + 1, until + 1))
+    
+    def add_player_listener(self, listener: Callable[[Player], None]):
+        """Register a callback invoked with each player after it is saved"""
+        self._player_listeners.append(listener)
+    
+    def _notify_player_saved(self, player: Player):
+        for listener in self._player_listeners:
+            listener(player)
     
     def save_player(self, player: Player):
         """Save a player to the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO players 
-                (name, attacking, defending, goalkeeping, energy, available)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                player.name,
-                player.attributes.attacking,
-                player.attributes.defending,
-                player.attributes.goalkeeping,
-                player.attributes.energy,
-                player.available
-            ))
-            conn.commit()
+        with self._writing() as conn:
+            conn.execute(UPSERT_PLAYER, self._player_row(player))
+            self._bump_data_version(conn)
+        self._notify_player_saved(player)
+    
+    def save_players(self, players: List[Player]) -> int:
+        """
+        Save many players in a single transaction.
+        
+        Existing players with the same name are replaced. Either every player
+        is saved or, on error, none are.
+        
+        Returns:
+            Number of players saved
+        """
+        with self._writing() as conn:
+            conn.executemany(UPSERT_PLAYER, [self._player_row(player) for player in players])
+            self._bump_data_version(conn)
+        for player in players:
+            self._notify_player_saved(player)
+        return len(players)
+    
+    def set_availability(self, availability: Dict[str, bool]) -> List[str]:
+        """
+        Set whether each named player is available, in a single transaction.
+        
+        Args:
+            availability: Availability keyed by player name
+        
+        Returns:
+            Names that did not match a player and were skipped
+        """
+        with self._writing() as conn:
+            # Stage the batch so the update and the read-back are one statement each
+            conn.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS availability_updates
+                (name TEXT PRIMARY KEY, available BOOLEAN NOT NULL)
+            ''')
+            conn.executemany('INSERT OR REPLACE INTO availability_updates VALUES (?, ?)', availability.items())
+            conn.execute('''
+                UPDATE players SET available = (
+                    SELECT u.available FROM availability_updates u WHERE u.name = players.name
+                )
+                WHERE name IN (SELECT name FROM availability_updates)
+            ''')
+            updated = conn.execute('''
+                SELECT p.name, p.attacking, p.defending, p.goalkeeping, p.energy, p.available
+                FROM players p JOIN availability_updates u ON u.name = p.name
+            ''').fetchall()
+            conn.execute('DELETE FROM availability_updates')
+            self._bump_data_version(conn)
+        players = [self._player_from_row(row) for row in updated]
+        for player in players:
+            self._notify_player_saved(player)
+        found = {player.name for player in players}
+        return [name for name in availability if name not in found]
+    
+    def list_players(self, after: Optional[str] = None, limit: int = 1000) -> List[Player]:
+        """
+        Get one page of players in name order.
+        
+        Args:
+            after: Name of the last player on the previous page, or None for the first page
+            limit: Maximum number of players to return
+        """
+        with self._pool.transaction() as conn:
+            rows = conn.execute(
+                SELECT_PLAYERS + ' WHERE name > ? ORDER BY name LIMIT ?', (after or "", limit)
+            ).fetchall()
+        return [self._player_from_row(row) for row in rows]
+    
+    def list_player_records(self, after: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Get one page of players as plain dictionaries, in the same shape as Player.
+        
+        Takes the same arguments as list_players. Rows are trusted, so they are
+        not validated again; use this when the players only need encoding.
+        """
+        with self._pool.transaction() as conn:
+            rows = conn.execute(
+                SELECT_PLAYERS + ' WHERE name > ? ORDER BY name LIMIT ?', (after or "", limit)
+            ).fetchall()
+        return [self._player_record(*row) for row in rows]
+    
+    @staticmethod
+    def _player_row(player: Player) -> tuple:
+        return (
+            player.name,
+            player.attributes.attacking,
+            player.attributes.defending,
+            player.attributes.goalkeeping,
+            player.attributes.energy,
+            player.available
+        )
+    
+    @staticmethod
+    def _player_from_row(row: tuple) -> Player:
+        # Rows were validated on the way in, so skip validating them again
+        return Player.model_construct(
+            name=row[0],
+            attributes=PlayerAttributes.model_construct(
+                attacking=row[1],
+                defending=row[2],
+                goalkeeping=row[3],
+                energy=row[4]
+            ),
+            # Handle case where available column might be None (backward compatibility)
+            available=bool(row[5]) if row[5] is not None else True
+        )
+    
+    @staticmethod
+    def _player_record(name, attacking, defending, goalkeeping, energy, available) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "attributes": {
+                "attacking": attacking,
+                "defending": defending,
+                "goalkeeping": goalkeeping,
+                "energy": energy
+            },
+            "available": bool(available) if available is not None else True
+        }
     
     def get_player(self, name: str) -> Optional[Player]:
         """Get a player by name"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT name, attacking, defending, goalkeeping, energy, available
-                FROM players WHERE name = ?
-            ''', (name,))
-            
-            row = cursor.fetchone()
-            if row:
-                # Handle case where available column might be None (backward compatibility)
-                available = bool(row[5]) if row[5] is not None else True
-                return Player(
-                    name=row[0],
-                    attributes=PlayerAttributes(
-                        attacking=row[1],
-                        defending=row[2],
-                        goalkeeping=row[3],
-                        energy=row[4]
-                    ),
-                    available=available
-                )
-            return None
+        with self._pool.transaction() as conn:
+            row = conn.execute(SELECT_PLAYERS + ' WHERE name = ?', (name,)).fetchone()
+        return self._player_from_row(row) if row else None
     
     def get_all_players(self) -> List[Player]:
         """Get all players from the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT name, attacking, defending, goalkeeping, energy, available
-                FROM players
-            ''')
-            
-            players = []
-            for row in cursor.fetchall():
-                # Handle case where available column might be None (backward compatibility)
-                available = bool(row[5]) if row[5] is not None else True
-                player = Player(
-                    name=row[0],
-                    attributes=PlayerAttributes(
-                        attacking=row[1],
-                        defending=row[2],
-                        goalkeeping=row[3],
-                        energy=row[4]
-                    ),
-                    available=available
-                )
-                players.append(player)
-            
-            return players
+        with self._pool.transaction() as conn:
+            rows = conn.execute(SELECT_PLAYERS).fetchall()
+        return [self._player_from_row(row) for row in rows]
+    
+    def get_all_player_records(self) -> List[Dict[str, Any]]:
+        """Get all players as plain dictionaries, in the same shape as Player"""
+        with self._pool.transaction() as conn:
+            rows = conn.execute(SELECT_PLAYERS).fetchall()
+        return [self._player_record(*row) for row in rows]
     
     def update_player(self, player: Player):
         """Update an existing player"""
         self.save_player(player)  # INSERT OR REPLACE handles updates
     
-    def save_game(self, game: Game):
-        """Save a game to the database"""
-        with sqlite3.connect(self.db_path) as conn:
+    def save_game(self, game: Game) -> int:
+        """
+        Save a game and its participants to the database.
+        
+        Each participant's player_stats totals are updated in the same transaction.
+        
+        Returns:
+            Id of the saved game
+        """
+        with self._writing() as conn:
             cursor = conn.cursor()
-            
-            # Serialize team data as JSON
-            red_team_data = json.dumps([{
-                "name": p.name,
-                "attributes": {
-                    "attacking": p.attributes.attacking,
-                    "defending": p.attributes.defending,
-                    "goalkeeping": p.attributes.goalkeeping,
-                    "energy": p.attributes.energy
-                },
-                "available": p.available
-            } for p in game.red_team.players])
-            
-            yellow_team_data = json.dumps([{
-                "name": p.name,
-                "attributes": {
-                    "attacking": p.attributes.attacking,
-                    "defending": p.attributes.defending,
-                    "goalkeeping": p.attributes.goalkeeping,
-                    "energy": p.attributes.energy
-                },
-                "available": p.available
-            } for p in game.yellow_team.players])
-            
             cursor.execute('''
-                INSERT INTO games (date, red_team_data, yellow_team_data, red_score, yellow_score)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO games (date, red_score, yellow_score)
+                VALUES (?, ?, ?)
             ''', (
                 game.date,
-                red_team_data,
-                yellow_team_data,
                 game.score.red_score,
                 game.score.yellow_score
             ))
+            game_id = cursor.lastrowid
+            
+            participants = []
+            for team, players in (("red", game.red_team.players), ("yellow", game.yellow_team.players)):
+                for position, p in enumerate(players):
+                    participants.append((
+                        game_id, p.name, team, position,
+                        p.attributes.attacking, p.attributes.defending,
+                        p.attributes.goalkeeping, p.attributes.energy,
+                        p.available
+                    ))
+            cursor.executemany(INSERT_PARTICIPANT, participants)
+            
+            red_result = (game.score.red_score > game.score.yellow_score,
+                          game.score.red_score < game.score.yellow_score,
+                          game.score.red_score == game.score.yellow_score)
+            yellow_result = (red_result[1], red_result[0], red_result[2])
+            cursor.executemany(UPSERT_PLAYER_STATS, [
+                (name, *(red_result if team == "red" else yellow_result))
+                for _, name, team, *_ in participants
+            ])
+            self._bump_data_version(cursor)
             conn.commit()
+            return game_id
     
     def get_all_games(self) -> List[Game]:
         """Get all games from the database"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._pool.transaction() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT date, red_team_data, yellow_team_data, red_score, yellow_score
-                FROM games ORDER BY date
+                SELECT id, date, red_score, yellow_score
+                FROM games ORDER BY date, id
             ''')
+            game_rows = cursor.fetchall()
             
-            games = []
-            for row in cursor.fetchall():
-                # Deserialize team data
-                red_team_players = []
-                for player_data in json.loads(row[1]):
-                    player = Player(
-                        name=player_data["name"],
-                        attributes=PlayerAttributes(
-                            attacking=player_data["attributes"]["attacking"],
-                            defending=player_data["attributes"]["defending"],
-                            goalkeeping=player_data["attributes"]["goalkeeping"],
-                            energy=player_data["attributes"]["energy"]
-                        ),
-                        available=player_data["available"]
-                    )
-                    red_team_players.append(player)
-                
-                yellow_team_players = []
-                for player_data in json.loads(row[2]):
-                    player = Player(
-                        name=player_data["name"],
-                        attributes=PlayerAttributes(
-                            attacking=player_data["attributes"]["attacking"],
-                            defending=player_data["attributes"]["defending"],
-                            goalkeeping=player_data["attributes"]["goalkeeping"],
-                            energy=player_data["attributes"]["energy"]
-                        ),
-                        available=player_data["available"]
-                    )
-                    yellow_team_players.append(player)
-                
-                game = Game(
-                    date=row[0],
-                    red_team=Team(name="Red", players=red_team_players),
-                    yellow_team=Team(name="Yellows", players=yellow_team_players),
-                    score=GameScore(red_score=row[3], yellow_score=row[4])
-                )
-                games.append(game)
+            cursor.execute('''
+                SELECT game_id, team, player_name, attacking, defending, goalkeeping, energy, available
+                FROM game_participants ORDER BY game_id, team, position
+            ''')
+            participant_rows = cursor.fetchall()
+            
+            return self._build_games(game_rows, participant_rows)
+    
+    def get_player_games(self, name: str) -> List[Game]:
+        """Get the games a player took part in, using the participant index"""
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT g.id, g.date, g.red_score, g.yellow_score
+                FROM games g
+                WHERE g.id IN (SELECT game_id FROM game_participants WHERE player_name = ?)
+                ORDER BY g.date, g.id
+            ''', (name,))
+            game_rows = cursor.fetchall()
             
-            return games
+            cursor.execute('''
+                SELECT gp.game_id, gp.team, gp.player_name, gp.attacking, gp.defending,
+                       gp.goalkeeping, gp.energy, gp.available
+                FROM game_participants gp
+                WHERE gp.game_id IN (SELECT game_id FROM game_participants WHERE player_name = ?)
+                ORDER BY gp.game_id, gp.team, gp.position
+            ''', (name,))
+            participant_rows = cursor.fetchall()
+            
+            return self._build_games(game_rows, participant_rows)
+    
+    def list_games(self, after: Optional[Tuple[str, int]] = None, limit: int = 100,
+                   date_from: Optional[str] = None, date_to: Optional[str] = None,
+                   player: Optional[str] = None) -> List[Game]:
+        """
+        Get one page of games in (date, id) order.
+        
+        Args:
+            after: (date, id) of the last game on the previous page
+            limit: Maximum number of games to return
+            date_from: Only games on or after this date (YYYY-MM-DD)
+            date_to: Only games on or before this date (YYYY-MM-DD)
+            player: Only games this player took part in
+        
+        Returns:
+            List of games
+        """
+        with self._pool.transaction() as conn:
+            return self._build_games(*self._query_full_game_page(conn, after, limit, date_from, date_to, player))
+    
+    def list_game_records(self, after: Optional[Tuple[str, int]] = None, limit: int = 100,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          player: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get one page of games as plain dictionaries, in the same shape as Game.
+        
+        Takes the same arguments as list_games. Rows are trusted, so they are
+        not validated again; use this when the games only need encoding.
+        """
+        with self._pool.transaction() as conn:
+            game_rows, participant_rows = self._query_full_game_page(conn, after, limit, date_from, date_to, player)
+        
+        teams = {}
+        for game_id, team, *player_row in participant_rows:
+            teams.setdefault((game_id, team), []).append(self._player_record(*player_row))
+        return [
+            {
+                "id": game_id,
+                "date": date,
+                "red_team": {"name": "Red", "players": teams.get((game_id, "red"), [])},
+                "yellow_team": {"name": "Yellows", "players": teams.get((game_id, "yellow"), [])},
+                "score": {"red_score": red_score, "yellow_score": yellow_score}
+            }
+            for game_id, date, red_score, yellow_score in game_rows
+        ]
+    
+    def list_game_summaries(self, after: Optional[Tuple[str, int]] = None, limit: int = 100,
+                            date_from: Optional[str] = None, date_to: Optional[str] = None,
+                            player: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get one page of games with player names and score only.
+        
+        Takes the same arguments as list_games.
+        
+        Returns:
+            List of dictionaries with id, date, red_players, yellow_players, red_score and yellow_score
+        """
+        with self._pool.transaction() as conn:
+            game_rows = self._query_game_page(conn, after, limit, date_from, date_to, player)
+            return self._query_summaries(conn, game_rows)
+    
+    def get_recent_game_summaries(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get the most recent games with player names and score only, newest first.
+        
+        Returns:
+            List of dictionaries shaped like those from list_game_summaries
+        """
+        with self._pool.transaction() as conn:
+            game_rows = conn.execute('''
+                SELECT id, date, red_score, yellow_score
+                FROM games ORDER BY date DESC, id DESC LIMIT ?
+            ''', (limit,)).fetchall()
+            return self._query_summaries(conn, game_rows)
+    
+    def get_game_summaries_since(self, game_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Get games recorded after another, in the order they were recorded.
+        
+        Games are only ever added, and ids are handed out as they commit, so
+        a process that has seen every game up to game_id can catch up on the
+        rest without reading the history again.
+        
+        Args:
+            game_id: Id of the last game already seen, or 0 for none
+            limit: Maximum number of games to return
+        
+        Returns:
+            List of dictionaries shaped like those from list_game_summaries, oldest id first
+        """
+        with self._pool.transaction() as conn:
+            game_rows = conn.execute('''
+                SELECT id, date, red_score, yellow_score
+                FROM games WHERE id > ? ORDER BY id LIMIT ?
+            ''', (game_id, limit)).fetchall()
+            return self._query_summaries(conn, game_rows)
+    
+    @staticmethod
+    def _query_summaries(conn, game_rows) -> List[Dict[str, Any]]:
+        participant_rows = conn.execute(f'''
+            SELECT game_id, team, player_name
+            FROM game_participants WHERE game_id IN ({", ".join("?" * len(game_rows))})
+            ORDER BY game_id, team, position
+        ''', [row[0] for row in game_rows]).fetchall()
+        
+        names = {}
+        for game_id, team, name in participant_rows:
+            names.setdefault((game_id, team), []).append(name)
+        return [
+            {
+                "id": game_id,
+                "date": date,
+                "red_players": names.get((game_id, "red"), []),
+                "yellow_players": names.get((game_id, "yellow"), []),
+                "red_score": red_score,
+                "yellow_score": yellow_score
+            }
+            for game_id, date, red_score, yellow_score in game_rows
+        ]
+    
+    def iter_game_summaries(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over every game summary in (date, id) order, one page at a time.
+        
+        Takes the same filters as list_game_summaries; only one page is held in memory.
+        """
+        after = None
+        while True:
+            page = self.list_game_summaries(after=after, limit=batch_size, **filters)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after = (page[-1]["date"], page[-1]["id"])
+    
+    @classmethod
+    def _query_full_game_page(cls, conn, after, limit, date_from, date_to, player) -> Tuple[List[tuple], List[tuple]]:
+        """Select one page of game rows and every participant row for those games"""
+        game_rows = cls._query_game_page(conn, after, limit, date_from, date_to, player)
+        participant_rows = conn.execute(f'''
+            SELECT game_id, team, player_name, attacking, defending, goalkeeping, energy, available
+            FROM game_participants WHERE game_id IN ({", ".join("?" * len(game_rows))})
+            ORDER BY game_id, team, position
+        ''', [row[0] for row in game_rows]).fetchall()
+        return game_rows, participant_rows
+    
+    @staticmethod
+    def _query_game_page(conn, after, limit, date_from, date_to, player) -> List[tuple]:
+        """Select one page of game rows using the (date, id) index"""
+        conditions = []
+        params: List[Any] = []
+        if after is not None:
+            conditions.append('(date, id) > (?, ?)')
+            params.extend(after)
+        if date_from is not None:
+            conditions.append('date >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('date <= ?')
+            params.append(date_to)
+        if player is not None:
+            conditions.append('id IN (SELECT game_id FROM game_participants WHERE player_name = ?)')
+            params.append(player)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        params.append(limit)
+        return conn.execute(f'''
+            SELECT id, date, red_score, yellow_score
+            FROM games {where}
+            ORDER BY date, id LIMIT ?
+        ''', params).fetchall()
+    
+    def get_player_stats(self, name: str) -> Dict[str, Any]:
+        """
+        Get a player's aggregate results with a single primary-key lookup.
+        
+        Returns:
+            Dictionary with total_games, wins, losses, draws and win_rate
+        """
+        with self._pool.transaction() as conn:
+            row = conn.execute('''
+                SELECT games, wins, losses, draws FROM player_stats WHERE player_name = ?
+            ''', (name,)).fetchone()
+        total_games, wins, losses, draws = row or (0, 0, 0, 0)
+        return {
+            "total_games": total_games,
+            "wins": wins,
+            "losses": losses,
+            "draws": draws,
+            "win_rate": wins / total_games if total_games > 0 else 0.0
+        }
+    
+    def rebuild_player_stats(self) -> int:
+        """
+        Recompute every player's aggregate results from the raw games.
+        
+        Returns:
+            Number of players with stats
+        """
+        with self._writing() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN')
+            self._rebuild_player_stats(cursor)
+            self._bump_data_version(cursor)
+            return cursor.execute('SELECT COUNT(*) FROM player_stats').fetchone()[0]
+    
+    @staticmethod
+    def _rebuild_player_stats(cursor):
+        cursor.execute('DELETE FROM player_stats')
+        cursor.execute(REBUILD_PLAYER_STATS)
+    
+    @classmethod
+    def _build_games(cls, game_rows, participant_rows) -> List[Game]:
+        """Assemble games from game rows and their participant rows, without re-validating them"""
+        teams = {}
+        for game_id, team, *player_row in participant_rows:
+            teams.setdefault((game_id, team), []).append(cls._player_from_row(player_row))
+        
+        games = []
+        for game_id, date, red_score, yellow_score in game_rows:
+            game = Game.model_construct(
+                id=game_id,
+                date=date,
+                red_team=Team.model_construct(name="Red", players=teams.get((game_id, "red"), [])),
+                yellow_team=Team.model_construct(name="Yellows", players=teams.get((game_id, "yellow"), [])),
+                score=GameScore.model_construct(red_score=red_score, yellow_score=yellow_score)
+            )
+            games.append(game)
+        
+        return games
     
     def initialize_default_players(self):
         """Initialize the database with default players with their current attribute values"""
@@ -237,7 +786,7 @@ class DatabaseService:
             ("Ringer5", {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5})
         ]
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._writing() as conn:
             cursor = conn.cursor()
             
             # Check if players table is empty
@@ -259,6 +808,7 @@ class DatabaseService:
                         True
                     ))
                 
+                self._bump_data_version(cursor)
                 conn.commit()
                 print(f"Initialized database with {len(default_players)} default players")
             else:
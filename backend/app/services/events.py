@@ -0,0 +1,289 @@
+import asyncio
+import threading
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Deque, List, NamedTuple, Optional, Set
+from app.services import fast_json
+
+
+# Events kept for clients that reconnect with Last-Event-ID
+HISTORY_SIZE = 256
+
+# Events a subscriber may fall behind by before its backlog is dropped for one resync
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Open streams per hub; more get 503 rather than slowing everyone's fan-out
+MAX_SUBSCRIBERS = 1024
+
+# Seconds between comments keeping idle connections (and proxies) open
+KEEPALIVE_SECONDS = 15.0
+
+# Seconds a stream stays open before the client is left to reconnect, so
+# shutdowns and load balancers are not held up by connections that never end
+STREAM_SECONDS = 300.0
+
+# Milliseconds EventSource waits before reconnecting
+RETRY_MILLISECONDS = 2000
+
+# Sent instead of events a subscriber missed: refetch whatever it shows
+RESYNC = "resync"
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+class Event(NamedTuple):
+    """A published change, already encoded as one Server-Sent Events frame"""
+    id: int
+    type: str
+    frame: bytes
+
+
+class TooManySubscribers(RuntimeError):
+    """Raised when subscribing to a hub that already has MAX_SUBSCRIBERS streams"""
+
+
+class Subscription:
+    """
+    One client's queue of events, filled on the event loop by EventHub.
+    
+    The queue is bounded: a subscriber that falls SUBSCRIBER_QUEUE_SIZE events
+    behind, typically because its connection cannot keep up, loses its
+    backlog and is sent a single resync event instead, so a slow phone never
+    holds up the others or grows the server's memory.
+    """
+    
+    def __init__(self, hub: "EventHub", last_id: int, backlog: List[Event], maxsize: int):
+        self.hub = hub
+        self.last_id = last_id
+        self.lagged = False
+        self.closed = False
+        self._maxsize = maxsize
+        self._frames: Deque[bytes] = deque()
+        self._wakeup = asyncio.Event()
+        for event in backlog:
+            self._deliver(event)
+    
+    def _deliver(self, event: Event):
+        # Events published before subscribing may still be on their way through the loop
+        if event.id <= self.last_id:
+            return
+        self.last_id = event.id
+        if not self.lagged:
+            if len(self._frames) >= self._maxsize:
+                self._frames.clear()
+                self.lagged = True
+            else:
+                self._frames.append(event.frame)
+        self._wakeup.set()
+    
+    def _close(self):
+        self.closed = True
+        self._wakeup.set()
+    
+    def resync(self):
+        """Drop any queued events and send a resync event next"""
+        self._frames.clear()
+        self.lagged = True
+        self._wakeup.set()
+    
+    async def next_frames(self, timeout: float) -> Optional[bytes]:
+        """
+        Wait for events and take every one queued.
+        
+        Args:
+            timeout: Seconds to wait for an event
+        
+        Returns:
+            The queued frames as one chunk, a resync frame if events were
+            dropped, b"" if none arrived in time, or None once the hub is closed
+        """
+        if not self._frames and not self.lagged and not self.closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return b""
+        self._wakeup.clear()
+        if self.closed:
+            return None
+        if self.lagged:
+            self.lagged = False
+            self._frames.clear()
+            return self.hub.encode(self.last_id, RESYNC, {})
+        frames = b"".join(self._frames)
+        self._frames.clear()
+        return frames
+
+
+class EventHub:
+    """
+    In-process publish/subscribe of small change events, one hub per league.
+    
+    publish() may be called from any thread, such as the executor threads
+    writing to the database. Each event is encoded once and handed to the
+    event loop, which appends the same bytes to every subscriber's queue, so
+    a change costs one encoding however many clients are listening.
+    
+    Event ids are "<hub>:<n>". The last HISTORY_SIZE events are kept so that a
+    client reconnecting with Last-Event-ID gets what it missed; a client
+    coming back to another hub (a restarted server, another worker) or from
+    too long ago gets a resync event instead.
+    """
+    
+    def __init__(self, history_size: int = HISTORY_SIZE, queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+                 max_subscribers: int = MAX_SUBSCRIBERS):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._last_id = 0
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def subscribers(self) -> int:
+        """Number of open subscriptions"""
+        return len(self._subscribers)
+    
+    @property
+    def last_event_id(self) -> str:
+        """Id of the latest event, as sent to clients"""
+        return f"{self.epoch}:{self._last_id}"
+    
+    def encode(self, event_id: int, event_type: str, data: Any) -> bytes:
+        """Encode an event as a Server-Sent Events frame"""
+        return b"id: %s:%d\nevent: %s\ndata: %s\n\n" % (
+            self.epoch.encode(), event_id, event_type.encode(), fast_json.dumps(data))
+    
+    def publish(self, event_type: str, data: Any) -> int:
+        """
+        Send an event to every subscriber.
+        
+        Args:
+            event_type: Event name, e.g. "player"
+            data: JSON-serialisable payload
+        
+        Returns:
+            Id number of the event
+        """
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, self.encode(self._last_id, event_type, data))
+            self._history.append(event)
+            if self._subscribers and self._loop is not None:
+                # Scheduled under the lock so subscribers see events in id order
+                try:
+                    self._loop.call_soon_threadsafe(self._fan_out, event)
+                except RuntimeError:
+                    # The loop has been closed, and its subscribers with it
+                    self._loop = None
+            return event.id
+    
+    def resync(self):
+        """Tell every subscriber to refetch, e.g. after the state was reloaded from another process's writes"""
+        with self._lock:
+            if self._subscribers and self._loop is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._resync_all)
+                except RuntimeError:
+                    self._loop = None
+    
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Start receiving events; must be called on the event loop.
+        
+        Args:
+            last_event_id: Id of the last event the client received, to replay any it missed
+        
+        Raises:
+            TooManySubscribers: If the hub already has max_subscribers subscriptions
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"{len(self._subscribers)} event streams already open")
+            self._loop = asyncio.get_running_loop()
+            missed = self._missed(last_event_id)
+            if missed is None:
+                subscription = Subscription(self, self._last_id, [], self.queue_size)
+                subscription.resync()
+            else:
+                subscription = Subscription(self, self._last_id - len(missed), missed, self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+    
+    def close(self):
+        """End every subscription"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+            loop = self._loop
+        for subscription in subscribers:
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(subscription._close)
+    
+    async def stream(self, last_event_id: Optional[str] = None, duration: Optional[float] = None,
+                     keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[bytes]:
+        """
+        Server-Sent Events body: a retry hint, then events as they are published.
+        
+        Sending awaits the client's connection, so a slow client stops taking
+        events from its queue until it catches up or overflows into a resync.
+        
+        Args:
+            last_event_id: Last-Event-ID header of a reconnecting client
+            duration: Seconds after which to end the stream, the client reconnecting on its own
+            keepalive: Seconds of silence after which a comment is sent
+        
+        Raises:
+            TooManySubscribers: If the hub is full, before anything is sent
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers(f"{len(self._subscribers)} event streams already open")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration is not None else None
+        
+        async def frames() -> AsyncIterator[bytes]:
+            # Subscribed once the response starts, so an abandoned body never holds a subscription
+            subscription = self.subscribe(last_event_id)
+            try:
+                yield b"retry: %d\n\n" % RETRY_MILLISECONDS
+                while True:
+                    timeout = keepalive
+                    if deadline is not None:
+                        timeout = min(timeout, deadline - loop.time())
+                        if timeout <= 0:
+                            return
+                    chunk = await subscription.next_frames(timeout)
+                    if chunk is None:
+                        return
+                    yield chunk if chunk else KEEPALIVE_FRAME
+            finally:
+                self.unsubscribe(subscription)
+        
+        return frames()
+    
+    def _missed(self, last_event_id: Optional[str]) -> Optional[List[Event]]:
+        # Events after the client's last one, or None if they can no longer be replayed
+        if not last_event_id:
+            return []
+        epoch, _, number = last_event_id.partition(":")
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        last = int(number)
+        if last >= self._last_id:
+            return []
+        oldest = self._history[0].id if self._history else self._last_id + 1
+        if last + 1 < oldest:
+            return None
+        return [event for event in self._history if event.id > last]
+    
+    def _fan_out(self, event: Event):
+        for subscription in list(self._subscribers):
+            subscription._deliver(event)
+    
+    def _resync_all(self):
+        for subscription in list(self._subscribers):
+            subscription.resync()
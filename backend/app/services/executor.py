@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from app.services import profiler
+
+
+# Threads running blocking calls. SQLite serialises writers anyway, so a few
+# threads are enough to keep readers from queueing behind a slow query.
+DEFAULT_WORKERS = 8
+
+# Calls allowed to wait for a free thread before new ones are turned away
+DEFAULT_QUEUE_DEPTH = 64
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the executor's queue is full and a call is refused"""
+
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking calls made from async handlers.
+    
+    Database access and CPU-heavy balancing run here instead of on the event
+    loop, so one slow call only holds up its own request. The number of calls
+    running or waiting is capped; past that, calls fail fast with
+    ExecutorSaturated rather than building an unbounded backlog.
+    """
+    
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_QUEUE_DEPTH):
+        if max_workers < 1:
+            raise ValueError(f"Expected at least 1 worker, got {max_workers}")
+        if max_queue < 0:
+            raise ValueError(f"Queue depth cannot be negative, got {max_queue}")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+        self._lock = threading.Lock()
+    
+    @property
+    def pending(self) -> int:
+        """Calls currently running or waiting for a thread"""
+        return self._pending
+    
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking function on the pool and wait for its result.
+        
+        Raises:
+            ExecutorSaturated: If max_workers + max_queue calls are already pending
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self._pending} calls already pending")
+            self._pending += 1
+        # A request traced with X-Profile carries its profile into the worker thread
+        request_profile = profiler.current_profile()
+        if request_profile is not None:
+            func, args = request_profile.runcall, (func, *args)
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Release the slot when the call finishes, even if the caller stopped waiting
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+    
+    def shutdown(self, wait: bool = True):
+        """Stop accepting calls and, by default, wait for running ones"""
+        self._executor.shutdown(wait=wait)
+    
+    def _release(self, *_):
+        with self._lock:
+            self._pending -= 1
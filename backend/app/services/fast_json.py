@@ -0,0 +1,24 @@
+import json
+from typing import Any, Iterable
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used instead
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode plain Python data (dicts, lists, str, int, float, bool, None) as compact JSON bytes.
+    
+    Uses orjson when it is installed and the standard library otherwise; both
+    produce the same bytes as pydantic's dump_json for the same data.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_lines(values: Iterable[Any]) -> bytes:
+    """Encode each value on its own line, as newline-delimited JSON"""
+    return b"".join(dumps(value) + b"\n" for value in values)
@@ -1,13 +1,41 @@
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
 from app.models.game import Game, Team, GameScore
+from app.services.database import DatabaseService
+from app.services.partnerships import PartnershipMatrix
+from app.services.rating import RatingEngine
+from app.services.recent_pairs import DEFAULT_LOOKBACK, RecentPairs
 
 
 class GameRecorder:
     """Service for recording games and analyzing historical data"""
     
-    def __init__(self):
-        # In-memory storage for development (will be replaced with database)
+    def __init__(self, database: Optional[DatabaseService] = None, lookback: int = DEFAULT_LOOKBACK):
+        """
+        Args:
+            database: Database to persist games in. Without one, games are only
+                kept in memory for the lifetime of the recorder.
+            lookback: Number of most recent games whose teammates count as recent
+        """
+        self.database = database
+        self.lookback = lookback
         self.games: List[Game] = []
+        # Running totals per player for the in-memory mode: [games, wins, losses, draws]
+        self._player_totals: Dict[str, List[int]] = {}
+        # Teammate counts and skill ratings, loaded once from history and then updated per game.
+        # The teammate counts have their own player ids, so only players who
+        # have appeared in games take up rows, however large the roster
+        self.partnerships = PartnershipMatrix()
+        self.ratings = RatingEngine()
+        self.recent_pairs = RecentPairs(lookback, index=self.partnerships.index)
+        # Every game up to this id has been applied, plus the ones recorded here since
+        self.last_game_id = 0
+        self._recorded_ids: Set[int] = set()
+        self._lock = threading.Lock()
+        if database is not None:
+            summaries = list(database.iter_game_summaries())
+            self.last_game_id = max((summary["id"] for summary in summaries), default=0)
+            self._replay(summaries)
     
     def record_game(self, date: str, red_team: Team, yellow_team: Team, score: GameScore) -> Game:
         """
@@ -18,7 +46,7 @@ class GameRecorder:
             red_team: Red team
             yellow_team: Yellow team
             score: Game score
-            
+        
         Returns:
             Recorded game
         """
@@ -28,9 +56,50 @@ class GameRecorder:
             yellow_team=yellow_team,
             score=score
         )
-        self.games.append(game)
+        red_names, yellow_names = [p.name for p in red_team.players], [p.name for p in yellow_team.players]
+        with self._lock:
+            if self.database is not None:
+                game.id = self.database.save_game(game)
+                self._recorded_ids.add(game.id)
+            else:
+                self.games.append(game)
+                self._add_to_totals(game)
+            self._apply(date, red_names, yellow_names, score.red_score, score.yellow_score)
         return game
     
+    def catch_up(self, batch_size: int = 1000) -> int:
+        """
+        Apply games recorded in the database by other processes since this recorder last looked.
+        
+        Only the new games are read, and each updates the teammate counts,
+        ratings and recent teammates as if it had been recorded here, so the
+        cost follows the number of new games rather than the whole history.
+        
+        Returns:
+            Number of games applied
+        """
+        if self.database is None:
+            return 0
+        applied = 0
+        with self._lock:
+            while True:
+                summaries = self.database.get_game_summaries_since(self.last_game_id, batch_size)
+                for summary in summaries:
+                    if summary["id"] not in self._recorded_ids:
+                        self._apply(summary["date"], summary["red_players"], summary["yellow_players"],
+                                    summary["red_score"], summary["yellow_score"])
+                        applied += 1
+                if summaries:
+                    self.last_game_id = summaries[-1]["id"]
+                    self._recorded_ids = {game_id for game_id in self._recorded_ids if game_id > self.last_game_id}
+                if len(summaries) < batch_size:
+                    return applied
+    
+    def _apply(self, date: str, red_names: List[str], yellow_names: List[str], red_score: int, yellow_score: int):
+        self.partnerships.record_teams(red_names, yellow_names, red_score, yellow_score)
+        self.ratings.record_teams(red_names, yellow_names, red_score, yellow_score)
+        self.recent_pairs.record_teams(date, red_names, yellow_names)
+    
     def get_game_history(self) -> List[Game]:
         """
         Get all recorded games.
@@ -38,60 +107,157 @@ class GameRecorder:
         Returns:
             List of games sorted by date (oldest first)
         """
+        if self.database is not None:
+            return self.database.get_all_games()
         return sorted(self.games, key=lambda game: game.date)
     
+    def recent_lineups(self, count: int) -> List[Tuple[List[str], List[str]]]:
+        """
+        Get the teams of the most recent games.
+        
+        Args:
+            count: Number of games to return
+        
+        Returns:
+            List of (red player names, yellow player names), newest first
+        """
+        if count <= 0:
+            return []
+        if self.database is not None:
+            return [
+                (summary["red_players"], summary["yellow_players"])
+                for summary in self.database.get_recent_game_summaries(count)
+            ]
+        recent = sorted(self.games, key=lambda game: game.date)[-count:]
+        return [
+            ([p.name for p in game.red_team.players], [p.name for p in game.yellow_team.players])
+            for game in reversed(recent)
+        ]
+    
     def get_player_performance_stats(self, player_name: str) -> Dict[str, Any]:
         """
         Get performance statistics for a specific player.
         
+        Reads the running totals, so the cost does not grow with game history.
+        
         Args:
             player_name: Name of the player
-            
+        
         Returns:
             Dictionary with performance statistics
         """
-        total_games = 0
-        wins = 0
-        losses = 0
-        
-        for game in self.games:
-            # Check if player was in red team
-            red_players = [p.name for p in game.red_team.players]
-            yellow_players = [p.name for p in game.yellow_team.players]
-            
-            if player_name in red_players:
-                total_games += 1
-                if game.score.red_score > game.score.yellow_score:
-                    wins += 1
-                else:
-                    losses += 1
-            elif player_name in yellow_players:
-                total_games += 1
-                if game.score.yellow_score > game.score.red_score:
-                    wins += 1
-                else:
-                    losses += 1
+        if self.database is not None:
+            return self.database.get_player_stats(player_name)
         
+        total_games, wins, losses, draws = self._player_totals.get(player_name, (0, 0, 0, 0))
         win_rate = wins / total_games if total_games > 0 else 0.0
         
         return {
             "total_games": total_games,
             "wins": wins,
             "losses": losses,
+            "draws": draws,
             "win_rate": win_rate
         }
     
-    def get_team_correlation_stats(self) -> Dict[str, Any]:
+    def get_ratings(self) -> List[Dict[str, Any]]:
+        """
+        Get every player's skill rating, learned from recorded games.
+        
+        Returns:
+            List of ratings (name, mu, sigma, conservative, games), highest conservative rating first
+        """
+        return self.ratings.ratings()
+    
+    def rebuild_stats(self) -> int:
+        """
+        Recompute everything derived from the recorded games: every player's
+        totals and ratings, the teammate counts and the recent teammates.
+        
+        Returns:
+            Number of players with stats
+        """
+        with self._lock:
+            if self.database is not None:
+                summaries = list(self.database.iter_game_summaries())
+                self.last_game_id = max((summary["id"] for summary in summaries), default=0)
+                self._recorded_ids = set()
+                self._replay(summaries)
+                return self.database.rebuild_player_stats()
+            
+            self._player_totals = {}
+            for game in self.games:
+                self._add_to_totals(game)
+            self._replay([
+                {
+                    "date": game.date,
+                    "red_players": [p.name for p in game.red_team.players],
+                    "yellow_players": [p.name for p in game.yellow_team.players],
+                    "red_score": game.score.red_score,
+                    "yellow_score": game.score.yellow_score
+                }
+                for game in self.get_game_history()
+            ])
+            return len(self._player_totals)
+    
+    def _replay(self, summaries: List[Dict[str, Any]]):
+        # Teammate counts and recent teammates are built afresh and swapped in;
+        # the ratings are replayed in place, as the simulator shares them
+        partnerships = PartnershipMatrix()
+        recent_pairs = RecentPairs(self.lookback, index=partnerships.index)
+        for summary in summaries:
+            partnerships.record_teams(
+                summary["red_players"], summary["yellow_players"],
+                summary["red_score"], summary["yellow_score"]
+            )
+        for summary in summaries[-self.lookback:]:
+            recent_pairs.record_teams(summary["date"], summary["red_players"], summary["yellow_players"])
+        self.ratings.replay(summaries)
+        self.partnerships, self.recent_pairs = partnerships, recent_pairs
+    
+    def _add_to_totals(self, game: Game):
+        red_margin = game.score.red_score - game.score.yellow_score
+        for team, margin in ((game.red_team, red_margin), (game.yellow_team, -red_margin)):
+            for player in team.players:
+                totals = self._player_totals.setdefault(player.name, [0, 0, 0, 0])
+                totals[0] += 1
+                if margin > 0:
+                    totals[1] += 1
+                elif margin < 0:
+                    totals[2] += 1
+                else:
+                    totals[3] += 1
+    
+    def get_team_correlation_stats(self, top_k: int = 5, min_games: int = 3) -> Dict[str, Any]:
         """
         Get team correlation statistics to identify strong partnerships.
         
+        Args:
+            top_k: Number of partnerships to list in each direction
+            min_games: Only consider pairs who played at least this many games together
+        
         Returns:
             Dictionary with team correlation data
         """
-        # This will be implemented in the next iteration
-        # For now, return basic structure
+        strong = self.partnerships.top_partnerships(top_k, min_games, strongest=True)
+        weak = self.partnerships.top_partnerships(top_k, min_games, strongest=False)
+        
+        recommendations = []
+        for pair in strong:
+            if pair["win_rate"] > 0.5:
+                recommendations.append(
+                    f"{pair['players'][0]} and {pair['players'][1]} have won {pair['win_rate']:.0%} of "
+                    f"{pair['games']} games together; consider splitting them up"
+                )
+        for pair in weak:
+            if pair["win_rate"] < 0.5:
+                recommendations.append(
+                    f"{pair['players'][0]} and {pair['players'][1]} have won {pair['win_rate']:.0%} of "
+                    f"{pair['games']} games together; consider pairing them with someone else"
+                )
+        
         return {
-            "strong_partnerships": [],
-            "weak_partnerships": [],
-            "recommendations": []
-        } 
\ No newline at end of file
+            "strong_partnerships": strong,
+            "weak_partnerships": weak,
+            "recommendations": recommendations
+        }
@@ -0,0 +1,237 @@
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Instrumentation is decided once, at import: when off, nothing is wrapped and no middleware is added
+ENABLED = os.environ.get("FOOTBALL_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached read (tens of microseconds) to a full history export
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Decimal digits in the number of possible line-ups: 10 players have 252, 30 have about 1.5e8
+SEARCH_SPACE_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100, 300)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of one labelled series"""
+    
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf bucket; made cumulative when rendered
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Family:
+    """A histogram metric name with one series per combination of label values"""
+    
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.registry.enabled
+    
+    def labels(self, *values: str) -> Histogram:
+        """The series for these label values, created on first use"""
+        series = self.series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                series = self.series.get(values)
+                if series is None:
+                    series = Histogram(self.buckets)
+                    self.series[values] = series
+        return series
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self.series.items())
+        for values, metric in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            with metric._lock:
+                counts, total = list(metric.counts), metric.sum
+            separator = "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                lines.append(f'{self.name}_bucket{{{labels}{separator}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {_number(total)}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metric families rendered together on /metrics"""
+    
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self.families: List[Family] = []
+    
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Family:
+        family = Family(self, name, help, labelnames, buckets)
+        self.families.append(family)
+        return family
+    
+    def render(self) -> str:
+        """Every family in the Prometheus text exposition format"""
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# The _count series doubles as the number of requests per route and status code
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to answer a request, by route and status code",
+    ("method", "route", "status"))
+DATABASE_CALL_SECONDS = REGISTRY.histogram(
+    "database_call_duration_seconds", "Time spent in each DatabaseService method", ("method",))
+BALANCE_SECONDS = REGISTRY.histogram(
+    "balance_duration_seconds", "Time to compute a split, by strategy, excluding cache hits", ("strategy",))
+BALANCE_SEARCH_SPACE = REGISTRY.histogram(
+    "balance_search_space_log10", "Decimal orders of magnitude of the possible line-ups, by strategy",
+    ("strategy",), SEARCH_SPACE_BUCKETS)
+
+
+def timed(family: Family, *labels: str, label_of: Optional[Callable[..., Tuple[str, ...]]] = None):
+    """
+    Decorator recording a function's duration in a histogram family.
+    
+    Returns the function itself when the family's registry is disabled, so
+    there is no cost at all then.
+    
+    Args:
+        family: Histogram family to record into
+        labels: Fixed label values
+        label_of: Called with the function's arguments to get the label values instead
+    """
+    def decorate(func: Callable) -> Callable:
+        if not family.enabled:
+            return func
+        fixed = family.labels(*labels) if label_of is None else None
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            series = fixed if fixed is not None else family.labels(*label_of(*args, **kwargs))
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument(family: Family):
+    """
+    Class decorator timing every public method into a family labelled by method name.
+    
+    Generator methods are left alone, since calling one only creates the generator.
+    """
+    def decorate(cls):
+        if not family.enabled:
+            return cls
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(member) or inspect.isgeneratorfunction(member):
+                continue
+            setattr(cls, name, timed(family, name)(member))
+        return cls
+    return decorate
+
+
+def record_search_space(strategy: str, player_count: int, team_size: int):
+    """Record how many line-ups a split chooses between, as a power of ten"""
+    if BALANCE_SEARCH_SPACE.enabled and 0 <= team_size <= player_count:
+        # log10 of C(n, k) without building the (possibly enormous) integer
+        digits = (math.lgamma(player_count + 1) - math.lgamma(team_size + 1)
+                  - math.lgamma(player_count - team_size + 1)) / math.log(10)
+        BALANCE_SEARCH_SPACE.labels(strategy).observe(max(digits, 0.0))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each request's latency and status by route template.
+    
+    The route is read from the endpoint the router matched, so
+    /players/{player_name}/stats is one series however many players there are.
+    """
+    
+    def __init__(self, app, latency: Family = HTTP_REQUEST_SECONDS):
+        self.app = app
+        self.latency = latency
+        # Series by (method, endpoint, status), so recording a request is one dict lookup
+        self._series: Dict[Tuple[str, Any, int], Histogram] = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.latency.enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (scope["method"], scope.get("endpoint"), status)
+            series = self._series.get(key)
+            if series is None:
+                series = self.latency.labels(key[0], self._route(scope, key[1]), str(status))
+                self._series[key] = series
+            series.observe(elapsed)
+    
+    @staticmethod
+    def _route(scope, endpoint) -> str:
+        # Requests that matched no route have no endpoint
+        if endpoint is not None:
+            for route in getattr(scope.get("app"), "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    return route.path
+        return "unmatched"
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
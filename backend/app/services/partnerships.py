@@ -0,0 +1,104 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from app.services.roster import PlayerIndex
+
+
+class PartnershipMatrix:
+    """
+    Player x player counts of games played and won as teammates.
+    
+    Counts are kept in dense arrays indexed by a player-id map and updated
+    for each recorded game, so queries never rescan the game history. The
+    diagonal holds each player's own games and wins.
+    
+    The arrays are sized by the index, so it should only hold players who
+    have appeared in games: an index of every stored player would make them
+    grow with the roster (5000 players, two 8192 x 8192 arrays).
+    """
+    
+    def __init__(self, capacity: int = 64, index: Optional[PlayerIndex] = None):
+        capacity = max(capacity, 1)
+        self.index = index if index is not None else PlayerIndex()
+        self.together = np.zeros((capacity, capacity), dtype=np.int32)
+        self.won = np.zeros((capacity, capacity), dtype=np.int32)
+        self._lock = threading.Lock()
+    
+    def record_teams(self, red_players: Iterable[str], yellow_players: Iterable[str],
+                     red_score: int, yellow_score: int):
+        """
+        Add one game to the counts, in O(team_size^2).
+        
+        Args:
+            red_players: Names of the Red players
+            yellow_players: Names of the Yellow players
+            red_score: Red team score
+            yellow_score: Yellow team score
+        """
+        with self._lock:
+            for players, won in ((red_players, red_score > yellow_score),
+                                 (yellow_players, yellow_score > red_score)):
+                ids = np.unique(self._ids(players))
+                block = np.ix_(ids, ids)
+                self.together[block] += 1
+                if won:
+                    self.won[block] += 1
+    
+    @property
+    def player_ids(self) -> Dict[str, int]:
+        return self.index.ids
+    
+    @property
+    def names(self) -> List[str]:
+        return self.index.names
+    
+    def top_partnerships(self, k: int = 5, min_games: int = 3, strongest: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get the pairs with the highest (or lowest) win rate as teammates.
+        
+        Args:
+            k: Number of pairs to return
+            min_games: Ignore pairs that played fewer games together than this
+            strongest: Highest win rates first when True, lowest first otherwise
+        
+        Returns:
+            List of pairs with players, games, wins and win_rate
+        """
+        with self._lock:
+            # Ids interned elsewhere since the last game have no row yet
+            count = min(len(self.names), len(self.together))
+            together = self.together[:count, :count]
+            rows, cols = np.nonzero(np.triu(together >= max(min_games, 1), 1))
+            games = together[rows, cols]
+            wins = self.won[rows, cols]
+        
+        if not len(rows):
+            return []
+        rates = wins / games
+        # Best rate first; more games together breaks ties
+        order = np.lexsort((-games, -rates if strongest else rates))[:k]
+        return [
+            {
+                "players": [self.names[rows[i]], self.names[cols[i]]],
+                "games": int(games[i]),
+                "wins": int(wins[i]),
+                "win_rate": float(rates[i])
+            }
+            for i in order
+        ]
+    
+    def _ids(self, names: Iterable[str]) -> np.ndarray:
+        ids = self.index.intern_all(names)
+        if len(self.index) > len(self.together):
+            self._grow(len(self.index))
+        return ids
+    
+    def _grow(self, needed: int):
+        capacity = len(self.together)
+        while capacity < needed:
+            capacity *= 2
+        for attribute in ("together", "won"):
+            old = getattr(self, attribute)
+            grown = np.zeros((capacity, capacity), dtype=old.dtype)
+            grown[:len(old), :len(old)] = old
+            setattr(self, attribute, grown)
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+from pydantic import TypeAdapter, ValidationError
+from app.models.player import Player, PlayerAvailability
+
+
+# Column order for CSV import and export; available is optional on import
+CSV_COLUMNS = ("name", "attacking", "defending", "goalkeeping", "energy", "available")
+ATTRIBUTE_COLUMNS = CSV_COLUMNS[1:5]
+
+JSON_TYPES = ("application/json",)
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+CSV_TYPES = ("text/csv",)
+
+PLAYER_LIST = TypeAdapter(List[Player])
+AVAILABILITY_LIST = TypeAdapter(List[PlayerAvailability])
+
+
+class PlayerImportError(ValueError):
+    """Raised when an import payload cannot be parsed or fails validation"""
+    
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} invalid rows")
+        self.errors = errors
+
+
+def parse_players(body: bytes, content_type: str) -> List[Player]:
+    """
+    Parse and validate a batch of players.
+    
+    Args:
+        body: JSON array, newline-delimited JSON or CSV with a header row
+        content_type: Content-Type of the body
+    
+    Returns:
+        Validated players
+    
+    Raises:
+        PlayerImportError: Listing every invalid row, with its 0-based index
+    """
+    media_type = _media_type(content_type)
+    if media_type in JSON_TYPES:
+        # Validating straight from bytes skips building the intermediate dicts
+        players = _validate(PLAYER_LIST, body, from_json=True)
+    elif media_type in CSV_TYPES:
+        players = _validate(PLAYER_LIST, [_nest_attributes(row) for row in _csv_rows(body)])
+    else:
+        players = _validate(PLAYER_LIST, _ndjson_rows(body))
+    _check_unique(player.name for player in players)
+    return players
+
+
+def parse_availability(body: bytes, content_type: str) -> Dict[str, bool]:
+    """
+    Parse and validate a batch of availability updates.
+    
+    Args:
+        body: Rows of name and available, as JSON array, newline-delimited JSON or CSV
+        content_type: Content-Type of the body
+    
+    Returns:
+        Availability keyed by player name
+    
+    Raises:
+        PlayerImportError: Listing every invalid row, with its 0-based index
+    """
+    media_type = _media_type(content_type)
+    if media_type in JSON_TYPES:
+        updates = _validate(AVAILABILITY_LIST, body, from_json=True)
+    elif media_type in CSV_TYPES:
+        updates = _validate(AVAILABILITY_LIST, list(_csv_rows(body)))
+    else:
+        updates = _validate(AVAILABILITY_LIST, _ndjson_rows(body))
+    _check_unique(update.name for update in updates)
+    return {update.name: update.available for update in updates}
+
+
+def players_to_csv(players: Iterable[Player], header: bool = True) -> str:
+    """Render players as CSV text in CSV_COLUMNS order"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for player in players:
+        attributes = player.attributes
+        writer.writerow((player.name, attributes.attacking, attributes.defending,
+                         attributes.goalkeeping, attributes.energy, str(player.available).lower()))
+    return buffer.getvalue()
+
+
+def _media_type(content_type: str) -> str:
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    if media_type not in JSON_TYPES + NDJSON_TYPES + CSV_TYPES:
+        raise PlayerImportError([
+            {"row": None, "field": None, "message": f"Unsupported content type '{media_type}'"}
+        ])
+    return media_type
+
+
+def _validate(adapter: TypeAdapter, data, from_json: bool = False) -> list:
+    try:
+        return adapter.validate_json(data) if from_json else adapter.validate_python(data)
+    except ValidationError as e:
+        raise PlayerImportError([_row_error(error) for error in e.errors()])
+
+
+def _row_error(error: Dict[str, Any]) -> Dict[str, Any]:
+    location = list(error["loc"])
+    row = location.pop(0) if location and isinstance(location[0], int) else None
+    return {"row": row, "field": ".".join(str(part) for part in location) or None, "message": error["msg"]}
+
+
+def _check_unique(names: Iterable[str]):
+    seen = set()
+    errors = []
+    for row, name in enumerate(names):
+        if name in seen:
+            errors.append({"row": row, "field": "name", "message": f"Duplicate player '{name}'"})
+        seen.add(name)
+    if errors:
+        raise PlayerImportError(errors)
+
+
+def _ndjson_rows(body: bytes) -> List[Any]:
+    rows = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            raise PlayerImportError([
+                {"row": len(rows), "field": None, "message": f"Line {line_number} is not valid JSON: {e}"}
+            ])
+    return rows
+
+
+def _csv_rows(body: bytes) -> Iterator[Dict[str, str]]:
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise PlayerImportError([{"row": None, "field": None, "message": "CSV must be UTF-8 encoded"}])
+    for row in csv.DictReader(io.StringIO(text)):
+        # Leave out blank cells so optional columns fall back to their defaults
+        yield {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+
+
+def _nest_attributes(row: Dict[str, str]) -> Dict[str, Any]:
+    nested: Dict[str, Any] = {key: value for key, value in row.items() if key not in ATTRIBUTE_COLUMNS}
+    nested["attributes"] = {key: row[key] for key in ATTRIBUTE_COLUMNS if key in row}
+    return nested
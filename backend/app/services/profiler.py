@@ -0,0 +1,264 @@
+import asyncio
+import cProfile
+import contextvars
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Profiling hooks are decided once, at import, like metrics
+ENABLED = os.environ.get("FOOTBALL_PROFILING", "").lower() in ("1", "true", "yes", "on")
+
+# Header that asks for one request to be traced with cProfile
+PROFILE_HEADER = "x-profile"
+
+# Header carrying the admin token, without which PROFILE_HEADER is ignored
+TOKEN_HEADER = "x-admin-token"
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 60.0
+
+# (module, function) of leaf frames where a thread is waiting rather than working:
+# the event loop polling for I/O and executor threads waiting for a task
+IDLE_FRAMES = {
+    ("selectors", "select"),
+    ("threading", "wait"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+}
+
+# Profile of the request being handled in this context, picked up by BoundedExecutor
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a sampling run is requested while another is in progress"""
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of every thread at a fixed interval.
+    
+    Sampling reads sys._current_frames() from its own thread, so it sees the
+    event loop and the executor's worker threads alike without any hooks in
+    the code being profiled, and costs nothing when not running.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[Any, str] = {}
+    
+    def sample(self, duration: float, interval: float = DEFAULT_INTERVAL,
+               include_idle: bool = False) -> Tuple[Counter, int]:
+        """
+        Sample every thread's stack for a while.
+        
+        Args:
+            duration: Seconds to sample for
+            interval: Seconds between samples
+            include_idle: Keep samples of threads that are only waiting
+        
+        Returns:
+            Counts per collapsed stack ("thread;outermost;...;innermost") and the number of sampling rounds
+        
+        Raises:
+            ProfilerBusy: If another sampling run is in progress
+        """
+        if not 0 < duration <= MAX_DURATION:
+            raise ValueError(f"Expected a duration between 0 and {MAX_DURATION} seconds, got {duration}")
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being taken")
+        try:
+            me = threading.get_ident()
+            names: Dict[int, str] = {}
+            stacks: Counter = Counter()
+            rounds = 0
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                rounds += 1
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = self._stack(frame, include_idle)
+                    if stack is None:
+                        continue
+                    name = names.get(ident)
+                    if name is None:
+                        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                        name = names.setdefault(ident, f"thread-{ident}")
+                    stacks[f"{name};{stack}"] += 1
+                time.sleep(interval)
+            return stacks, rounds
+        finally:
+            self._lock.release()
+    
+    def _stack(self, frame, include_idle: bool) -> Optional[str]:
+        labels: List[str] = []
+        leaf = frame
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = frame.f_globals.get("__name__", "?")
+                # Collapsed stacks use ';' between frames and ' ' before the count
+                label = f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(";", ",").replace(" ", "_")
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        if not include_idle and (leaf.f_globals.get("__name__"), leaf.f_code.co_name) in IDLE_FRAMES:
+            return None
+        return ";".join(reversed(labels))
+
+
+def collapsed(stacks: Counter) -> str:
+    """Format sampled stacks one per line as "frame;frame;frame count", as flamegraph.pl and speedscope read"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+class RequestProfile:
+    """
+    cProfile statistics for one request, across the threads it ran on.
+    
+    cProfile only sees the thread it is enabled in, so each blocking call the
+    request hands to the executor gets its own profiler, and the pieces are
+    merged when the summary is built.
+    """
+    
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.skipped = 0
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+    
+    def runcall(self, func: Callable, *args, **kwargs):
+        """Call a function under a fresh profiler and keep its statistics"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler owns the interpreter (Python 3.12+ allows only one)
+            self.skipped += 1
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.add(profile)
+    
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles.append(profile)
+    
+    def summary(self, limit: int = 30) -> str:
+        """The slowest functions by cumulative time, as printed by pstats"""
+        stream = io.StringIO()
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return "Nothing was profiled\n"
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        if self.skipped:
+            stream.write(f"{self.skipped} call(s) not profiled: another profiler was active\n")
+        return stream.getvalue()
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Profile of the request being handled, if it asked to be traced"""
+    return _current_profile.get()
+
+
+class ProfileStore:
+    """The most recent request profile summaries, by id"""
+    
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def put(self, profile_id: str, summary: str):
+        with self._lock:
+            self._summaries[profile_id] = summary
+            while len(self._summaries) > self.maxsize:
+                self._summaries.popitem(last=False)
+    
+    def get(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            return self._summaries.get(profile_id)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware tracing requests that carry an X-Profile header with cProfile.
+    
+    Tracing slows the event loop for everyone, so the header is only honoured
+    alongside the admin token in X-Admin-Token, and never without a token.
+    The response gets an X-Profile-Id header; the summary is built on an
+    executor thread and kept in the store once the response has been sent.
+    Work on the event loop is profiled too, for one traced request at a time,
+    and then also includes whatever other requests the loop ran meanwhile.
+    """
+    
+    def __init__(self, app, store: ProfileStore, token: Optional[str]):
+        """
+        Args:
+            app: ASGI application to wrap
+            store: Where summaries are kept
+            token: Admin token a traced request must carry; None traces nothing
+        """
+        self.app = app
+        self.store = store
+        self.token = token.encode() if token else None
+        self._loop_profiled = False
+    
+    def _traced(self, scope) -> bool:
+        if scope["type"] != "http" or self.token is None:
+            return False
+        headers = dict(scope["headers"])
+        return PROFILE_HEADER.encode() in headers and hmac.compare_digest(
+            headers.get(TOKEN_HEADER.encode(), b""), self.token)
+    
+    async def __call__(self, scope, receive, send):
+        if not self._traced(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        profile = RequestProfile()
+        
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+        
+        loop_profile = None
+        if not self._loop_profiled:
+            self._loop_profiled = True
+            loop_profile = cProfile.Profile()
+            try:
+                loop_profile.enable()
+            except ValueError:
+                loop_profile, self._loop_profiled = None, False
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _current_profile.reset(token)
+            if loop_profile is not None:
+                loop_profile.disable()
+                profile.add(loop_profile)
+                self._loop_profiled = False
+            # Sorting and formatting the statistics is slow enough to stall the loop
+            summary = await asyncio.get_running_loop().run_in_executor(None, profile.summary)
+            self.store.put(profile.id, summary)
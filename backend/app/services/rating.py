@@ -0,0 +1,269 @@
+import math
+import threading
+from functools import lru_cache
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+# Defaults follow TrueSkill: ratings start at 25 with an uncertainty of 25/3
+DEFAULT_MU = 25.0
+DEFAULT_SIGMA = DEFAULT_MU / 3
+DEFAULT_BETA = DEFAULT_SIGMA / 2
+DEFAULT_TAU = DEFAULT_SIGMA / 100
+DEFAULT_DRAW_PROBABILITY = 0.1
+
+# A recorded game as (player ids, +1 for Red / -1 for Yellow, red margin)
+CompiledGame = Tuple[np.ndarray, np.ndarray, int]
+
+
+class RatingEngine:
+    """
+    TrueSkill-style team rating engine.
+    
+    Each player has a rating mean (mu) and uncertainty (sigma). A team's
+    strength is the sum of its players' means, and each game moves every
+    player's mean towards the observed result in proportion to their
+    uncertainty, which shrinks as they play more.
+    """
+    
+    def __init__(self, mu: float = DEFAULT_MU, sigma: float = DEFAULT_SIGMA, beta: float = DEFAULT_BETA,
+                 tau: float = DEFAULT_TAU, draw_probability: float = DEFAULT_DRAW_PROBABILITY):
+        self.mu = mu
+        self.sigma = sigma
+        self.beta = beta
+        self.tau = tau
+        self.draw_probability = draw_probability
+        self.player_ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.games_played = np.zeros(0, dtype=np.int64)
+        # Shaped (1, players) so the update maths is shared with replay_batch
+        self._mus = np.zeros((1, 0))
+        self._sigmas = np.zeros((1, 0))
+        self._parameters = self._parameter_arrays([beta], [tau], [draw_probability])
+        # Bumped whenever any rating changes, so callers can cache rating-based results
+        self.version = 0
+        self._lock = threading.Lock()
+    
+    def record_teams(self, red_players: Iterable[str], yellow_players: Iterable[str],
+                     red_score: int, yellow_score: int):
+        """
+        Update the ratings of everyone who played in one game.
+        
+        Args:
+            red_players: Names of the Red players
+            yellow_players: Names of the Yellow players
+            red_score: Red team score
+            yellow_score: Yellow team score
+        """
+        with self._lock:
+            game = _compile_game(self.player_ids, red_players, yellow_players, red_score - yellow_score)
+            self._add_players()
+            if game is None:
+                return
+            ids, signs, margin = game
+            _update(self._mus, self._sigmas, ids, signs, margin, *self._parameters)
+            self.games_played[ids] += 1
+            self.version += 1
+    
+    def replay(self, games: Iterable[Dict[str, Any]]):
+        """
+        Reset every rating and replay a game history in order.
+        
+        Args:
+            games: Game summaries with red_players, yellow_players, red_score and yellow_score
+        """
+        names, compiled = compile_history(games)
+        mus = np.full((1, len(names)), self.mu)
+        sigmas = np.full((1, len(names)), self.sigma)
+        games_played = np.zeros(len(names), dtype=np.int64)
+        for ids, signs, margin in compiled:
+            _update(mus, sigmas, ids, signs, margin, *self._parameters)
+            games_played[ids] += 1
+        with self._lock:
+            self.names = names
+            self.player_ids = {name: i for i, name in enumerate(names)}
+            self._mus, self._sigmas, self.games_played = mus, sigmas, games_played
+            self.version += 1
+    
+    def rating(self, name: str) -> Dict[str, float]:
+        """
+        Get a player's rating.
+        
+        Returns:
+            Dictionary with mu, sigma, conservative (mu - 3 sigma) and games
+        """
+        with self._lock:
+            player_id = self.player_ids.get(name)
+            if player_id is None:
+                mu, sigma, games = self.mu, self.sigma, 0
+            else:
+                mu, sigma = float(self._mus[0, player_id]), float(self._sigmas[0, player_id])
+                games = int(self.games_played[player_id])
+        return {"mu": mu, "sigma": sigma, "conservative": mu - 3 * sigma, "games": games}
+    
+    def ratings(self) -> List[Dict[str, Any]]:
+        """Get every rated player, highest conservative rating first"""
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "mu": float(self._mus[0, i]),
+                    "sigma": float(self._sigmas[0, i]),
+                    "conservative": float(self._mus[0, i] - 3 * self._sigmas[0, i]),
+                    "games": int(self.games_played[i])
+                }
+                for i, name in enumerate(self.names)
+            ]
+        return sorted(rows, key=lambda row: row["conservative"], reverse=True)
+    
+    def scores(self, names: Sequence[str]) -> List[float]:
+        """Rating means for a list of players; unrated players get the starting mean"""
+        with self._lock:
+            return [
+                float(self._mus[0, self.player_ids[name]]) if name in self.player_ids else self.mu
+                for name in names
+            ]
+    
+    def replay_batch(self, games: Iterable[Dict[str, Any]], beta: Sequence[float],
+                     tau: Sequence[float], draw_probability: Sequence[float]) -> Dict[str, Any]:
+        """
+        Replay a game history under several parameter sets at once.
+        
+        The parameter sets share one pass over the history: every update is
+        applied to a (parameter sets, players) array, so trying out a grid of
+        parameters costs little more than a single replay. The engine's own
+        ratings are left untouched.
+        
+        Args:
+            games: Game summaries, oldest first
+            beta, tau, draw_probability: One value per parameter set
+        
+        Returns:
+            Dictionary with names, mu and sigma (arrays shaped (parameter sets, players))
+            and accuracy: for each parameter set, the share of decisive games won by the
+            team that was rated stronger beforehand
+        """
+        parameters = self._parameter_arrays(beta, tau, draw_probability)
+        names, compiled = compile_history(games)
+        mus = np.full((len(parameters[0]), len(names)), self.mu)
+        sigmas = np.full((len(parameters[0]), len(names)), self.sigma)
+        
+        correct = np.zeros(len(parameters[0]))
+        decisive = 0
+        for ids, signs, margin in compiled:
+            if margin != 0:
+                decisive += 1
+                correct += (mus[:, ids] @ signs > 0) == (margin > 0)
+            _update(mus, sigmas, ids, signs, margin, *parameters)
+        
+        return {
+            "names": names,
+            "mu": mus,
+            "sigma": sigmas,
+            "accuracy": correct / decisive if decisive else correct
+        }
+    
+    @staticmethod
+    def _parameter_arrays(beta, tau, draw_probability) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        beta, tau, draw_probability = (np.asarray(values, dtype=float) for values in (beta, tau, draw_probability))
+        if not beta.shape == tau.shape == draw_probability.shape:
+            raise ValueError("beta, tau and draw_probability need one value per parameter set")
+        if np.any((draw_probability < 0) | (draw_probability >= 1)):
+            raise ValueError("Draw probabilities must be in [0, 1)")
+        # The draw margin is beta times the standard-normal quantile of the draw probability
+        draw_scale = beta * np.array([NormalDist().inv_cdf((p + 1) / 2) for p in draw_probability])
+        return beta ** 2, tau ** 2, draw_scale
+    
+    def _add_players(self):
+        # _compile_game has already given new names an id
+        self.names.extend(list(self.player_ids)[len(self.names):])
+        new_players = len(self.names) - self._mus.shape[1]
+        if new_players:
+            self._mus = np.hstack([self._mus, np.full((1, new_players), self.mu)])
+            self._sigmas = np.hstack([self._sigmas, np.full((1, new_players), self.sigma)])
+            self.games_played = np.concatenate([self.games_played, np.zeros(new_players, dtype=np.int64)])
+
+
+def compile_history(games: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[CompiledGame]]:
+    """
+    Turn game summaries into player-id arrays for fast replay.
+    
+    Returns:
+        (player names indexed by id, list of (player ids, team signs, red margin))
+    """
+    player_ids: Dict[str, int] = {}
+    compiled = []
+    for game in games:
+        entry = _compile_game(player_ids, game["red_players"], game["yellow_players"],
+                              game["red_score"] - game["yellow_score"])
+        if entry is not None:
+            compiled.append(entry)
+    return list(player_ids), compiled
+
+
+def _compile_game(player_ids: Dict[str, int], red_players: Iterable[str], yellow_players: Iterable[str],
+                  margin: int) -> Optional[CompiledGame]:
+    # Gives new names the next id in place; None if either team is empty
+    red = list(dict.fromkeys(player_ids.setdefault(name, len(player_ids)) for name in red_players))
+    yellow = list(dict.fromkeys(player_ids.setdefault(name, len(player_ids)) for name in yellow_players))
+    if not red or not yellow:
+        return None
+    return np.array(red + yellow, dtype=np.intp), _team_signs(len(red), len(yellow)), margin
+
+
+@lru_cache(maxsize=64)
+def _team_signs(red_count: int, yellow_count: int) -> np.ndarray:
+    signs = np.concatenate([np.ones(red_count), -np.ones(yellow_count)])
+    signs.flags.writeable = False
+    return signs
+
+
+def _pdf(x: float) -> float:
+    return math.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def _cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _win_factors(difference: float, draw_margin: float) -> Tuple[float, float]:
+    # Mean and variance corrections for a win by the team ahead on difference
+    x = difference - draw_margin
+    v = _pdf(x) / max(_cdf(x), 1e-12)
+    return v, v * (v + x)
+
+
+def _draw_factors(difference: float, draw_margin: float) -> Tuple[float, float]:
+    upper, lower = draw_margin - difference, -draw_margin - difference
+    upper_pdf, lower_pdf = _pdf(upper), _pdf(lower)
+    denominator = max(_cdf(upper) - _cdf(lower), 1e-12)
+    v = (lower_pdf - upper_pdf) / denominator
+    return v, v * v + (upper * upper_pdf - lower * lower_pdf) / denominator
+
+
+def _update(mus: np.ndarray, sigmas: np.ndarray, ids: np.ndarray, signs: np.ndarray, margin: int,
+            beta_squared: np.ndarray, tau_squared: np.ndarray, draw_scale: np.ndarray):
+    """
+    Apply one game to (parameter sets, players) rating arrays in place.
+    
+    Uses the TrueSkill two-team update. ids lists everyone who played, with
+    signs +1 for Red and -1 for Yellow; draw_scale is beta times the
+    standard-normal quantile of (1 + draw probability) / 2.
+    """
+    variance = sigmas[:, ids] ** 2 + tau_squared[:, None]
+    c = np.sqrt(variance.sum(axis=1) + len(ids) * beta_squared)
+    draw_margin = draw_scale * math.sqrt(len(ids)) / c
+    
+    # Performance difference in favour of the winner (Red for draws)
+    winner_signs = signs if margin >= 0 else -signs
+    difference = (mus[:, ids] @ winner_signs) / c
+    
+    # Only a handful of parameter sets, so the scalar maths beats numpy's per-call overhead
+    factors = _win_factors if margin != 0 else _draw_factors
+    v, w = (np.array(values) for values in zip(*map(factors, difference.tolist(), draw_margin.tolist())))
+    
+    # The winner moves up by v, the other team down
+    share = variance / c[:, None]
+    mus[:, ids] += share * winner_signs * v[:, None]
+    sigmas[:, ids] = np.sqrt(variance * np.maximum(1 - share / c[:, None] * w[:, None], 1e-6))
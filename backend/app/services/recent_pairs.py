@@ -0,0 +1,106 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.roster import PlayerIndex
+
+
+# Games looked back over when penalising repeated teammates, about a month of weekly games
+DEFAULT_LOOKBACK = 4
+
+
+class RecentPairs:
+    """
+    Sparse counts of how often each pair of players were teammates in the most recent games.
+    
+    Only pairs that actually shared a team inside the window are stored, as
+    per-player dictionaries of teammate id to count. Recording a game adds its
+    pairs and drops those of the game that falls out of the window, so the
+    counts never need rebuilding from history.
+    
+    Pass the PartnershipMatrix's PlayerIndex to give players the same ids in both.
+    """
+    
+    def __init__(self, lookback: int = DEFAULT_LOOKBACK, index: Optional[PlayerIndex] = None):
+        """
+        Args:
+            lookback: Number of most recent games (by date) to count
+            index: Player ids to share with the teammate counts
+        """
+        if lookback < 1:
+            raise ValueError(f"Expected a lookback of at least 1 game, got {lookback}")
+        self.lookback = lookback
+        self.index = index if index is not None else PlayerIndex()
+        self.pairs: Dict[int, Dict[int, int]] = {}
+        # (date, sequence, teams as id lists) for the games in the window, oldest first
+        self._games: List[Tuple[str, int, List[List[int]]]] = []
+        self._sequence = 0
+        # Bumped on every change, so callers can cache results that depend on the counts
+        self.version = 0
+        self._lock = threading.Lock()
+    
+    def record_teams(self, date: str, red_players: Iterable[str], yellow_players: Iterable[str]):
+        """
+        Add one game, evicting the oldest game once the window is full.
+        
+        Games may arrive out of date order; one older than every game in a full
+        window is ignored.
+        
+        Args:
+            date: Game date (YYYY-MM-DD format)
+            red_players: Names of the Red players
+            yellow_players: Names of the Yellow players
+        """
+        teams = [sorted(set(self.index.intern_all(players).tolist())) for players in (red_players, yellow_players)]
+        with self._lock:
+            self._sequence += 1
+            entry = (date, self._sequence, teams)
+            if len(self._games) >= self.lookback and entry < self._games[0]:
+                return
+            bisect.insort(self._games, entry)
+            self._count(teams, 1)
+            if len(self._games) > self.lookback:
+                self._count(self._games.pop(0)[2], -1)
+            self.version += 1
+    
+    def weights(self, names: Sequence[str]) -> np.ndarray:
+        """
+        Recent games together for every pair of the given players.
+        
+        Args:
+            names: Player names
+        
+        Returns:
+            Symmetric int64 array of shape (players, players) with a zero diagonal
+        """
+        ids = [self.index.get(name) for name in names]
+        position = {player_id: i for i, player_id in enumerate(ids) if player_id is not None}
+        weights = np.zeros((len(names), len(names)), dtype=np.int64)
+        with self._lock:
+            for player_id, i in position.items():
+                for teammate, count in self.pairs.get(player_id, {}).items():
+                    j = position.get(teammate)
+                    if j is not None:
+                        weights[i, j] = count
+        return weights
+    
+    def count(self, first: str, second: str) -> int:
+        """Number of games in the window in which two players were teammates"""
+        first_id, second_id = self.index.get(first), self.index.get(second)
+        with self._lock:
+            return self.pairs.get(first_id, {}).get(second_id, 0)
+    
+    def _count(self, teams: List[List[int]], step: int):
+        for team in teams:
+            for player_id in team:
+                row = self.pairs.setdefault(player_id, {})
+                for teammate in team:
+                    if teammate == player_id:
+                        continue
+                    count = row.get(teammate, 0) + step
+                    if count:
+                        row[teammate] = count
+                    else:
+                        del row[teammate]
+                if not row:
+                    del self.pairs[player_id]
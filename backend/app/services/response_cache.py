@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+# A serialised response body and the extra headers that go with it
+CachedResponse = Tuple[bytes, Dict[str, str]]
+
+# (database instance, data version)
+Version = Tuple[str, int]
+
+
+class ResponseCache:
+    """
+    LRU cache of serialised read responses for one data version.
+    
+    Every write bumps the data version, and any entry from an older version
+    is stale, so the whole cache is dropped as soon as a newer version is
+    seen instead of tracking which writes affect which responses.
+    """
+    
+    def __init__(self, maxsize: int = 128, max_bytes: int = 64 * 1024 * 1024):
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[Version] = None
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, version: Version, key: Hashable) -> Optional[CachedResponse]:
+        """Get a cached response for this data version, or None on a miss"""
+        with self._lock:
+            if version != self._version or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+    
+    def put(self, version: Version, key: Hashable, response: CachedResponse):
+        """Store a response, evicting least recently used entries past either limit"""
+        size = len(response[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                if self._version and version[0] == self._version[0] and version[1] < self._version[1]:
+                    # Rendered before a write that has already been seen; never cache stale data
+                    return
+                self._clear()
+                self._version = version
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key)[0])
+            self._entries[key] = response
+            self._bytes += size
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                _, (content, _) = self._entries.popitem(last=False)
+                self._bytes -= len(content)
+    
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
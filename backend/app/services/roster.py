@@ -0,0 +1,163 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.models.player import Player, PlayerAttributes
+
+
+ATTRIBUTES = ("attacking", "defending", "goalkeeping", "energy")
+
+
+class PlayerIndex:
+    """
+    Interns player names as small dense integer ids.
+    
+    Stores that are indexed together share one index, so a player has the
+    same id in each and their arrays line up. Ids are never reused or removed.
+    """
+    
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._lock = threading.Lock()
+    
+    def intern(self, name: str) -> int:
+        """Get a player's id, assigning the next free one to new names"""
+        player_id = self.ids.get(name)
+        if player_id is None:
+            with self._lock:
+                player_id = self.ids.get(name)
+                if player_id is None:
+                    player_id = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = player_id
+        return player_id
+    
+    def intern_all(self, names: Iterable[str]) -> np.ndarray:
+        """Ids of several players, in order"""
+        return np.array([self.intern(name) for name in names], dtype=np.intp)
+    
+    def get(self, name: str) -> Optional[int]:
+        """A player's id, or None if the name has never been seen"""
+        return self.ids.get(name)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class Roster:
+    """
+    Columnar in-memory copy of the players table.
+    
+    Attributes live in one contiguous int8 array with a row per player id,
+    and availability in a boolean column beside it, so selecting and scoring
+    a squad is a handful of array operations instead of a loop over pydantic
+    models. Kept current by registering upsert as a DatabaseService player
+    listener.
+    """
+    
+    def __init__(self, index: Optional[PlayerIndex] = None, capacity: int = 64):
+        capacity = max(capacity, 1)
+        self.index = index if index is not None else PlayerIndex()
+        self.attributes = np.zeros((capacity, len(ATTRIBUTES)), dtype=np.int8)
+        self.available = np.zeros(capacity, dtype=bool)
+        # Whether the id belongs to a stored player; an index shared with
+        # other stores may also hold names the roster has never stored
+        self.present = np.zeros(capacity, dtype=bool)
+        # Models handed out by players(), built on first use and dropped when the player changes
+        self._models: Dict[int, Player] = {}
+        # Bumped on every change, so callers can cache roster-based results
+        self.version = 0
+        self._lock = threading.Lock()
+    
+    def load(self, players: Iterable[Player]):
+        """Add or replace many players, e.g. everything in the database at startup"""
+        with self._lock:
+            for player in players:
+                self._set(player)
+            self.version += 1
+    
+    def upsert(self, player: Player):
+        """Add or replace one player; use as a DatabaseService player listener"""
+        with self._lock:
+            self._set(player)
+            self.version += 1
+    
+    def ids(self, names: Sequence[str]) -> np.ndarray:
+        """
+        Ids of stored players.
+        
+        Raises:
+            KeyError: Listing every name that is not a stored player
+        """
+        ids = [self.index.get(name) for name in names]
+        with self._lock:
+            missing = [
+                name for name, player_id in zip(names, ids)
+                if player_id is None or player_id >= len(self.present) or not self.present[player_id]
+            ]
+        if missing:
+            raise KeyError(", ".join(missing))
+        return np.array(ids, dtype=np.intp)
+    
+    def available_ids(self) -> np.ndarray:
+        """Ids of every stored player currently marked available, in id order"""
+        with self._lock:
+            return np.flatnonzero(self.available & self.present)
+    
+    def attribute_matrix(self, ids: np.ndarray) -> np.ndarray:
+        """Attributes of the given players as an int64 array of shape (players, attributes)"""
+        with self._lock:
+            return self.attributes[ids].astype(np.int64)
+    
+    def snapshot(self, ids: np.ndarray) -> Tuple[Tuple, ...]:
+        """Sorted (name, attacking, defending, goalkeeping, energy) rows, the shape BalanceCache keys on"""
+        names = self.index.names
+        rows = self.attribute_matrix(ids).tolist()
+        return tuple(sorted((names[player_id], *row) for player_id, row in zip(ids.tolist(), rows)))
+    
+    def players(self, ids: np.ndarray) -> List[Player]:
+        """Player models for the given ids, e.g. for a response; treat them as read-only"""
+        with self._lock:
+            return [self._model(player_id) for player_id in ids.tolist()]
+    
+    def __contains__(self, name: str) -> bool:
+        player_id = self.index.get(name)
+        return player_id is not None and player_id < len(self.present) and bool(self.present[player_id])
+    
+    def __len__(self) -> int:
+        return int(self.present.sum())
+    
+    def _model(self, player_id: int) -> Player:
+        model = self._models.get(player_id)
+        if model is None:
+            # The columns only ever hold validated players
+            model = Player.model_construct(
+                name=self.index.names[player_id],
+                attributes=PlayerAttributes.model_construct(
+                    **dict(zip(ATTRIBUTES, self.attributes[player_id].tolist()))
+                ),
+                available=bool(self.available[player_id])
+            )
+            self._models[player_id] = model
+        return model
+    
+    def _set(self, player: Player):
+        player_id = self.index.intern(player.name)
+        if player_id >= len(self.present):
+            self._grow(len(self.index))
+        attributes = player.attributes
+        self.attributes[player_id] = (attributes.attacking, attributes.defending,
+                                      attributes.goalkeeping, attributes.energy)
+        self.available[player_id] = player.available
+        self.present[player_id] = True
+        self._models.pop(player_id, None)
+    
+    def _grow(self, needed: int):
+        capacity = len(self.present)
+        while capacity < needed:
+            capacity *= 2
+        for attribute in ("attributes", "available", "present"):
+            old = getattr(self, attribute)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, attribute, grown)
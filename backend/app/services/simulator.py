@@ -0,0 +1,210 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.models.game import Team
+from app.services.rating import DEFAULT_BETA, RatingEngine
+
+
+# Simulations per worker task; results only depend on the seed and this, not on the worker count
+CHUNK_SIZE = 10000
+
+# Batches up to this size run in the calling thread, where the pool's overhead would dominate
+INLINE_LIMIT = 20000
+
+MAX_SIMULATIONS = 1_000_000
+
+# Typical goals per team in a casual small-sided game between evenly matched teams
+DEFAULT_GOALS = 4.0
+
+# Log of the goal-rate ratio between the teams per standard deviation of performance difference
+DEFAULT_SENSITIVITY = 0.5
+
+# Wall-clock budget for one simulation request, in seconds
+DEFAULT_BUDGET = 0.5
+
+# (red wins, draws, yellow wins, summed red goal difference, simulations)
+Tally = Tuple[int, int, int, int, int]
+
+
+class SimulationPool:
+    """
+    Worker processes for large simulation batches, shareable between simulators.
+    
+    Processes are only started when first needed, and spawned rather than
+    forked: the server process holds threads and database connections.
+    One pool per server process, shared by every league's simulator, keeps
+    the number of processes independent of the number of leagues.
+    """
+    
+    def __init__(self, processes: Optional[int] = None):
+        """
+        Args:
+            processes: Worker processes, default one per CPU
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """
+        Start the worker processes now rather than on the first large batch.
+        
+        Spawning a worker and importing NumPy in it takes longer than a whole
+        simulation budget, so the server does this as it starts. Nothing is
+        started for a single process, as batches then run inline.
+        """
+        if self.processes > 1:
+            self.executor()
+    
+    def executor(self) -> ProcessPoolExecutor:
+        """The process pool, started and warmed up if need be"""
+        with self._lock:
+            if self._executor is None:
+                executor = ProcessPoolExecutor(max_workers=self.processes,
+                                               mp_context=multiprocessing.get_context("spawn"))
+                # Workers are spawned as tasks arrive; one tiny chunk each has them all import the simulation code
+                wait([executor.submit(_simulate_chunk, (0.0, 1.0), (0.0, 1.0), 1.0, 0.0, 1, None)
+                      for _ in range(self.processes)])
+                self._executor = executor
+            return self._executor
+    
+    def close(self):
+        """Stop the worker processes, if any were started; the next use starts them again"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+class MatchSimulator:
+    """
+    Monte Carlo match outcome simulator.
+    
+    Each simulated match draws a performance for both teams from their
+    players' ratings, TrueSkill style: a player performs at N(mu, sigma^2 +
+    beta^2) and a team at the sum of its players. The performance difference
+    then skews Poisson goal counts towards the stronger team: one standard
+    deviation of difference multiplies the goal-rate ratio by e^sensitivity. Large batches
+    are spread over a process pool in fixed-size, independently seeded
+    chunks, so a seed always gives the same result however many workers run.
+    """
+    
+    def __init__(self, ratings: Optional[RatingEngine] = None, processes: Optional[int] = None,
+                 goals: float = DEFAULT_GOALS, sensitivity: float = DEFAULT_SENSITIVITY,
+                 beta: float = DEFAULT_BETA, pool: Optional[SimulationPool] = None):
+        """
+        Args:
+            ratings: Where player ratings come from; unrated players get the starting rating
+            processes: Worker processes for large batches, default one per CPU; ignored with a pool
+            goals: Expected goals per team when the teams are evenly matched
+            sensitivity: How strongly the performance difference moves goals towards the stronger team
+            beta: Performance noise per player on top of rating uncertainty
+            pool: Worker processes shared with other simulators, left running by close();
+                without one the simulator starts and stops its own
+        """
+        if goals <= 0:
+            raise ValueError(f"Expected goals must be positive, got {goals}")
+        self.ratings = ratings or RatingEngine()
+        self.goals = goals
+        self.sensitivity = sensitivity
+        self.beta = beta
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else SimulationPool(processes)
+    
+    @property
+    def processes(self) -> int:
+        return self.pool.processes
+    
+    def simulate(self, red_team: Team, yellow_team: Team, simulations: int = 20000,
+                 seed: Optional[int] = None, budget: Optional[float] = DEFAULT_BUDGET) -> Dict[str, float]:
+        """
+        Estimate the outcome of a match between two teams.
+        
+        A batch that runs out of budget is answered from the longest run of
+        chunks finished in submission order, so a seed gives the same result
+        for the same number of simulations run, whichever workers were quick.
+        The budget starts once the worker processes are running.
+        
+        Args:
+            red_team: Red team
+            yellow_team: Yellow team
+            simulations: Number of matches to simulate
+            seed: Seed for reproducible results; random when None
+            budget: Seconds to spend before answering with the chunks finished so far,
+                or None to always finish every chunk
+        
+        Returns:
+            Dictionary with red_win, draw and yellow_win probabilities, expected_goal_difference
+            (Red minus Yellow) and simulations (the number actually run)
+        """
+        if not 1 <= simulations <= MAX_SIMULATIONS:
+            raise ValueError(f"Expected between 1 and {MAX_SIMULATIONS} simulations, got {simulations}")
+        if not red_team.players or not yellow_team.players:
+            raise ValueError("Both teams need at least one player")
+        
+        red, yellow = self._team_strength(red_team), self._team_strength(yellow_team)
+        counts = [min(CHUNK_SIZE, simulations - start) for start in range(0, simulations, CHUNK_SIZE)]
+        seeds = np.random.SeedSequence(seed).spawn(len(counts))
+        tasks = [(red, yellow, self.goals, self.sensitivity, count, chunk_seed) for count, chunk_seed in zip(counts, seeds)]
+        
+        if simulations <= INLINE_LIMIT or self.processes == 1:
+            tallies = [_simulate_chunk(*task) for task in tasks]
+        else:
+            tallies = self._run_pooled(tasks, budget)
+        
+        red_wins, draws, yellow_wins, goal_difference, run = (sum(values) for values in zip(*tallies))
+        return {
+            "red_win": red_wins / run,
+            "draw": draws / run,
+            "yellow_win": yellow_wins / run,
+            "expected_goal_difference": goal_difference / run,
+            "simulations": run
+        }
+    
+    def close(self):
+        """Stop the worker processes, if any were started and they are not shared"""
+        if self._owns_pool:
+            self.pool.close()
+    
+    def _team_strength(self, team: Team) -> Tuple[float, float]:
+        # Mean and variance of the team's performance
+        ratings = [self.ratings.rating(player.name) for player in team.players]
+        mean = sum(rating["mu"] for rating in ratings)
+        variance = sum(rating["sigma"] ** 2 + self.beta ** 2 for rating in ratings)
+        return mean, variance
+    
+    def _run_pooled(self, tasks: List[tuple], budget: Optional[float]) -> List[Tally]:
+        # Started before the clock does, should the pool not have been warmed up already
+        pool = self.pool.executor()
+        deadline = None if budget is None else time.monotonic() + budget
+        futures = [pool.submit(_simulate_chunk, *task) for task in tasks]
+        # Always wait for the first chunk, so even an exhausted budget gets an estimate
+        futures[0].result()
+        wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        tallies: List[Tally] = []
+        for future in futures:
+            if not future.done():
+                break
+            tallies.append(future.result())
+        for future in futures[len(tallies):]:
+            future.cancel()
+        return tallies
+
+
+def _simulate_chunk(red: Tuple[float, float], yellow: Tuple[float, float], goals: float, sensitivity: float,
+                    count: int, seed: np.random.SeedSequence) -> Tally:
+    """Simulate one chunk of matches; runs in a worker process for large batches"""
+    rng = np.random.default_rng(seed)
+    # The sum of normal player performances is itself normal, so draw one value per team
+    difference = rng.normal(red[0], math.sqrt(red[1]), count) - rng.normal(yellow[0], math.sqrt(yellow[1]), count)
+    skew = np.exp(sensitivity * difference / (2 * math.sqrt(red[1] + yellow[1])))
+    red_goals = rng.poisson(goals * skew)
+    yellow_goals = rng.poisson(goals / skew)
+    margin = red_goals - yellow_goals
+    return (int((margin > 0).sum()), int((margin == 0).sum()), int((margin < 0).sum()), int(margin.sum()), count)
+
@@ -0,0 +1,632 @@
+import heapq
+from bisect import bisect_left
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Squads up to this size are searched by enumerating every line-up directly;
+# larger squads switch to meet-in-the-middle over the two halves of the squad.
+ENUMERATION_LIMIT = 16
+
+# Exact search is exponential in the squad size; beyond this it takes seconds.
+EXACT_LIMIT = 32
+
+# Multi-objective search scores every line-up when there are at most this many,
+# otherwise a random sample of this many line-ups.
+MAX_CANDIDATES = 20000
+
+
+def greedy_split(scores: Sequence[float], team_size: int) -> List[int]:
+    """
+    Split players by sorting on score and alternating picks.
+    
+    Args:
+        scores: Score of each player
+        team_size: Number of players in the first team
+    
+    Returns:
+        Indices of the players in the first team, strongest first
+    """
+    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    first_team = order[0::2]
+    second_team = order[1::2]
+    # Odd squads give the extra player to whichever team needs it
+    while len(first_team) > team_size:
+        second_team.append(first_team.pop())
+    while len(first_team) < team_size:
+        first_team.append(second_team.pop())
+    return first_team
+
+
+def exact_split(scores: Sequence[float], team_size: int) -> List[int]:
+    """
+    Find the split with the smallest possible score difference.
+    
+    Args:
+        scores: Score of each player
+        team_size: Number of players in the first team
+    
+    Returns:
+        Indices of the players in the first team, in input order
+    """
+    if not 0 <= team_size <= len(scores):
+        raise ValueError(f"Cannot pick a team of {team_size} from {len(scores)} players")
+    if len(scores) > EXACT_LIMIT:
+        raise ValueError(f"Exact search supports up to {EXACT_LIMIT} players, got {len(scores)}")
+    
+    if len(scores) <= ENUMERATION_LIMIT:
+        return _enumerate_split(scores, team_size)
+    return _meet_in_the_middle_split(scores, team_size)
+
+
+def differencing_partition(scores: Sequence[float], num_teams: int) -> List[List[int]]:
+    """
+    Partition players into teams whose sizes differ by at most one.
+    
+    Uses the balanced largest differencing method (Karmarkar-Karp for several
+    teams of equal size) and then refines the result with pairwise swaps.
+    
+    Args:
+        scores: Score of each player
+        num_teams: Number of teams to create
+    
+    Returns:
+        Indices of the players in each team, one list per team
+    """
+    if num_teams < 1:
+        raise ValueError(f"Number of teams must be at least 1, got {num_teams}")
+    
+    player_count = len(scores)
+    # Pad with zero-score placeholders so every round hands out one player per team
+    padded_count = player_count + (-player_count) % num_teams
+    padded_scores = list(scores) + [0] * (padded_count - player_count)
+    order = sorted(range(padded_count), key=lambda i: padded_scores[i], reverse=True)
+    
+    # Each heap entry is a partial partition: num_teams (total, members) pairs,
+    # heaviest first, keyed on the spread between its heaviest and lightest team
+    heap = []
+    for round_number, start in enumerate(range(0, padded_count, num_teams)):
+        partial = [(padded_scores[i], [i]) for i in order[start:start + num_teams]]
+        heap.append((partial[-1][0] - partial[0][0], round_number, partial))
+    heapq.heapify(heap)
+    
+    counter = len(heap)
+    while len(heap) > 1:
+        _, _, heavier = heapq.heappop(heap)
+        _, _, lighter = heapq.heappop(heap)
+        # Pair the heaviest team of one with the lightest team of the other
+        merged = [
+            (heavier[k][0] + lighter[-1 - k][0], heavier[k][1] + lighter[-1 - k][1])
+            for k in range(num_teams)
+        ]
+        merged.sort(key=lambda team: team[0], reverse=True)
+        heapq.heappush(heap, (merged[-1][0] - merged[0][0], counter, merged))
+        counter += 1
+    
+    teams = [[i for i in members if i < player_count] for _, members in heap[0][2]] if heap else []
+    teams += [[] for _ in range(num_teams - len(teams))]
+    return refine_partition(scores, teams)
+
+
+def refine_partition(scores: Sequence[float], teams: List[List[int]], max_rounds: int = 1000) -> List[List[int]]:
+    """
+    Improve a partition by swapping players between pairs of teams.
+    
+    Each swap moves two teams' totals strictly closer together without
+    leaving the range between them, so team sizes are preserved and the
+    spread never grows.
+    
+    Args:
+        scores: Score of each player
+        teams: Indices of the players in each team
+        max_rounds: Upper bound on the number of swaps
+    
+    Returns:
+        The refined teams
+    """
+    values = np.asarray(scores, dtype=float)
+    members = [np.array(team, dtype=np.intp) for team in teams]
+    totals = [float(values[team].sum()) for team in members]
+    
+    for _ in range(max_rounds):
+        best = None
+        by_total = sorted(range(len(members)), key=lambda k: totals[k], reverse=True)
+        for position, heavy in enumerate(by_total):
+            for light in reversed(by_total[position + 1:]):
+                difference = totals[heavy] - totals[light]
+                if difference <= 0 or not len(members[heavy]) or not len(members[light]):
+                    continue
+                # Swapping i (heavy) with j (light) leaves |difference - 2 * (s_i - s_j)|
+                gains = values[members[heavy]][:, None] - values[members[light]][None, :]
+                remaining = np.abs(difference - 2 * gains)
+                i, j = np.unravel_index(np.argmin(remaining), remaining.shape)
+                if remaining[i, j] < difference - 1e-9:
+                    best = (heavy, light, i, j, float(gains[i, j]))
+                    break
+            if best:
+                break
+        if best is None:
+            break
+        
+        heavy, light, i, j, gain = best
+        members[heavy][i], members[light][j] = members[light][j], members[heavy][i]
+        totals[heavy] -= gain
+        totals[light] += gain
+    
+    return [sorted(team.tolist()) for team in members]
+
+
+def refine_with_pair_penalty(scores: Sequence[float], first_team: Sequence[int], pair_weights: np.ndarray,
+                             penalty: float, max_rounds: int = 1000) -> List[int]:
+    """
+    Trade score balance against repeated pairings by swapping players between two teams.
+    
+    Minimises |difference| + penalty * (pair weights summed over teammates)
+    by repeatedly making the best improving swap. Every player's weight to
+    the other side minus their own is kept up to date, so each candidate
+    swap is scored in O(1) and a round is one vectorised pass over the
+    (first, second) pairs. Team sizes are preserved.
+    
+    Args:
+        scores: Score of each player
+        first_team: Indices of the players in the first team, e.g. from exact_split
+        pair_weights: Symmetric (players, players) array with a zero diagonal
+        penalty: Score difference worth one unit of pair weight
+        max_rounds: Upper bound on the number of swaps
+    
+    Returns:
+        Indices of the players in the refined first team
+    """
+    weights = np.asarray(pair_weights, dtype=float)
+    if penalty <= 0 or not weights.any():
+        return list(first_team)
+    values = np.asarray(scores, dtype=float)
+    sides = -np.ones(len(values))
+    sides[list(first_team)] = 1
+    difference = float(values @ sides)
+    # Sum of w_ij * side_j; flipping i alone changes the penalty by -side_i * pull_i
+    pull = weights @ sides
+    
+    for _ in range(max_rounds):
+        first, second = np.flatnonzero(sides > 0), np.flatnonzero(sides < 0)
+        if not len(first) or not len(second):
+            break
+        differences = difference - 2 * (values[first][:, None] - values[second][None, :])
+        repeats = pull[second][None, :] - pull[first][:, None] - 2 * weights[np.ix_(first, second)]
+        change = np.abs(differences) - abs(difference) + penalty * repeats
+        i, j = np.unravel_index(np.argmin(change), change.shape)
+        if change[i, j] >= -1e-9:
+            break
+        moved_out, moved_in = first[i], second[j]
+        difference = float(differences[i, j])
+        pull -= 2 * (weights[:, moved_out] - weights[:, moved_in])
+        sides[moved_out], sides[moved_in] = -1, 1
+    
+    return np.flatnonzero(sides > 0).tolist()
+
+
+def repeated_pairs(first_team: Sequence[int], pair_weights: np.ndarray) -> int:
+    """Pair weights summed over every pair of teammates, in both teams"""
+    weights = np.asarray(pair_weights)
+    first = np.zeros(len(weights), dtype=bool)
+    first[list(first_team)] = True
+    same_team = first[:, None] == first[None, :]
+    return int(np.triu(weights * same_team, 1).sum())
+
+
+def split_difference(scores: Sequence[float], first_team: Sequence[int]) -> float:
+    """Absolute score difference between a team and the rest of the squad"""
+    first_total = sum(scores[i] for i in first_team)
+    return abs(2 * first_total - sum(scores))
+
+
+def _is_symmetric(player_count: int, team_size: int) -> bool:
+    # With equal team sizes every split appears twice (once per team label),
+    # so the first player can be pinned to the first team.
+    return player_count > 0 and 2 * team_size == player_count
+
+
+def _lower_bound(scores: Sequence[float]) -> float:
+    # Integer scores with an odd total can never do better than 1
+    total = sum(scores)
+    if all(isinstance(score, int) for score in scores):
+        return total % 2
+    return 0
+
+
+def _enumerate_split(scores: Sequence[float], team_size: int) -> List[int]:
+    total = sum(scores)
+    lower_bound = _lower_bound(scores)
+    
+    if _is_symmetric(len(scores), team_size):
+        pinned = (0,)
+        pinned_total = scores[0]
+        candidates = range(1, len(scores))
+        picks = team_size - 1
+    else:
+        pinned = ()
+        pinned_total = 0
+        candidates = range(len(scores))
+        picks = team_size
+    
+    best_team: Tuple[int, ...] = ()
+    best_difference = None
+    for combo in combinations(candidates, picks):
+        team_total = pinned_total
+        for i in combo:
+            team_total += scores[i]
+        difference = abs(2 * team_total - total)
+        if best_difference is None or difference < best_difference:
+            best_difference = difference
+            best_team = combo
+            if difference <= lower_bound:
+                break
+    
+    return list(pinned) + list(best_team)
+
+
+def _subset_sums(scores: Sequence[float]) -> Dict[int, List[Tuple[float, int]]]:
+    """Group the sum of every subset (as a bitmask) by subset size"""
+    sums = [0] * (1 << len(scores))
+    by_size: Dict[int, List[Tuple[float, int]]] = {0: [(0, 0)]}
+    for mask in range(1, 1 << len(scores)):
+        low_bit = mask & -mask
+        sums[mask] = sums[mask ^ low_bit] + scores[low_bit.bit_length() - 1]
+        by_size.setdefault(mask.bit_count(), []).append((sums[mask], mask))
+    return by_size
+
+
+def _meet_in_the_middle_split(scores: Sequence[float], team_size: int) -> List[int]:
+    total = sum(scores)
+    lower_bound = _lower_bound(scores)
+    half = len(scores) // 2
+    left, right = scores[:half], scores[half:]
+    symmetric = _is_symmetric(len(scores), team_size)
+    
+    right_by_size = {}
+    for size, subsets in _subset_sums(right).items():
+        subsets.sort()
+        right_by_size[size] = ([s for s, _ in subsets], [m for _, m in subsets])
+    
+    best = (None, 0, 0)
+    for size, subsets in _subset_sums(left).items():
+        if team_size - size not in right_by_size:
+            continue
+        right_sums, right_masks = right_by_size[team_size - size]
+        for left_sum, left_mask in subsets:
+            if symmetric and not left_mask & 1:
+                continue
+            # The best partner sum is the one closest to total / 2 - left_sum
+            position = bisect_left(right_sums, total / 2 - left_sum)
+            for j in (position - 1, position):
+                if 0 <= j < len(right_sums):
+                    difference = abs(2 * (left_sum + right_sums[j]) - total)
+                    if best[0] is None or difference < best[0]:
+                        best = (difference, left_mask, right_masks[j])
+            if best[0] is not None and best[0] <= lower_bound:
+                break
+        if best[0] is not None and best[0] <= lower_bound:
+            break
+    
+    _, left_mask, right_mask = best
+    first_team = [i for i in range(half) if left_mask >> i & 1]
+    first_team += [half + i for i in range(len(right)) if right_mask >> i & 1]
+    return first_team
+
+
+def candidate_splits(player_count: int, team_size: int, max_candidates: int = MAX_CANDIDATES,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Build a boolean matrix of candidate line-ups, one row per split.
+    
+    Every split is enumerated when there are at most max_candidates of them,
+    otherwise max_candidates distinct random splits are sampled.
+    
+    Args:
+        player_count: Number of players in the squad
+        team_size: Number of players in the first team
+        max_candidates: Upper bound on the number of rows
+        seed: Seed for sampling large squads
+    
+    Returns:
+        Array of shape (candidates, player_count), True where a player is in the first team
+    """
+    symmetric = _is_symmetric(player_count, team_size)
+    if symmetric:
+        total = comb(player_count - 1, team_size - 1)
+    else:
+        total = comb(player_count, team_size)
+    
+    if total <= max_candidates:
+        if symmetric:
+            combos = [(0,) + combo for combo in combinations(range(1, player_count), team_size - 1)]
+        else:
+            combos = list(combinations(range(player_count), team_size))
+        indices = np.array(combos, dtype=np.intp).reshape(len(combos), team_size)
+        sampled = False
+    else:
+        rng = np.random.default_rng(seed)
+        indices = rng.random((max_candidates, player_count)).argsort(axis=1)[:, :team_size]
+        sampled = True
+    
+    candidates = np.zeros((len(indices), player_count), dtype=bool)
+    candidates[np.arange(len(indices))[:, None], indices] = True
+    if symmetric:
+        # Pin the first player to the first team so mirrored splits collapse
+        candidates[~candidates[:, 0]] ^= True
+    if sampled:
+        candidates = candidates[np.sort(_unique_rows(candidates))]
+    return candidates
+
+
+def attribute_imbalance(attributes: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Absolute per-attribute difference between the two teams of every candidate.
+    
+    Args:
+        attributes: Array of shape (players, attributes)
+        candidates: Boolean array of shape (candidates, players)
+    
+    Returns:
+        Array of shape (candidates, attributes)
+    """
+    first_team_totals = candidates.astype(attributes.dtype) @ attributes
+    return np.abs(2 * first_team_totals - attributes.sum(axis=0))
+
+
+def pareto_front(costs: np.ndarray) -> np.ndarray:
+    """
+    Indices of the rows of costs that no other row dominates.
+    
+    A row dominates another when it is no worse on every column and better
+    on at least one. Rows with identical costs are reported once.
+    """
+    remaining = _unique_rows(costs)
+    front = []
+    while len(remaining):
+        # The row with the smallest total cost cannot be dominated by the rest
+        best = remaining[np.argmin(costs[remaining].sum(axis=1))]
+        front.append(best)
+        dominated = np.all(costs[remaining] >= costs[best], axis=1)
+        remaining = remaining[~dominated]
+    return np.array(front, dtype=np.intp)
+
+
+def _unique_rows(matrix: np.ndarray) -> np.ndarray:
+    """Index of the first occurrence of each distinct row of a non-negative integer matrix"""
+    matrix = matrix.astype(np.int64)
+    radix = matrix.max(axis=0, initial=0) + 1
+    if len(matrix) == 0 or np.log2(radix.astype(float)).sum() >= 62:
+        # Too wide to pack each row into a single integer key
+        return np.unique(matrix, axis=0, return_index=True)[1]
+    keys = np.ravel_multi_index(matrix.T, radix)
+    return np.unique(keys, return_index=True)[1]
+
+
+def pareto_splits(attributes: np.ndarray, team_size: int, weights: Optional[Sequence[float]] = None,
+                  max_candidates: int = MAX_CANDIDATES) -> List[Tuple[List[int], np.ndarray, float]]:
+    """
+    Find the Pareto-optimal splits over per-attribute imbalance.
+    
+    Args:
+        attributes: Array of shape (players, attributes)
+        team_size: Number of players in the first team
+        weights: Weight of each attribute used to rank the front (defaults to equal weights)
+        max_candidates: Upper bound on the number of candidate splits scored
+    
+    Returns:
+        List of (first team indices, imbalance per attribute, weighted score), best first
+    """
+    attributes = np.asarray(attributes)
+    if weights is None:
+        weights = np.ones(attributes.shape[1])
+    weights = np.asarray(weights, dtype=float)
+    
+    candidates = candidate_splits(len(attributes), team_size, max_candidates)
+    costs = attribute_imbalance(attributes, candidates)
+    front = pareto_front(costs)
+    ranking = costs[front] @ weights
+    order = np.argsort(ranking, kind="stable")
+    
+    return [
+        (np.flatnonzero(candidates[front[i]]).tolist(), costs[front[i]], float(ranking[i]))
+        for i in order
+    ]
+
+
+def top_k_splits(scores: Sequence[float], team_size: int, k: int,
+                 together: Sequence[Tuple[int, int]] = (), apart: Sequence[Tuple[int, int]] = (),
+                 pinned: Optional[Dict[int, int]] = None,
+                 previous: Sequence[Dict[int, int]] = (), min_distance: int = 0,
+                 tolerance: float = 0) -> List[Tuple[List[int], float]]:
+    """
+    Find the k splits with the smallest score difference that satisfy every constraint.
+    
+    One branch-and-bound pass finds them all: players are assigned strongest
+    first, the k best complete splits so far are kept in a bounded heap, and
+    a branch is dropped as soon as its best possible difference cannot beat
+    the worst of them.
+    
+    Args:
+        scores: Score of each player
+        team_size: Number of players in the first team
+        k: Number of splits to return
+        together: Pairs of players who must be on the same team
+        apart: Pairs of players who must be on opposite teams
+        pinned: Team (0 for the first, 1 for the second) for players who must play on a given team
+        previous: Earlier line-ups, each mapping player to team, for players in this squad
+        min_distance: Minimum players who must change team compared with every earlier line-up,
+            whichever way round its team colours are matched
+        tolerance: Stop once k splits are within this difference; with fractional scores, such as
+            ratings, an exact search for the k smallest differences is exponential
+    
+    Returns:
+        Up to k (first team indices, score difference) pairs, smallest difference first
+    
+    Raises:
+        ValueError: If the squad is too large or the constraints contradict each other
+    """
+    player_count = len(scores)
+    if not 0 <= team_size <= player_count:
+        raise ValueError(f"Cannot pick a team of {team_size} from {player_count} players")
+    if player_count > EXACT_LIMIT:
+        raise ValueError(f"Top-k search supports up to {EXACT_LIMIT} players, got {player_count}")
+    if k < 1:
+        return []
+    pinned = pinned or {}
+    
+    blocks = _constraint_blocks(player_count, together, apart, pinned)
+    # Strongest blocks first, so the bound tightens early
+    blocks.sort(key=lambda block: -sum(scores[player] for player, _ in block[0]))
+    
+    # Per block and orientation: players in the first team, score difference it adds, and for
+    # each earlier line-up how many of its players stay on / change team
+    options = []
+    for members, orientation in blocks:
+        choices = []
+        for flip in ((orientation,) if orientation is not None else (0, 1)):
+            sides = [(player, side ^ flip) for player, side in members]
+            first = [player for player, side in sides if side == 0]
+            difference = sum(scores[player] if side == 0 else -scores[player] for player, side in sides)
+            changes = [
+                (sum(1 for player, side in sides if player in lineup and lineup[player] == side),
+                 sum(1 for player, side in sides if player in lineup and lineup[player] != side))
+                for lineup in previous
+            ]
+            choices.append((first, difference, changes))
+        options.append(choices)
+    
+    # Bound on the difference still reachable: the remaining players taken one by one, largest first
+    remaining_scores = []
+    for depth in range(len(blocks) + 1):
+        rest = sorted((scores[player] for members, _ in blocks[depth:] for player, _ in members), reverse=True)
+        prefix = [0]
+        for score in rest:
+            prefix.append(prefix[-1] + score)
+        remaining_scores.append(prefix)
+    remaining_in_lineup = [
+        [sum(1 for members, _ in blocks[depth:] for player, _ in members if player in lineup) for lineup in previous]
+        for depth in range(len(blocks) + 1)
+    ]
+    
+    # Mirrored line-ups are the same split when nobody is pinned and the teams are the same size
+    if _is_symmetric(player_count, team_size) and all(orientation is None for _, orientation in blocks):
+        options[0] = options[0][:1]
+    
+    floor = max(_lower_bound(scores), tolerance)
+    heap: List[Tuple[float, int, Tuple[int, ...]]] = []
+    counter = 0
+    
+    def bound(depth: int, first_count: int, difference: float) -> Optional[float]:
+        prefix = remaining_scores[depth]
+        needed = team_size - first_count
+        if not 0 <= needed <= len(prefix) - 1:
+            return None
+        total = prefix[-1]
+        # The first team takes between the smallest and largest `needed` remaining scores
+        low, high = total - prefix[len(prefix) - 1 - needed], prefix[needed]
+        best_share = (total - difference) / 2
+        if low <= best_share <= high:
+            return 0
+        return min(abs(difference - total + 2 * low), abs(difference - total + 2 * high))
+    
+    def distance_reachable(depth: int, counts: List[Tuple[int, int]]) -> bool:
+        for (same, changed), left in zip(counts, remaining_in_lineup[depth]):
+            # Best case for min(same, changed) once the remaining players are placed
+            if changed + left <= same:
+                best = changed + left
+            elif same + left <= changed:
+                best = same + left
+            else:
+                best = (same + changed + left) // 2
+            if best < min_distance:
+                return False
+        return True
+    
+    def search(depth: int, first: List[int], first_count: int, difference: float,
+               counts: List[Tuple[int, int]]) -> bool:
+        # Returns True once nothing better than the heap can exist
+        nonlocal counter
+        if depth == len(blocks):
+            if first_count != team_size:
+                return False
+            cost = abs(difference)
+            if len(heap) < k:
+                heapq.heappush(heap, (-cost, -counter, tuple(sorted(first))))
+            elif cost < -heap[0][0]:
+                heapq.heapreplace(heap, (-cost, -counter, tuple(sorted(first))))
+            counter += 1
+            return len(heap) == k and -heap[0][0] <= floor
+        
+        children = []
+        for block_first, block_difference, changes in options[depth]:
+            child_count = first_count + len(block_first)
+            child_difference = difference + block_difference
+            child_bound = bound(depth + 1, child_count, child_difference)
+            if child_bound is None or (len(heap) == k and child_bound >= -heap[0][0]):
+                continue
+            child_counts = [(same + s, changed + c) for (same, changed), (s, c) in zip(counts, changes)]
+            if min_distance and not distance_reachable(depth + 1, child_counts):
+                continue
+            children.append((child_bound, abs(child_difference), block_first, child_count, child_difference,
+                             child_counts))
+        # Most promising branch first
+        children.sort(key=lambda child: child[:2])
+        for child_bound, _, block_first, child_count, child_difference, child_counts in children:
+            if len(heap) == k and child_bound >= -heap[0][0]:
+                continue
+            if search(depth + 1, first + block_first, child_count, child_difference, child_counts):
+                return True
+        return False
+    
+    search(0, [], 0, 0, [(0, 0)] * len(previous))
+    return [(list(team), cost) for cost, _, team in sorted((-cost, -order, team) for cost, order, team in heap)]
+
+
+def _constraint_blocks(player_count: int, together: Sequence[Tuple[int, int]], apart: Sequence[Tuple[int, int]],
+                       pinned: Dict[int, int]) -> List[Tuple[List[Tuple[int, int]], Optional[int]]]:
+    """
+    Group players whose teams depend on each other.
+    
+    Returns:
+        List of (members as (player, side relative to the block), fixed orientation or None)
+    """
+    parent = list(range(player_count))
+    parity = [0] * player_count  # Side relative to the parent
+    
+    def find(player: int) -> Tuple[int, int]:
+        side = 0
+        while parent[player] != player:
+            side ^= parity[player]
+            player = parent[player]
+        return player, side
+    
+    for pairs, relation in ((together, 0), (apart, 1)):
+        for a, b in pairs:
+            if a == b:
+                raise ValueError("A pair needs two different players")
+            (root_a, side_a), (root_b, side_b) = find(a), find(b)
+            if root_a == root_b:
+                if side_a ^ side_b != relation:
+                    raise ValueError("The together and apart constraints contradict each other")
+                continue
+            parent[root_b] = root_a
+            parity[root_b] = side_a ^ side_b ^ relation
+    
+    members: Dict[int, List[Tuple[int, int]]] = {}
+    for player in range(player_count):
+        root, side = find(player)
+        members.setdefault(root, []).append((player, side))
+    
+    orientation: Dict[int, int] = {}
+    for player, team in pinned.items():
+        if team not in (0, 1):
+            raise ValueError(f"Pinned team must be 0 or 1, got {team}")
+        root, side = find(player)
+        if orientation.setdefault(root, team ^ side) != team ^ side:
+            raise ValueError("The pinned players contradict the together and apart constraints")
+    
+    return [(block, orientation.get(root)) for root, block in members.items()]
@@ -1,57 +1,359 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
 from app.models.player import Player
 from app.models.game import Team
+from app.services.split_search import (
+    greedy_split, exact_split, pareto_splits, differencing_partition, top_k_splits, refine_with_pair_penalty
+)
+from app.services import metrics
+from app.services.balance_cache import BalanceCache
+from app.services.rating import RatingEngine
+from app.services.recent_pairs import RecentPairs
+from app.services.roster import ATTRIBUTES, Roster
+
+
+# Available balancing strategies:
+#   greedy - sort by total skill and alternate picks (fast, approximate)
+#   exact  - search for the split with the smallest total skill difference
+#   pareto - balance every attribute at once, ranked by attribute weights
+#   differencing - Karmarkar-Karp differencing plus swap refinement (scales to large squads)
+STRATEGIES = ("greedy", "exact", "pareto", "differencing")
+
+# Bibs available for extra pitches; further teams are numbered
+TEAM_NAMES = ("Red", "Yellows", "Blues", "Greens", "Whites", "Blacks")
+
+# Where player scores come from:
+#   attributes - sum of the hand-edited 1-10 attributes
+#   rating     - rating mean learned from recorded games
+SCORE_SOURCES = ("attributes", "rating")
+
+# Rating means are fractional, so top-k search stops at splits this close instead of the exact best
+RATING_TOLERANCE = 0.5
 
 
 class TeamBalancer:
-    """Service for balancing players into two teams"""
+    """Service for balancing players into teams"""
+    
+    def __init__(self, strategy: str = "greedy", weights: Optional[Dict[str, float]] = None,
+                 cache: Optional[BalanceCache] = None, score_source: str = "attributes",
+                 ratings: Optional[RatingEngine] = None, history: Optional[RecentPairs] = None,
+                 repeat_penalty: float = 0.0):
+        """
+        Args:
+            strategy: One of STRATEGIES
+            weights: Attribute weights for the pareto strategy, 1.0 when missing
+            cache: Cache shared between balancers for repeated requests
+            score_source: One of SCORE_SOURCES
+            ratings: Rating engine, needed for the rating score source
+            history: Recent teammate counts, needed for a repeat penalty
+            repeat_penalty: Score difference worth accepting to avoid one recent
+                game together for one pair of teammates; 0 ignores history
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy '{strategy}', expected one of: {', '.join(STRATEGIES)}")
+        if score_source not in SCORE_SOURCES:
+            raise ValueError(f"Unknown score source '{score_source}', expected one of: {', '.join(SCORE_SOURCES)}")
+        if score_source == "rating" and ratings is None:
+            raise ValueError("The rating score source needs a rating engine")
+        if score_source == "rating" and strategy == "pareto":
+            raise ValueError("The pareto strategy balances attributes and cannot use ratings")
+        if repeat_penalty < 0:
+            raise ValueError(f"Expected a non-negative repeat penalty, got {repeat_penalty}")
+        if repeat_penalty and history is None:
+            raise ValueError("A repeat penalty needs the recent game history")
+        if repeat_penalty and strategy == "pareto":
+            raise ValueError("The pareto strategy cannot penalise repeated teammates")
+        weights = weights or {}
+        unknown = set(weights) - set(ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown attribute weights: {', '.join(sorted(unknown))}")
+        self.strategy = strategy
+        self.weights = [float(weights.get(attribute, 1.0)) for attribute in ATTRIBUTES]
+        self.cache = cache
+        self.score_source = score_source
+        self.ratings = ratings
+        self.history = history
+        self.repeat_penalty = repeat_penalty
     
     def balance_teams(self, players: List[Player]) -> Tuple[Team, Team]:
         """
-        Balance available players into two teams of equal size.
+        Balance available players into two teams whose sizes differ by at most one.
+        
+        With a repeat penalty, the strategy's split is then refined by swaps
+        that split up pairs who were teammates in recent games, as long as
+        the balance lost is worth less than the penalty saved.
         
         Args:
             players: List of all players
-            
+        
+        Returns:
+            Tuple of (red_team, yellow_team)
+        """
+        return self._cached("balance", lambda: BalanceCache.snapshot(players),
+                            lambda: self._balance_teams(players))
+    
+    def balance_roster(self, roster: Roster, ids: np.ndarray) -> Tuple[Team, Team]:
+        """
+        Balance stored players into two teams, reading their attributes from the roster's columns.
+        
+        Every given player is picked, whatever their availability flag. Results
+        are shared with balance_teams through the cache.
+        
+        Args:
+            roster: Roster holding the players
+            ids: Roster ids of the players to split
+        
         Returns:
             Tuple of (red_team, yellow_team)
         """
-        # Filter only available players
+        self._team_size(len(ids))
+        return self._cached("balance", lambda: roster.snapshot(ids), lambda: self._balance_roster(roster, ids))
+    
+    def _balance_teams(self, players: List[Player]) -> Tuple[Team, Team]:
         available_players = [player for player in players if player.available]
+        names = [player.name for player in available_players]
+        return self._split_two(available_players, self.attribute_matrix(available_players), names)
+    
+    def _balance_roster(self, roster: Roster, ids: np.ndarray) -> Tuple[Team, Team]:
+        names = [roster.index.names[player_id] for player_id in ids.tolist()]
+        return self._split_two(roster.players(ids), roster.attribute_matrix(ids), names)
+    
+    @metrics.timed(metrics.BALANCE_SECONDS, label_of=lambda self, *args: (self.strategy,))
+    def _split_two(self, players: List[Player], matrix: np.ndarray, names: List[str]) -> Tuple[Team, Team]:
+        team_size = self._team_size(len(players))
+        metrics.record_search_space(self.strategy, len(players), team_size)
         
-        # Determine team size based on number of available players
-        if len(available_players) == 10:
-            team_size = 5
-        elif len(available_players) == 12:
-            team_size = 6
+        if self.strategy == "pareto":
+            red_indices = pareto_splits(matrix, team_size, self.weights)[0][0]
         else:
-            raise ValueError(f"Expected 10 or 12 available players, got {len(available_players)}")
-        
-        # Calculate total skill score for each player
-        player_scores = []
-        for player in available_players:
-            total_score = (player.attributes.attacking + 
-                          player.attributes.defending + 
-                          player.attributes.goalkeeping + 
-                          player.attributes.energy)
-            player_scores.append((player, total_score))
-        
-        # Sort players by skill score (highest first)
-        player_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # Simple alternating distribution: Red gets 1st, 3rd, 5th, 7th, 9th
-        # Yellow gets 2nd, 4th, 6th, 8th, 10th
-        red_players = []
-        yellow_players = []
-        
-        for i, (player, score) in enumerate(player_scores):
-            if i % 2 == 0:  # Even indices (0, 2, 4, 6, 8) go to Red
-                red_players.append(player)
-            else:  # Odd indices (1, 3, 5, 7, 9) go to Yellow
-                yellow_players.append(player)
+            # Calculate total skill score for each player
+            scores = self._scores(matrix, names)
+            if self.strategy == "exact":
+                red_indices = exact_split(scores, team_size)
+            elif self.strategy == "differencing":
+                # Either half may come out the larger; Red takes the extra player
+                red_indices = next(part for part in differencing_partition(scores, 2) if len(part) == team_size)
+            else:
+                red_indices = greedy_split(scores, team_size)
+            if self.repeat_penalty:
+                red_indices = refine_with_pair_penalty(scores, red_indices, self.history.weights(names),
+                                                       self.repeat_penalty)
+                if self.strategy == "greedy":
+                    red_indices.sort(key=lambda i: scores[i], reverse=True)
+        
+        red_team, yellow_team = self._build_teams(players, red_indices)
+        if self.strategy == "greedy":
+            # Keep the strongest-first ordering of the alternating distribution
+            score_of = dict(zip(names, scores))
+            yellow_team.players.sort(key=lambda player: score_of[player.name], reverse=True)
+        
+        return red_team, yellow_team
+    
+    def pareto_front(self, players: List[Player]) -> List[Dict[str, Any]]:
+        """
+        Find every split that cannot be improved on one attribute without
+        getting worse on another.
+        
+        Args:
+            players: List of all players
+        
+        Returns:
+            List of candidate splits ranked by weighted imbalance (best first), each with
+            red_team, yellow_team, imbalance (per attribute) and score
+        """
+        available_players = [player for player in players if player.available]
+        return self._pareto_front(available_players, self.attribute_matrix(available_players))
+    
+    def pareto_front_roster(self, roster: Roster, ids: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Find the Pareto front of stored players, reading their attributes from the roster's columns.
+        
+        Every given player is picked, whatever their availability flag, as in balance_roster.
+        
+        Args:
+            roster: Roster holding the players
+            ids: Roster ids of the players to split
+        
+        Returns:
+            List of candidate splits shaped like those from pareto_front
+        """
+        return self._pareto_front(roster.players(ids), roster.attribute_matrix(ids))
+    
+    @metrics.timed(metrics.BALANCE_SECONDS, "pareto_front")
+    def _pareto_front(self, players: List[Player], matrix: np.ndarray) -> List[Dict[str, Any]]:
+        team_size = self._team_size(len(players))
+        metrics.record_search_space("pareto_front", len(players), team_size)
+        front = []
+        for red_indices, imbalance, score in pareto_splits(matrix, team_size, self.weights):
+            red_team, yellow_team = self._build_teams(players, red_indices)
+            front.append({
+                "red_team": red_team,
+                "yellow_team": yellow_team,
+                "imbalance": dict(zip(ATTRIBUTES, imbalance.tolist())),
+                "score": score
+            })
+        return front
+    
+    def top_splits(self, players: List[Player], k: int = 5, together: Sequence[Tuple[str, str]] = (),
+                   apart: Sequence[Tuple[str, str]] = (), pinned: Optional[Dict[str, str]] = None,
+                   previous: Sequence[Tuple[List[str], List[str]]] = (), min_distance: int = 0) -> List[Dict[str, Any]]:
+        """
+        Find the k best different splits of the available players, subject to constraints.
+        
+        Uses the top-k search whatever the configured strategy.
+        
+        Args:
+            players: List of all players
+            k: Number of splits to return
+            together: Pairs of player names who must be on the same team
+            apart: Pairs of player names who must be on opposite teams
+            pinned: Team name (Red or Yellows) for players who must play for that team
+            previous: Earlier line-ups as (red names, yellow names), e.g. recent games
+            min_distance: Minimum players who must change team compared with every earlier line-up
+        
+        Returns:
+            Up to k splits with red_team, yellow_team and difference, most balanced first
+        """
+        pinned = pinned or {}
+        params = (k, tuple(sorted(together)), tuple(sorted(apart)), tuple(sorted(pinned.items())),
+                  tuple((tuple(red), tuple(yellow)) for red, yellow in previous), min_distance)
+        return self._cached("top", lambda: BalanceCache.snapshot(players),
+                            lambda: self._top_splits(players, k, together, apart, pinned, previous, min_distance),
+                            *params)
+    
+    @metrics.timed(metrics.BALANCE_SECONDS, "top")
+    def _top_splits(self, players: List[Player], k: int, together: Sequence[Tuple[str, str]],
+                    apart: Sequence[Tuple[str, str]], pinned: Dict[str, str],
+                    previous: Sequence[Tuple[List[str], List[str]]], min_distance: int) -> List[Dict[str, Any]]:
+        available_players = [player for player in players if player.available]
+        team_size = self._team_size(len(available_players))
+        metrics.record_search_space("top", len(available_players), team_size)
+        names = [player.name for player in available_players]
+        position = {name: i for i, name in enumerate(names)}
+        
+        def index_of(name: str) -> int:
+            if name not in position:
+                raise ValueError(f"'{name}' is not an available player")
+            return position[name]
+        
+        sides = {name: team for team, name in enumerate(TEAM_NAMES[:2])}
+        unknown_teams = set(pinned.values()) - set(sides)
+        if unknown_teams:
+            raise ValueError(f"Players can only be pinned to {' or '.join(TEAM_NAMES[:2])}")
+        lineups = [
+            {position[name]: team for team, side in enumerate((red, yellow)) for name in side if name in position}
+            for red, yellow in previous
+        ]
+        # A game without enough of these players cannot be repeated, and no split could differ from it enough
+        lineups = [lineup for lineup in lineups if len(lineup) >= 2 * min_distance]
+        
+        splits = top_k_splits(
+            self._scores(self.attribute_matrix(available_players), names), team_size, k,
+            together=[(index_of(a), index_of(b)) for a, b in together],
+            apart=[(index_of(a), index_of(b)) for a, b in apart],
+            pinned={index_of(name): sides[team] for name, team in pinned.items()},
+            previous=lineups, min_distance=min_distance,
+            tolerance=RATING_TOLERANCE if self.score_source == "rating" else 0
+        )
+        results = []
+        for red_indices, difference in splits:
+            red_team, yellow_team = self._build_teams(available_players, red_indices)
+            results.append({"red_team": red_team, "yellow_team": yellow_team, "difference": difference})
+        return results
+    
+    def partition_teams(self, players: List[Player], num_teams: int) -> List[Team]:
+        """
+        Balance available players into any number of teams, e.g. one pair per pitch.
+        
+        Team sizes differ by at most one. Large squads are handled with the
+        differencing strategy regardless of the configured strategy.
+        
+        Args:
+            players: List of all players
+            num_teams: Number of teams to create
+        
+        Returns:
+            List of teams
+        """
+        if num_teams < 2:
+            raise ValueError(f"Expected at least 2 teams, got {num_teams}")
+        return self._cached("partition", lambda: BalanceCache.snapshot(players),
+                            lambda: self._partition_teams(players, num_teams), num_teams)
+    
+    @metrics.timed(metrics.BALANCE_SECONDS, "partition")
+    def _partition_teams(self, players: List[Player], num_teams: int) -> List[Team]:
+        available_players = [player for player in players if player.available]
+        if len(available_players) < num_teams:
+            raise ValueError(f"Expected at least {num_teams} available players, got {len(available_players)}")
+        
+        if num_teams == 2 and self.strategy != "differencing":
+            return list(self.balance_teams(available_players))
+        
+        scores = self._scores(self.attribute_matrix(available_players), [player.name for player in available_players])
+        return [
+            Team(name=self.team_name(k), players=[available_players[i] for i in indices])
+            for k, indices in enumerate(differencing_partition(scores, num_teams))
+        ]
+    
+    @staticmethod
+    def team_name(index: int) -> str:
+        """Bib colour for the team at the given position"""
+        return TEAM_NAMES[index] if index < len(TEAM_NAMES) else f"Team {index + 1}"
+    
+    @staticmethod
+    def player_score(player: Player) -> int:
+        """Total skill score of a player"""
+        return (player.attributes.attacking +
+                player.attributes.defending +
+                player.attributes.goalkeeping +
+                player.attributes.energy)
+    
+    @staticmethod
+    def attribute_matrix(players: List[Player]) -> np.ndarray:
+        """Player attributes as an array of shape (players, attributes)"""
+        return np.array([
+            [getattr(player.attributes, attribute) for attribute in ATTRIBUTES]
+            for player in players
+        ], dtype=np.int64).reshape(len(players), len(ATTRIBUTES))
+    
+    def _cached(self, kind: str, snapshot, compute, *params):
+        # Results are shared between callers through the cache, so treat them as read-only
+        if self.cache is None:
+            return compute()
+        if self.score_source == "rating":
+            # Ratings move with every recorded game
+            params += (self.score_source, self.ratings.version)
+        if self.repeat_penalty:
+            # So do recent teammates
+            params += (self.repeat_penalty, self.history.version)
+        key = self.cache.snapshot_key(snapshot(), kind, self.strategy, tuple(self.weights), *params)
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return result
+    
+    def _scores(self, matrix: np.ndarray, names: List[str]) -> List[float]:
+        if self.score_source == "rating":
+            return self.ratings.scores(names)
+        # Plain ints, so the exact search can rely on integer totals
+        return matrix.sum(axis=1).tolist()
+    
+    @staticmethod
+    def _team_size(player_count: int) -> int:
+        if player_count < 2:
+            raise ValueError(f"Expected at least 2 available players, got {player_count}")
+        # Red takes the extra player when the count is odd
+        return (player_count + 1) // 2
+    
+    @staticmethod
+    def _build_teams(players: List[Player], red_indices: List[int]) -> Tuple[Team, Team]:
+        red_set = set(red_indices)
+        red_players = [players[i] for i in red_indices]
+        yellow_players = [player for i, player in enumerate(players) if i not in red_set]
         
         # Create teams
         red_team = Team(name="Red", players=red_players)
         yellow_team = Team(name="Yellows", players=yellow_players)
         
-        return red_team, yellow_team 
\ No newline at end of file
+        return red_team, yellow_team
@@ -0,0 +1,72 @@
+import os
+from typing import Mapping, NamedTuple, Optional
+from app.services.database import DEFAULT_DB_PATH
+
+
+DEFAULT_LEAGUES_DIR = "leagues"
+DEFAULT_MAX_OPEN_LEAGUES = 16
+DEFAULT_LEAGUE_IDLE_SECONDS = 300.0
+
+
+class Settings(NamedTuple):
+    """Server configuration, normally read from FOOTBALL_* environment variables"""
+    db_path: str = DEFAULT_DB_PATH
+    # Server processes sharing the database; above 1 each reloads its in-memory state after the others' writes
+    workers: int = 1
+    # Simulator processes for large batches, default one per CPU
+    simulator_processes: Optional[int] = None
+    # One SQLite file per league, <league>.db, in this directory
+    leagues_dir: str = DEFAULT_LEAGUES_DIR
+    # Leagues kept open at once; the least recently used is closed past this
+    max_open_leagues: int = DEFAULT_MAX_OPEN_LEAGUES
+    # Seconds a league may go unused before it is closed
+    league_idle_seconds: float = DEFAULT_LEAGUE_IDLE_SECONDS
+    
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        """
+        Read settings from the environment, using the defaults for anything unset.
+        
+        Raises:
+            ValueError: If a number is malformed or out of range
+        """
+        workers = _int(environ, "FOOTBALL_WORKERS", 1)
+        processes = _int(environ, "FOOTBALL_SIMULATOR_PROCESSES", None)
+        max_open = _int(environ, "FOOTBALL_MAX_OPEN_LEAGUES", DEFAULT_MAX_OPEN_LEAGUES)
+        idle_seconds = _float(environ, "FOOTBALL_LEAGUE_IDLE_SECONDS", DEFAULT_LEAGUE_IDLE_SECONDS)
+        if workers < 1:
+            raise ValueError(f"FOOTBALL_WORKERS must be at least 1, got {workers}")
+        if processes is not None and processes < 1:
+            raise ValueError(f"FOOTBALL_SIMULATOR_PROCESSES must be at least 1, got {processes}")
+        if max_open < 1:
+            raise ValueError(f"FOOTBALL_MAX_OPEN_LEAGUES must be at least 1, got {max_open}")
+        if idle_seconds <= 0:
+            raise ValueError(f"FOOTBALL_LEAGUE_IDLE_SECONDS must be positive, got {idle_seconds}")
+        return cls(
+            db_path=environ.get("FOOTBALL_DB_PATH") or DEFAULT_DB_PATH,
+            workers=workers,
+            simulator_processes=processes,
+            leagues_dir=environ.get("FOOTBALL_LEAGUES_DIR") or DEFAULT_LEAGUES_DIR,
+            max_open_leagues=max_open,
+            league_idle_seconds=idle_seconds
+        )
+
+
+def _int(environ: Mapping[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+
+
+def _float(environ: Mapping[str, str], name: str, default: float) -> float:
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
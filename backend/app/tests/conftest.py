@@ -0,0 +1,14 @@
+import os
+import shutil
+import tempfile
+
+# The app reads its settings when app.main is first imported, so point the
+# database and leagues at a scratch directory before any test module does:
+# the tests never touch the repository's football_teams.db
+_directory = tempfile.mkdtemp(prefix="football-tests-")
+os.environ["FOOTBALL_DB_PATH"] = os.path.join(_directory, "football_teams.db")
+os.environ["FOOTBALL_LEAGUES_DIR"] = os.path.join(_directory, "leagues")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_directory, ignore_errors=True)
@@ -1,6 +1,18 @@
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
 import pytest
 from fastapi.testclient import TestClient
+from app import main
 from app.main import app
+from app.services import events, metrics, profiler
+from app.services.executor import BoundedExecutor
+from app.settings import Settings
 
 client = TestClient(app)
 
@@ -38,6 +50,110 @@ class TestPlayerAPI:
         # Assert
         assert response.status_code == 200
         assert isinstance(response.json(), list)
+    
+    def test_bulk_import_players_as_json_and_csv(self):
+        """Test importing a batch of players from a JSON array and from CSV"""
+        # Arrange
+        prefix = uuid.uuid4().hex
+        players = [
+            {"name": f"{prefix} json {i}", "attributes": {"attacking": 5, "defending": 6, "goalkeeping": 3, "energy": 8}}
+            for i in range(3)
+        ]
+        csv_body = (
+            "name,attacking,defending,goalkeeping,energy,available\n"
+            f"{prefix} csv 0,7,6,3,8,false\n"
+            f"{prefix} csv 1,4,4,4,4,\n"
+        )
+        
+        # Act
+        json_response = client.post("/players/bulk", json=players)
+        csv_response = client.post("/players/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+        
+        # Assert
+        assert json_response.json() == {"saved": 3}
+        assert csv_response.json() == {"saved": 2}
+        imported = {p["name"]: p for p in client.get("/players/").json() if p["name"].startswith(prefix)}
+        assert len(imported) == 5
+        assert imported[f"{prefix} csv 0"]["available"] is False
+        assert imported[f"{prefix} csv 1"]["available"] is True
+    
+    def test_bulk_import_reports_every_invalid_row(self):
+        """Test that a batch with invalid rows is rejected as a whole"""
+        # Arrange
+        name = uuid.uuid4().hex
+        body = "\n".join(json.dumps(row) for row in [
+            {"name": name, "attributes": {"attacking": 5, "defending": 6, "goalkeeping": 3, "energy": 8}},
+            {"name": "Too good", "attributes": {"attacking": 11, "defending": 6, "goalkeeping": 3, "energy": 8}},
+            {"name": "No attributes"}
+        ])
+        
+        # Act
+        response = client.post("/players/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        
+        # Assert
+        assert response.status_code == 422
+        errors = response.json()["detail"]
+        assert [(e["row"], e["field"]) for e in errors] == [(1, "attributes.attacking"), (2, "attributes")]
+        assert all(p["name"] != name for p in client.get("/players/").json())
+    
+    def test_update_availability_in_bulk(self):
+        """Test setting availability for several players at once"""
+        # Arrange
+        prefix = uuid.uuid4().hex
+        client.post("/players/bulk", json=[
+            {"name": f"{prefix} {i}", "attributes": {"attacking": 5, "defending": 6, "goalkeeping": 3, "energy": 8}}
+            for i in range(2)
+        ])
+        
+        # Act
+        response = client.patch("/players/availability", json=[
+            {"name": f"{prefix} 0", "available": False},
+            {"name": f"{prefix} ghost", "available": False}
+        ])
+        
+        # Assert
+        assert response.json() == {"updated": 1, "missing": [f"{prefix} ghost"]}
+        available = {p["name"]: p["available"] for p in client.get("/players/").json() if p["name"].startswith(prefix)}
+        assert available == {f"{prefix} 0": False, f"{prefix} 1": True}
+    
+    def test_export_players(self):
+        """Test streaming every player as NDJSON and CSV"""
+        # Act
+        ndjson = client.get("/players/export")
+        csv_export = client.get("/players/export", params={"format": "csv"})
+        
+        # Assert
+        players = client.get("/players/").json()
+        assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+        assert sorted(json.loads(line)["name"] for line in ndjson.text.splitlines()) == sorted(p["name"] for p in players)
+        lines = csv_export.text.splitlines()
+        assert lines[0] == "name,attacking,defending,goalkeeping,energy,available"
+        assert len(lines) == len(players) + 1
+    
+    
+    def test_get_players_revalidates_with_etag(self):
+        """Test that an unchanged player list returns 304 and a write changes the ETag"""
+        # Arrange
+        first = client.get("/players/")
+        etag = first.headers["etag"]
+        
+        # Act
+        unchanged = client.get("/players/", headers={"If-None-Match": etag})
+        by_date = client.get("/players/", headers={"If-Modified-Since": first.headers["last-modified"]})
+        client.post("/players/", json={
+            "name": uuid.uuid4().hex,
+            "attributes": {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}
+        })
+        changed = client.get("/players/", headers={"If-None-Match": etag})
+        
+        # Assert
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert unchanged.headers["etag"] == etag
+        assert by_date.status_code == 304
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()) == len(first.json()) + 1
 
 
 class TestTeamBalancingAPI:
@@ -69,6 +185,287 @@ class TestTeamBalancingAPI:
         assert "yellow_team" in data
         assert len(data["red_team"]["players"]) == 5
         assert len(data["yellow_team"]["players"]) == 5
+    
+    def test_balance_teams_with_exact_strategy(self):
+        """Test balancing teams with the exact strategy"""
+        # Arrange
+        players_data = [
+            {
+                "name": f"Player {i}",
+                "attributes": {
+                    "attacking": 1 + i % 10,
+                    "defending": 6,
+                    "goalkeeping": 3,
+                    "energy": 8
+                }
+            }
+            for i in range(1, 13)  # 12 players
+        ]
+        
+        # Act
+        response = client.post("/teams/balance", json={"players": players_data, "strategy": "exact"})
+        
+        # Assert
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["red_team"]["players"]) == 6
+        assert len(data["yellow_team"]["players"]) == 6
+    
+    def test_balance_teams_with_pareto_strategy(self):
+        """Test that the pareto strategy returns the ranked front alongside the best split"""
+        # Arrange
+        players_data = [
+            {
+                "name": f"Player {i}",
+                "attributes": {
+                    "attacking": 1 + i % 10,
+                    "defending": 1 + (i * 3) % 10,
+                    "goalkeeping": 1 + (i * 7) % 10,
+                    "energy": 8
+                }
+            }
+            for i in range(1, 11)  # 10 players
+        ]
+        
+        # Act
+        response = client.post("/teams/balance", json={
+            "players": players_data,
+            "strategy": "pareto",
+            "weights": {"goalkeeping": 2.0}
+        })
+        
+        # Assert
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["red_team"]["players"]) == 5
+        assert len(data["pareto_front"]) >= 1
+        assert set(data["pareto_front"][0]["imbalance"]) == {"attacking", "defending", "goalkeeping", "energy"}
+    
+    def test_balance_teams_with_unknown_strategy(self):
+        """Test that an unknown strategy is rejected"""
+        # Act
+        response = client.post("/teams/balance", json={"players": [], "strategy": "coin-toss"})
+        
+        # Assert
+        assert response.status_code == 400
+    
+    def test_balance_teams_with_rating_score_source(self):
+        """Test balancing teams on learned ratings"""
+        # Arrange
+        players_data = [
+            {"name": f"Rated {i}", "attributes": {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}}
+            for i in range(6)
+        ]
+        
+        # Act
+        response = client.post("/teams/balance", json={"players": players_data, "score_source": "rating"})
+        rejected = client.post("/teams/balance", json={"players": players_data, "score_source": "vibes"})
+        
+        # Assert
+        assert response.status_code == 200
+        assert len(response.json()["red_team"]["players"]) == 3
+        assert rejected.status_code == 400
+    
+    def test_partition_teams(self):
+        """Test splitting players across several teams"""
+        # Arrange
+        players_data = [
+            {
+                "name": f"Player {i}",
+                "attributes": {
+                    "attacking": 1 + i % 10,
+                    "defending": 6,
+                    "goalkeeping": 3,
+                    "energy": 8
+                }
+            }
+            for i in range(1, 19)  # 18 players
+        ]
+        
+        # Act
+        response = client.post("/teams/partition", json={"players": players_data, "num_teams": 3})
+        
+        # Assert
+        assert response.status_code == 200
+        teams = response.json()["teams"]
+        assert len(teams) == 3
+        assert [len(team["players"]) for team in teams] == [6, 6, 6]
+    
+    def test_balance_stored_players_by_name(self):
+        """Test balancing stored players from their names alone"""
+        # Arrange
+        prefix = uuid.uuid4().hex
+        players = [
+            {"name": f"{prefix} {i}", "attributes": {"attacking": 1 + i, "defending": 5, "goalkeeping": 5, "energy": 5},
+             "available": i != 0}
+            for i in range(6)
+        ]
+        client.post("/players/bulk", json=players)
+        names = [player["name"] for player in players]
+        
+        # Act
+        response = client.post("/teams/balance/available", json={"names": names, "strategy": "exact"})
+        pareto = client.post("/teams/balance/available", json={"names": names, "strategy": "pareto"})
+        unknown = client.post("/teams/balance/available", json={"names": names + [f"{prefix} nobody"]})
+        
+        # Assert
+        assert response.status_code == 200
+        teams = response.json()
+        assert sorted(p["name"] for team in ("red_team", "yellow_team") for p in teams[team]["players"]) == names
+        totals = [sum(sum(p["attributes"].values()) for p in teams[team]["players"]) for team in ("red_team", "yellow_team")]
+        assert abs(totals[0] - totals[1]) == 1
+        # Picked by name, but still reported with their stored availability, whatever the strategy
+        for split in (teams, pareto.json()):
+            flags = {p["name"]: p["available"] for team in ("red_team", "yellow_team") for p in split[team]["players"]}
+            assert flags == {player["name"]: player["available"] for player in players}
+        assert unknown.status_code == 404
+        assert "nobody" in unknown.json()["detail"]
+    
+    def test_balance_available_players(self):
+        """Test balancing everyone marked available in the database"""
+        # Arrange
+        client.post("/players/bulk", json=[
+            {"name": f"{uuid.uuid4().hex}", "attributes": {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}}
+            for _ in range(2)
+        ])
+        available = sorted(player["name"] for player in client.get("/players/").json() if player["available"])
+        
+        # Act
+        response = client.post("/teams/balance/available", json={})
+        
+        # Assert
+        assert response.status_code == 200
+        teams = response.json()
+        assert sorted(p["name"] for team in ("red_team", "yellow_team") for p in teams[team]["players"]) == available
+    
+    def test_balance_stored_players_from_roster(self, monkeypatch):
+        """Test that balancing stored players reads the in-memory roster, not the database"""
+        # Arrange
+        prefix = uuid.uuid4().hex
+        names = [f"{prefix} {i}" for i in range(4)]
+        client.post("/players/bulk", json=[
+            {"name": name, "attributes": {"attacking": 2 + i, "defending": 5, "goalkeeping": 5, "energy": 5}}
+            for i, name in enumerate(names)
+        ])
+        
+        def no_database(*args, **kwargs):
+            raise AssertionError("Read the database")
+        
+        # Every read of the players table the route could fall back to
+        for method in ("get_player", "get_all_players", "get_all_player_records", "list_players", "list_player_records"):
+            monkeypatch.setattr(main.resources.database, method, no_database)
+        
+        # Act
+        greedy = client.post("/teams/balance/available", json={"names": names})
+        pareto = client.post("/teams/balance/available", json={"names": names, "strategy": "pareto"})
+        
+        # Assert
+        for response in (greedy, pareto):
+            assert response.status_code == 200
+            teams = response.json()
+            assert sorted(p["name"] for team in ("red_team", "yellow_team") for p in teams[team]["players"]) == names
+        assert "pareto_front" in pareto.json()
+    
+    def test_simulate_match(self):
+        """Test predicting the outcome of a match between two teams"""
+        # Arrange
+        attributes = {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}
+        body = {
+            "red_team": {"name": "Red", "players": [{"name": "Sim A", "attributes": attributes}]},
+            "yellow_team": {"name": "Yellows", "players": [{"name": "Sim B", "attributes": attributes}]},
+            "simulations": 2000,
+            "seed": 11
+        }
+        
+        # Act
+        first = client.post("/teams/simulate", json=body)
+        second = client.post("/teams/simulate", json=body)
+        too_many = client.post("/teams/simulate", json={**body, "simulations": 10 ** 9})
+        
+        # Assert
+        assert first.status_code == 200
+        result = first.json()
+        assert result == second.json()
+        assert result["simulations"] == 2000
+        assert result["red_win"] + result["draw"] + result["yellow_win"] == pytest.approx(1.0)
+        assert too_many.status_code == 422    
+    def test_balance_teams_with_repeat_penalty(self):
+        """Test that players who were teammates in the latest games are split up"""
+        # Arrange
+        prefix = f"Regular {uuid.uuid4().hex[:8]}"
+        players_data = [
+            {"name": f"{prefix} {i}", "attributes": {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}}
+            for i in range(6)
+        ]
+        for day in (1, 2):
+            client.post("/games/", json={
+                "date": f"2099-01-0{day}",
+                "red_team": {"name": "Red", "players": players_data[:3]},
+                "yellow_team": {"name": "Yellows", "players": players_data[3:]},
+                "score": {"red_score": 1, "yellow_score": 1}
+            })
+        
+        # Act
+        response = client.post("/teams/balance", json={
+            "players": players_data, "strategy": "exact", "repeat_penalty": 1.0
+        })
+        
+        # Assert
+        assert response.status_code == 200
+        red = {player["name"] for player in response.json()["red_team"]["players"]}
+        assert len(red) == 3
+        assert red not in ({p["name"] for p in players_data[:3]}, {p["name"] for p in players_data[3:]})
+    
+    def test_top_splits(self):
+        """Test listing the most balanced different splits"""
+        # Arrange
+        players_data = [
+            {"name": f"Top {i}", "attributes": {"attacking": 1 + i, "defending": 5, "goalkeeping": 5, "energy": 5}}
+            for i in range(8)
+        ]
+        
+        # Act
+        response = client.post("/teams/balance/top", json={
+            "players": players_data, "k": 3, "apart": [["Top 0", "Top 1"]], "pinned": {"Top 7": "Red"},
+            "avoid_recent": 5
+        })
+        rejected = client.post("/teams/balance/top", json={"players": players_data, "pinned": {"Top 7": "Blues"}})
+        
+        # Assert
+        assert response.status_code == 200
+        splits = response.json()["splits"]
+        assert len(splits) == 3
+        for split in splits:
+            red = {player["name"] for player in split["red_team"]["players"]}
+            assert "Top 7" in red and ("Top 0" in red) != ("Top 1" in red)
+        assert rejected.status_code == 400
+
+class TestLoadShedding:
+    """Test cases for requests arriving while the executor is full"""
+    
+    def test_full_executor_returns_503(self, monkeypatch):
+        """Test that requests are refused with 503 instead of queueing without bound"""
+        # Arrange
+        busy = BoundedExecutor(max_workers=1, max_queue=0)
+        monkeypatch.setattr(main.resources, "executor", busy)
+        release = threading.Event()
+        blocker = threading.Thread(target=asyncio.run, args=(busy.run(release.wait),))
+        blocker.start()
+        while busy.pending == 0:
+            time.sleep(0.001)
+        
+        try:
+            # Act
+            response = client.get("/ratings/")
+        finally:
+            release.set()
+            blocker.join()
+        
+        # Assert
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert client.get("/").status_code == 200
+        busy.shutdown()
 
 
 class TestGameRecordingAPI:
@@ -143,4 +540,279 @@ class TestGameRecordingAPI:
         assert "total_games" in data
         assert "wins" in data
         assert "losses" in data
-        assert "win_rate" in data 
\ No newline at end of file
+        assert "draws" in data
+        assert "win_rate" in data 
+    
+    def test_get_game_history_pages_with_cursor(self):
+        """Test walking the game history one page at a time"""
+        # Arrange
+        pager = f"Pager {uuid.uuid4().hex}"
+        for day in (3, 1, 2):
+            client.post("/games/", json={
+                "date": f"2023-06-0{day}",
+                "red_team": {"name": "Red", "players": [{"name": pager, "attributes": {"attacking": 7, "defending": 6, "goalkeeping": 3, "energy": 8}}]},
+                "yellow_team": {"name": "Yellows", "players": []},
+                "score": {"red_score": day, "yellow_score": 0}
+            })
+        
+        # Act
+        first = client.get("/games/", params={"player": pager, "limit": 2, "view": "summary"},
+                           headers={"Origin": "http://localhost:3000"})
+        second = client.get("/games/", params={"player": pager, "limit": 2, "view": "summary", "cursor": first.headers["X-Next-Cursor"]})
+        
+        # Assert
+        assert first.status_code == 200
+        assert first.json()[0]["red_players"] == [pager]
+        # The frontend follows the cursor, so browsers must be allowed to read it
+        assert "x-next-cursor" in first.headers["Access-Control-Expose-Headers"].lower()
+        assert "X-Next-Cursor" not in second.headers
+        dates = [game["date"] for game in first.json() + second.json()]
+        assert dates == ["2023-06-01", "2023-06-02", "2023-06-03"]
+    
+    def test_get_game_history_rejects_bad_cursor(self):
+        """Test that a malformed cursor is a client error"""
+        # Act
+        response = client.get("/games/", params={"cursor": "not-a-cursor"})
+        
+        # Assert
+        assert response.status_code == 400
+    
+    def test_export_games_as_ndjson(self):
+        """Test streaming the full game history as newline-delimited JSON"""
+        # Act
+        response = client.get("/games/export")
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        games = [json.loads(line) for line in response.text.splitlines()]
+        assert len(games) == len(client.get("/games/", params={"limit": 1000}).json())
+        assert all("score" in game for game in games)
+    
+    def test_get_partnership_stats(self):
+        """Test getting partnership statistics"""
+        # Act
+        response = client.get("/stats/partnerships", params={"top_k": 3, "min_games": 1})
+        
+        # Assert
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["strong_partnerships"]) <= 3
+        assert "weak_partnerships" in data
+        assert "recommendations" in data
+    
+    def test_get_ratings(self):
+        """Test getting skill ratings learned from recorded games"""
+        # Act
+        response = client.get("/ratings/")
+        
+        # Assert
+        assert response.status_code == 200
+        ratings = response.json()
+        assert all({"name", "mu", "sigma", "conservative", "games"} <= set(row) for row in ratings)
+        conservative = [row["conservative"] for row in ratings]
+        assert conservative == sorted(conservative, reverse=True)
+
+
+class TestMetricsAPI:
+    """Test cases for the /metrics endpoint"""
+    
+    def test_metrics_disabled_by_default(self):
+        """Test that /metrics is not served unless metrics are switched on"""
+        # Act
+        response = client.get("/metrics")
+        
+        # Assert
+        if metrics.ENABLED:
+            assert response.headers["content-type"].startswith("text/plain")
+        else:
+            assert response.status_code == 404
+
+
+class TestProfilingAPI:
+    """Test cases for the profiling endpoints and per-request traces"""
+    
+    def test_profiling_disabled_by_default(self):
+        """Test that the profiling endpoints are not served unless profiling is switched on"""
+        # Act
+        response = client.get("/admin/profile", params={"seconds": 0.05})
+        
+        # Assert
+        if profiler.ENABLED:
+            # Sent without the admin token
+            assert response.status_code in (403, 404)
+        else:
+            assert response.status_code == 404
+    
+    def test_profile_header_attaches_summary(self, monkeypatch):
+        """Test that a request sent with X-Profile gets an id whose cProfile summary can be fetched"""
+        # Arrange
+        # List every function: cheap ones tie at 0.000 and may not make the default top 30
+        monkeypatch.setattr(profiler.RequestProfile, "summary",
+                            functools.partialmethod(profiler.RequestProfile.summary, limit=None))
+        store = profiler.ProfileStore()
+        traced_client = TestClient(profiler.ProfilingMiddleware(app, store=store, token="secret"))
+        
+        # Act
+        plain = traced_client.get("/ratings/")
+        without_token = traced_client.get("/ratings/", headers={"X-Profile": "1", "X-Admin-Token": "guess"})
+        traced = traced_client.get("/ratings/", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+        
+        # Assert
+        assert "x-profile-id" not in plain.headers
+        assert "x-profile-id" not in without_token.headers
+        assert traced.status_code == 200
+        assert traced.json() == plain.json()
+        summary = store.get(traced.headers["x-profile-id"])
+        assert "get_ratings" in summary
+
+
+class TestAppFactory:
+    """Test cases for building the app and its lifespan"""
+    
+    def test_database_opened_at_startup_and_closed_at_shutdown(self, monkeypatch):
+        """Test that a new app touches nothing until it starts, then serves from its own database"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        db_path = os.path.join(directory, "factory.db")
+        # create_app points the routes at the new app's resources; put the shared ones back afterwards
+        monkeypatch.setattr(main, "resources", main.resources)
+        monkeypatch.setattr(main, "leagues", main.leagues)
+        
+        try:
+            # Act
+            factory_app = main.create_app(Settings(db_path=db_path, simulator_processes=1))
+            created_on_build = os.path.exists(db_path)
+            with TestClient(factory_app) as factory_client:
+                loaded_at_startup = factory_app.state.resources.loaded
+                response = factory_client.get("/players/")
+            
+            # Assert
+            assert not created_on_build
+            assert loaded_at_startup
+            assert response.status_code == 200
+            assert response.json() == []
+            assert not factory_app.state.resources.loaded
+        finally:
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+
+class TestLeaguesAPI:
+    """Test cases for league-scoped routes and the cross-league admin endpoints"""
+    
+    def test_leagues_keep_separate_players(self, monkeypatch):
+        """Test that each league has its own players under /leagues/{league}/ and admin queries see them all"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        monkeypatch.setattr(main.leagues, "directory", directory)
+        monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+        admin = {"X-Admin-Token": "secret"}
+        
+        def player(attacking):
+            return {"name": "Sam", "attributes": {"attacking": attacking, "defending": 5, "goalkeeping": 5, "energy": 5}}
+        
+        try:
+            # Act
+            disabled = client.post("/admin/leagues", json={"name": "monday"}, headers=admin)
+            monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+            forbidden = client.post("/admin/leagues", json={"name": "monday"})
+            created = [client.post("/admin/leagues", json={"name": name}, headers=admin)
+                       for name in ("tuesday", "thursday")]
+            duplicate = client.post("/admin/leagues", json={"name": "tuesday"}, headers=admin)
+            invalid = client.post("/admin/leagues", json={"name": "Bad Name"}, headers=admin)
+            client.post("/leagues/tuesday/players/", json=player(3))
+            client.post("/leagues/thursday/players/", json=player(9))
+            tuesday = client.get("/leagues/tuesday/players/")
+            unknown = client.get("/leagues/friday/players/")
+            found = client.get("/admin/leagues/players/Sam", headers=admin)
+            summary = client.get("/admin/leagues", headers=admin)
+            
+            # Assert
+            # Without a configured token the admin endpoints are not served at all
+            assert disabled.status_code == 404
+            assert forbidden.status_code == 403
+            assert [response.status_code for response in created] == [201, 201]
+            assert duplicate.status_code == 409
+            assert invalid.status_code == 400
+            assert [p["attributes"]["attacking"] for p in tuesday.json()] == [3]
+            assert unknown.status_code == 404
+            assert {entry["league"]: entry["attributes"]["attacking"] for entry in found.json()["leagues"]} == {
+                "thursday": 9, "tuesday": 3}
+            assert [(entry["league"], entry["players"]) for entry in summary.json()["leagues"]] == [
+                ("thursday", 1), ("tuesday", 1)]
+            assert sorted(summary.json()["open"]) == ["thursday", "tuesday"]
+            assert "Sam" not in [p["name"] for p in client.get("/players/").json()]
+        finally:
+            main.leagues.close()
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+    
+    def test_leagues_are_opened_off_the_event_loop(self, monkeypatch):
+        """Test that opening a league, which loads its players and games, runs on the executor"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        monkeypatch.setattr(main.leagues, "directory", directory)
+        main.leagues.create("wednesday")
+        acquire = main.leagues.acquire
+        threads = []
+        
+        def recording_acquire(league):
+            threads.append(threading.current_thread().name)
+            return acquire(league)
+        
+        monkeypatch.setattr(main.leagues, "acquire", recording_acquire)
+        
+        try:
+            # Act
+            response = client.get("/leagues/wednesday/ratings/")
+            
+            # Assert
+            assert response.status_code == 200
+            assert len(threads) == 1 and threads[0].startswith("blocking")
+            assert main.leagues.open_resources()[0].loaded
+        finally:
+            main.leagues.close()
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+
+class TestEventsAPI:
+    """Test cases for the Server-Sent Events stream of changes"""
+    
+    def test_events_since_last_event_id(self, monkeypatch):
+        """Test that a reconnecting client is sent the player, balance and game events it missed"""
+        # Arrange
+        # A real stream stays open for minutes; TestClient waits for the whole body
+        monkeypatch.setattr(events, "STREAM_SECONDS", 0.2)
+        since = main.resources.events.last_event_id
+        names = [f"Pusher {uuid.uuid4().hex[:8]}", f"Pusher {uuid.uuid4().hex[:8]}"]
+        players = [{"name": name, "attributes": {"attacking": 5, "defending": 5, "goalkeeping": 5, "energy": 5}}
+                   for name in names]
+        
+        # Act
+        for player in players:
+            client.post("/players/", json=player)
+        balanced = client.post("/teams/balance", json={"players": players}).json()
+        client.post("/games/", json={
+            "date": "2024-06-01",
+            "red_team": balanced["red_team"],
+            "yellow_team": balanced["yellow_team"],
+            "score": {"red_score": 1, "yellow_score": 0}
+        })
+        response = client.get("/events", headers={"Last-Event-ID": since})
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = [frame for frame in response.text.split("\n\n") if frame.startswith("id: ")]
+        messages = [(frame.split("\n")[1].removeprefix("event: "), json.loads(frame.split("\n")[2][len("data: "):]))
+                    for frame in frames]
+        assert [event for event, _ in messages] == ["player", "player", "balance", "game"]
+        assert [data["name"] for _, data in messages[:2]] == names
+        assert sorted(messages[2][1]["red_players"] + messages[2][1]["yellow_players"]) == sorted(names)
+        assert messages[3][1]["red_players"] == messages[2][1]["red_players"]
+        assert (messages[3][1]["red_score"], messages[3][1]["yellow_score"]) == (1, 0)
\ No newline at end of file
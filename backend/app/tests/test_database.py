@@ -1,9 +1,15 @@
 import pytest
 import tempfile
 import os
+import json
+import sqlite3
+import threading
+from typing import List
+from pydantic import TypeAdapter
 from app.models.player import Player, PlayerAttributes
 from app.models.game import Team, Game, GameScore
 from app.services.database import DatabaseService
+from app.services import fast_json
 
 
 class TestDatabaseService:
@@ -141,4 +147,430 @@ class TestDatabaseService:
             assert loaded_player.attributes.defending == 7
         finally:
             if os.path.exists(db_path):
-                os.unlink(db_path) 
\ No newline at end of file
+                os.unlink(db_path) 
+    
+    def test_player_listeners_are_notified(self):
+        """Test that saving a player notifies registered listeners"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            saved = []
+            db.add_player_listener(saved.append)
+            player = Player(name="Test Player", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))
+            
+            # Act
+            db.save_player(player)
+            db.update_player(player)
+            
+            # Assert
+            assert saved == [player, player]
+        finally:
+            if os.path.exists(db_path):
+                os.unlink(db_path)
+    
+    def test_connections_are_pooled_per_thread_in_wal_mode(self):
+        """Test that each thread reuses one WAL-mode connection"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            other_thread_connection = []
+            
+            # Act
+            first = db._pool.connection()
+            db.get_all_players()
+            second = db._pool.connection()
+            worker = threading.Thread(target=lambda: other_thread_connection.append(db._pool.connection()))
+            worker.start()
+            worker.join()
+            journal_mode = first.execute("PRAGMA journal_mode").fetchone()[0]
+            
+            # Assert
+            assert first is second
+            assert other_thread_connection[0] is not first
+            assert journal_mode == "wal"
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_failed_write_is_rolled_back(self):
+        """Test that an error inside a pooled transaction leaves no partial writes"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            
+            # Act
+            with pytest.raises(RuntimeError):
+                with db._pool.transaction() as conn:
+                    conn.execute("INSERT INTO players (name) VALUES ('Ghost')")
+                    raise RuntimeError("boom")
+            
+            # Assert
+            assert db.get_player("Ghost") is None
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_get_player_games(self):
+        """Test looking up only the games a player took part in"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+            for date, red, yellow in (("2024-01-15", "Alice", "Bob"), ("2024-01-22", "Carol", "Alice"), ("2024-01-29", "Bob", "Carol")):
+                db.save_game(Game(
+                    date=date,
+                    red_team=Team(name="Red", players=[Player(name=red, attributes=attributes)]),
+                    yellow_team=Team(name="Yellows", players=[Player(name=yellow, attributes=attributes)]),
+                    score=GameScore(red_score=1, yellow_score=0)
+                ))
+            
+            # Act
+            games = db.get_player_games("Alice")
+            
+            # Assert
+            assert [game.date for game in games] == ["2024-01-15", "2024-01-22"]
+            assert games[1].yellow_team.players[0].name == "Alice"
+            assert games[1].red_team.players[0].name == "Carol"
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_migrates_json_blob_games(self):
+        """Test that games stored as JSON blobs are migrated to game_participants"""
+        # Arrange - a database written by the old schema
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            player_data = lambda name, attacking: {
+                "name": name,
+                "attributes": {"attacking": attacking, "defending": 6, "goalkeeping": 3, "energy": 8},
+                "available": True
+            }
+            conn = sqlite3.connect(db_path)
+            conn.execute('''
+                CREATE TABLE games (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date TEXT,
+                    red_team_data TEXT,
+                    yellow_team_data TEXT,
+                    red_score INTEGER,
+                    yellow_score INTEGER
+                )
+            ''')
+            conn.execute('''
+                INSERT INTO games (date, red_team_data, yellow_team_data, red_score, yellow_score)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                "2024-01-15",
+                json.dumps([player_data("Player1", 7), player_data("Player3", 5)]),
+                json.dumps([player_data("Player2", 6)]),
+                3,
+                2
+            ))
+            conn.commit()
+            conn.close()
+            
+            # Act
+            db = DatabaseService(db_path)
+            games = db.get_all_games()
+            
+            # Assert
+            assert len(games) == 1
+            assert [p.name for p in games[0].red_team.players] == ["Player1", "Player3"]
+            assert games[0].red_team.players[0].attributes.attacking == 7
+            assert [p.name for p in games[0].yellow_team.players] == ["Player2"]
+            assert games[0].score.red_score == 3
+            assert len(db.get_player_games("Player3")) == 1
+            columns = [row[1] for row in db._pool.connection().execute("PRAGMA table_info(games)")]
+            assert "red_team_data" not in columns
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_list_games_pages_and_filters(self):
+        """Test keyset pagination, date and player filters and the summary projection"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+            for day in (3, 1, 2, 2, 5):
+                db.save_game(Game(
+                    date=f"2024-01-0{day}",
+                    red_team=Team(name="Red", players=[Player(name=f"Red{day}", attributes=attributes)]),
+                    yellow_team=Team(name="Yellows", players=[Player(name="Regular", attributes=attributes)]),
+                    score=GameScore(red_score=day, yellow_score=0)
+                ))
+            
+            # Act
+            first_page = db.list_games(limit=2)
+            second_page = db.list_games(after=(first_page[-1].date, first_page[-1].id), limit=2)
+            in_range = db.list_games(date_from="2024-01-02", date_to="2024-01-03")
+            summaries = db.list_game_summaries(player="Red5")
+            
+            # Assert
+            assert [g.date for g in first_page] == ["2024-01-01", "2024-01-02"]
+            assert [g.date for g in second_page] == ["2024-01-02", "2024-01-03"]
+            assert first_page[-1].id != second_page[0].id
+            assert [g.date for g in in_range] == ["2024-01-02", "2024-01-02", "2024-01-03"]
+            assert summaries == [{
+                "id": summaries[0]["id"],
+                "date": "2024-01-05",
+                "red_players": ["Red5"],
+                "yellow_players": ["Regular"],
+                "red_score": 5,
+                "yellow_score": 0
+            }]
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_save_players_in_one_batch(self):
+        """Test bulk saving players, replacing existing ones and notifying listeners"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            saved = []
+            db.add_player_listener(saved.append)
+            db.save_player(Player(name="P0", attributes=PlayerAttributes(attacking=1, defending=1, goalkeeping=1, energy=1)))
+            players = [
+                Player(name=f"P{i}", attributes=PlayerAttributes(attacking=1 + i % 10, defending=6, goalkeeping=3, energy=8))
+                for i in range(250)
+            ]
+            
+            # Act
+            count = db.save_players(players)
+            
+            # Assert
+            assert count == 250
+            assert len(db.get_all_players()) == 250
+            assert db.get_player("P0").attributes.defending == 6
+            assert saved[1:] == players
+            page = db.list_players(limit=100)
+            assert [p.name for p in page] == sorted(p.name for p in players)[:100]
+            assert db.list_players(after=page[-1].name, limit=100)[0].name > page[-1].name
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_set_availability_for_many_players(self):
+        """Test batch availability updates, skipping unknown names"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+            db.save_players([Player(name=name, attributes=attributes) for name in ("Ann", "Bea", "Cat")])
+            saved = []
+            db.add_player_listener(saved.append)
+            
+            # Act
+            missing = db.set_availability({"Ann": False, "Cat": False, "Ghost": True})
+            again = db.set_availability({"Ann": True})
+            
+            # Assert
+            assert missing == ["Ghost"]
+            assert again == []
+            assert {p.name: p.available for p in db.get_all_players()} == {"Ann": True, "Bea": True, "Cat": False}
+            assert sorted((p.name, p.available) for p in saved) == [("Ann", False), ("Ann", True), ("Cat", False)]
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_data_version_is_bumped_by_every_write(self):
+        """Test that writes bump the data version and reads do not"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+            player = Player(name="Ann", attributes=attributes)
+            start = db.get_data_version()
+            
+            # Act
+            db.save_player(player)
+            after_save = db.get_data_version()
+            db.get_all_players()
+            after_read = db.get_data_version()
+            db.save_players([player])
+            db.set_availability({"Ann": False})
+            db.save_game(Game(date="2024-01-01", red_team=Team(name="Red", players=[player]),
+                              yellow_team=Team(name="Yellows", players=[]), score=GameScore(red_score=1, yellow_score=0)))
+            db.rebuild_player_stats()
+            
+            # Assert
+            assert after_save.version == start.version + 1
+            assert after_read == after_save
+            assert db.get_data_version().version == start.version + 5
+            assert db.get_data_version().instance == start.instance
+            db.close()
+            assert DatabaseService(db_path).get_data_version().version == start.version + 5
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_data_version_kept_in_memory_follows_commits(self):
+        """Test that data_version follows this instance's commits, and other writers' only once read"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            other = DatabaseService(db_path)
+            player = Player(name="Ann", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))
+            
+            # Act
+            db.save_player(player)
+            after_own = db.data_version
+            other.save_player(player)
+            before_read = db.data_version
+            read = db.get_data_version()
+            with pytest.raises(RuntimeError):
+                with db._writing() as conn:
+                    db._bump_data_version(conn)
+                    raise RuntimeError("rolled back")
+            
+            # Assert
+            assert after_own.version == read.version - 1
+            assert before_read == after_own
+            assert db.data_version == read
+            assert db.get_data_version() == read
+            db.close()
+            other.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_trusted_records_encode_like_models(self):
+        """Test that the unvalidated record path gives the same JSON as the pydantic models"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            players = [
+                Player(name=name, attributes=PlayerAttributes(attacking=i + 1, defending=5, goalkeeping=3, energy=8),
+                       available=i % 2 == 0)
+                for i, name in enumerate(["Ann", "Bob", "Zoë", "Dan"])
+            ]
+            db.save_players(players)
+            for date in ("2024-01-01", "2024-01-08"):
+                db.save_game(Game(date=date, red_team=Team(name="Red", players=players[:2]),
+                                  yellow_team=Team(name="Yellows", players=players[2:]),
+                                  score=GameScore(red_score=2, yellow_score=1)))
+            
+            # Act
+            player_records = db.get_all_player_records()
+            game_records = db.list_game_records(limit=10, player="Zoë")
+            
+            # Assert
+            assert fast_json.dumps(player_records) == TypeAdapter(List[Player]).dump_json(db.get_all_players())
+            assert db.list_player_records(after="Bob", limit=1) == [players[3].model_dump()]
+            assert len(game_records) == 2
+            assert fast_json.dumps(game_records) == TypeAdapter(List[Game]).dump_json(db.list_games(limit=10))
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_writes_from_another_instance_are_detected(self):
+        """Test that an instance can tell its own writes from those made through another connection"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        player = Player(name="Shared", attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5))
+        
+        try:
+            db = DatabaseService(db_path)
+            other = DatabaseService(db_path)
+            start = db.get_data_version().version
+            
+            # Act
+            db.save_player(player)
+            after_own = db.get_data_version().version
+            other.save_player(player)
+            after_other = db.get_data_version().version
+            
+            # Assert
+            assert db.wrote_every_version(start, after_own)
+            assert not db.wrote_every_version(start, after_other)
+            assert other.wrote_every_version(after_own, after_other)
+            db.close()
+            other.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs os.fork")
+    def test_forked_child_opens_its_own_connections(self):
+        """Test that a forked process does not reuse the parent's pooled connections"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            parent_connection = db._pool.connection()
+            
+            # Act
+            pid = os.fork()
+            if pid == 0:
+                # Child: report through the exit code, never return into pytest
+                try:
+                    fresh = db._pool.connection() is not parent_connection
+                    usable = db.get_all_players() == []
+                    os._exit(0 if fresh and usable else 1)
+                except BaseException:
+                    os._exit(2)
+            _, status = os.waitpid(pid, 0)
+            
+            # Assert
+            assert os.waitstatus_to_exitcode(status) == 0
+            assert db._pool.connection() is parent_connection
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
\ No newline at end of file
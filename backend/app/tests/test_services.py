@@ -1,8 +1,33 @@
+import asyncio
+import os
+import random
+import tempfile
+import threading
+from itertools import combinations
 import pytest
+import numpy as np
 from app.models.player import Player, PlayerAttributes
 from app.models.game import Team, Game, GameScore
 from app.services.team_balancer import TeamBalancer
+from app.services.split_search import (
+    exact_split, greedy_split, split_difference, differencing_partition, top_k_splits,
+    refine_with_pair_penalty, repeated_pairs
+)
 from app.services.game_recorder import GameRecorder
+from app.services.balance_cache import BalanceCache
+from app.services.database import DatabaseService
+from app.services.events import RESYNC, EventHub
+from app.services.partnerships import PartnershipMatrix
+from app.services import metrics, profiler
+from app.services.rating import RatingEngine
+from app.services.recent_pairs import RecentPairs
+from app.services.executor import BoundedExecutor, ExecutorSaturated
+from app.services.response_cache import ResponseCache
+from app.services.roster import Roster
+from app.services.simulator import MatchSimulator, SimulationPool
+from app.leagues import LeagueNotFound, Leagues
+from app.resources import Resources
+from app.settings import Settings
 
 
 class TestTeamBalancer:
@@ -135,8 +160,408 @@ class TestTeamBalancer:
         # Each team should have 2-3 high skill players (not all 5 high skill players on one team)
         assert 2 <= red_high_skill <= 3, f"Red team has {red_high_skill} high skill players, expected 2-3"
         assert 2 <= yellow_high_skill <= 3, f"Yellow team has {yellow_high_skill} high skill players, expected 2-3"
+    
+    def test_exact_strategy_finds_minimum_difference(self):
+        """Test that the exact strategy never does worse than greedy and reaches the optimum"""
+        # Arrange
+        attribute_sets = [
+            (9, 9, 7, 9), (9, 8, 7, 8), (10, 6, 4, 7), (5, 8, 8, 8), (7, 6, 7, 7), (4, 8, 6, 8),
+            (3, 7, 4, 7), (7, 5, 4, 5), (5, 5, 5, 5), (8, 7, 6, 6), (9, 4, 4, 7), (6, 6, 6, 7),
+        ]
+        players = [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(attacking=a, defending=d, goalkeeping=g, energy=e))
+            for i, (a, d, g, e) in enumerate(attribute_sets)
+        ]
+        
+        # Act
+        greedy_red, greedy_yellow = TeamBalancer().balance_teams(players)
+        exact_red, exact_yellow = TeamBalancer(strategy="exact").balance_teams(players)
+        
+        # Assert
+        def difference(red, yellow):
+            return abs(sum(TeamBalancer.player_score(p) for p in red.players) -
+                       sum(TeamBalancer.player_score(p) for p in yellow.players))
+        
+        assert len(exact_red.players) == 6
+        assert len(exact_yellow.players) == 6
+        assert difference(exact_red, exact_yellow) <= difference(greedy_red, greedy_yellow)
+        assert difference(exact_red, exact_yellow) <= 1
+    
+    def test_unknown_strategy_is_rejected(self):
+        """Test that an unknown balancing strategy raises ValueError"""
+        # Arrange & Act & Assert
+        with pytest.raises(ValueError):
+            TeamBalancer(strategy="coin-toss")
+    
+    def test_pareto_strategy_spreads_goalkeepers(self):
+        """Test that multi-objective balancing does not stack goalkeepers on one team"""
+        # Arrange - two strong keepers whose totals match two outfield players
+        players = [
+            Player(name="Keeper1", attributes=PlayerAttributes(attacking=2, defending=4, goalkeeping=10, energy=6)),
+            Player(name="Keeper2", attributes=PlayerAttributes(attacking=2, defending=4, goalkeeping=10, energy=6)),
+            Player(name="Outfield1", attributes=PlayerAttributes(attacking=10, defending=6, goalkeeping=2, energy=4)),
+            Player(name="Outfield2", attributes=PlayerAttributes(attacking=10, defending=6, goalkeeping=2, energy=4)),
+        ] + [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5))
+            for i in range(6)
+        ]
+        
+        # Act
+        red_team, yellow_team = TeamBalancer(strategy="pareto").balance_teams(players)
+        
+        # Assert
+        red_keepers = sum(1 for p in red_team.players if p.name.startswith("Keeper"))
+        yellow_keepers = sum(1 for p in yellow_team.players if p.name.startswith("Keeper"))
+        assert red_keepers == 1
+        assert yellow_keepers == 1
+    
+    def test_pareto_front_is_ranked_by_weights(self):
+        """Test that the Pareto front is non-dominated and ordered by weighted imbalance"""
+        # Arrange
+        rng = random.Random(3)
+        players = [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(
+                attacking=rng.randint(1, 10), defending=rng.randint(1, 10),
+                goalkeeping=rng.randint(1, 10), energy=rng.randint(1, 10)))
+            for i in range(12)
+        ]
+        balancer = TeamBalancer(strategy="pareto", weights={"goalkeeping": 5.0})
+        
+        # Act
+        front = balancer.pareto_front(players)
+        
+        # Assert
+        assert len(front) >= 1
+        scores = [candidate["score"] for candidate in front]
+        assert scores == sorted(scores)
+        for candidate in front:
+            assert len(candidate["red_team"].players) == 6
+            for other in front:
+                a, b = candidate["imbalance"], other["imbalance"]
+                dominates = all(b[k] <= a[k] for k in a) and any(b[k] < a[k] for k in a)
+                assert not dominates
+    
+    def test_unknown_weight_is_rejected(self):
+        """Test that weights for unknown attributes raise ValueError"""
+        # Arrange & Act & Assert
+        with pytest.raises(ValueError):
+            TeamBalancer(strategy="pareto", weights={"heading": 2.0})
+    
+    def test_balance_teams_with_odd_player_count(self):
+        """Test that an odd number of players gives teams one player apart"""
+        # Arrange
+        players = [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(attacking=1 + i % 10, defending=6, goalkeeping=3, energy=8))
+            for i in range(15)
+        ]
+        
+        for strategy in ("greedy", "exact", "pareto", "differencing"):
+            # Act
+            red_team, yellow_team = TeamBalancer(strategy=strategy).balance_teams(players)
+            
+            # Assert
+            assert len(red_team.players) + len(yellow_team.players) == 15
+            assert abs(len(red_team.players) - len(yellow_team.players)) == 1
+    
+    def test_differencing_gives_red_the_extra_player(self):
+        """Test that differencing puts the extra player of an odd count in Red, whatever the scores"""
+        rng = random.Random(3)
+        for count in (3, 5, 7, 9, 11, 13, 15, 17, 19, 21):
+            # Arrange
+            players = [
+                Player(name=f"Player {i}", attributes=PlayerAttributes(
+                    attacking=rng.randint(1, 10), defending=rng.randint(1, 10),
+                    goalkeeping=rng.randint(1, 10), energy=rng.randint(1, 10)))
+                for i in range(count)
+            ]
+            
+            # Act
+            red_team, yellow_team = TeamBalancer(strategy="differencing").balance_teams(players)
+            
+            # Assert
+            assert len(red_team.players) == (count + 1) // 2
+            assert len(yellow_team.players) == count // 2
+    
+    def test_balance_teams_requires_two_players(self):
+        """Test that fewer than two available players raises ValueError"""
+        # Arrange
+        players = [Player(name="Solo", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))]
+        
+        # Act & Assert
+        with pytest.raises(ValueError):
+            TeamBalancer().balance_teams(players)
+    
+    def test_partition_teams_across_pitches(self):
+        """Test that 22 players are split into four balanced teams of 5 or 6"""
+        # Arrange
+        rng = random.Random(11)
+        players = [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(
+                attacking=rng.randint(1, 10), defending=rng.randint(1, 10),
+                goalkeeping=rng.randint(1, 10), energy=rng.randint(1, 10)))
+            for i in range(22)
+        ]
+        
+        # Act
+        teams = TeamBalancer(strategy="differencing").partition_teams(players, 4)
+        
+        # Assert
+        assert [team.name for team in teams] == ["Red", "Yellows", "Blues", "Greens"]
+        assert sorted(len(team.players) for team in teams) == [5, 5, 6, 6]
+        assert sum(len(team.players) for team in teams) == 22
+        names = {p.name for team in teams for p in team.players}
+        assert len(names) == 22
+    
+    def test_top_splits_by_name_avoid_recent_lineups(self):
+        """Test listing several splits with name-based constraints and a recent game to avoid"""
+        # Arrange
+        balancer = TeamBalancer()
+        players = [
+            Player(name=f"P{i}", attributes=PlayerAttributes(attacking=1 + i % 10, defending=5, goalkeeping=5, energy=5))
+            for i in range(10)
+        ]
+        last_week = ([f"P{i}" for i in range(0, 10, 2)], [f"P{i}" for i in range(1, 10, 2)])
+        other_pitch = (["Q0", "Q1", "P0"], ["Q2", "Q3"])
+        
+        # Act
+        splits = balancer.top_splits(players, k=4, together=[("P0", "P1")], pinned={"P9": "Yellows"},
+                                     previous=[other_pitch, last_week], min_distance=2)
+        
+        # Assert
+        assert len(splits) == 4
+        assert [split["difference"] for split in splits] == sorted(split["difference"] for split in splits)
+        for split in splits:
+            red = {player.name for player in split["red_team"].players}
+            assert len(red) == 5 and ("P0" in red) == ("P1" in red) and "P9" not in red
+            changed = len(red ^ set(last_week[0]))
+            assert min(changed, 10 - changed) >= 2
+        with pytest.raises(ValueError, match="not an available player"):
+            balancer.top_splits(players, together=[("P0", "Nobody")])    
+    def test_repeat_penalty_splits_up_recent_teammates(self):
+        """Test that a pair who keep playing together are split when an equally balanced split exists"""
+        # Arrange
+        history = RecentPairs(lookback=3)
+        for day in range(1, 4):
+            history.record_teams(f"2024-01-0{day}", ["A", "B", "C"], ["D", "E", "F"])
+        players = [
+            Player(name=name, attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5))
+            for name in "ABCDEF"
+        ]
+        
+        # Act
+        plain = TeamBalancer(strategy="exact")
+        penalised = TeamBalancer(strategy="exact", history=history, repeat_penalty=1.0)
+        red_team, yellow_team = penalised.balance_teams(players)
+        
+        # Assert
+        for team in (red_team, yellow_team):
+            names = {player.name for player in team.players}
+            assert len(names & set("ABC")) < 3 and len(names & set("DEF")) < 3
+        assert plain.balance_teams(players)[0].players[0].name == "A"
+        with pytest.raises(ValueError, match="recent game history"):
+            TeamBalancer(repeat_penalty=1.0)
+
+
+class TestSplitSearch:
+    """Test cases for the split search engines"""
+    
+    def _brute_force_difference(self, scores, team_size):
+        from itertools import combinations
+        return min(split_difference(scores, team) for team in combinations(range(len(scores)), team_size))
+    
+    def test_exact_split_matches_brute_force(self):
+        """Test that enumeration and meet-in-the-middle both find the optimum"""
+        # Arrange
+        rng = random.Random(7)
+        
+        for size in (8, 12, 18, 20):
+            scores = [rng.randint(4, 40) for _ in range(size)]
+            
+            # Act
+            team = exact_split(scores, size // 2)
+            
+            # Assert
+            assert len(team) == size // 2
+            assert len(set(team)) == size // 2
+            assert split_difference(scores, team) == self._brute_force_difference(scores, size // 2)
+    
+    def test_exact_split_with_uneven_team_sizes(self):
+        """Test that the exact search also handles teams of different sizes"""
+        # Arrange
+        scores = [31, 12, 27, 8, 19, 22, 35, 14, 9, 25, 17, 30, 11, 21, 16, 26, 13, 33, 20]
+        
+        # Act
+        team = exact_split(scores, 9)
+        
+        # Assert
+        assert len(team) == 9
+        assert split_difference(scores, team) == self._brute_force_difference(scores, 9)
+    
+    def test_differencing_partition_is_balanced(self):
+        """Test that differencing keeps team sizes within one and totals close"""
+        # Arrange
+        rng = random.Random(5)
+        scores = [rng.randint(4, 40) for _ in range(301)]
+        
+        # Act
+        teams = differencing_partition(scores, 6)
+        
+        # Assert
+        sizes = [len(team) for team in teams]
+        totals = [sum(scores[i] for i in team) for team in teams]
+        assert max(sizes) - min(sizes) <= 1
+        assert sorted(i for team in teams for i in team) == list(range(301))
+        # Sizes differ, so allow one player's worth of spread
+        assert max(totals) - min(totals) <= 40
+    
+    def test_top_k_splits_match_brute_force(self):
+        """Test that the top-k search returns the k smallest differences among distinct line-ups"""
+        # Arrange
+        from itertools import combinations
+        rng = random.Random(11)
+        
+        for size in (7, 10, 13):
+            scores = [rng.randint(4, 40) for _ in range(size)]
+            team_size = (size + 1) // 2
+            
+            # Act
+            splits = top_k_splits(scores, team_size, 6)
+            
+            # Assert
+            # Equal teams are listed once, with the first player on the first team
+            teams = [team for team in combinations(range(size), team_size) if size % 2 or 0 in team]
+            expected = sorted(split_difference(scores, team) for team in teams)
+            assert [difference for _, difference in splits] == expected[:6]
+            assert len({tuple(team) for team, _ in splits}) == 6
+    
+    def test_top_k_splits_respect_constraints(self):
+        """Test that pairs, pinned players and distance from earlier line-ups are all honoured"""
+        # Arrange
+        rng = random.Random(3)
+        scores = [rng.randint(4, 40) for _ in range(16)]
+        earlier = {i: i % 2 for i in range(16)}
+        
+        # Act
+        splits = top_k_splits(scores, 8, 10, together=[(0, 1)], apart=[(2, 3)], pinned={4: 1},
+                              previous=[earlier], min_distance=5)
+        
+        # Assert
+        assert len(splits) == 10
+        for team, _ in splits:
+            first = set(team)
+            assert (0 in first) == (1 in first)
+            assert (2 in first) != (3 in first)
+            assert 4 not in first
+            changed = sum(1 for i in range(16) if (i in first) != (earlier[i] == 0))
+            assert min(changed, 16 - changed) >= 5
+        with pytest.raises(ValueError):
+            top_k_splits(scores, 8, 3, together=[(0, 1)], apart=[(0, 1)])
+    
+    def test_pair_penalty_refinement_trades_balance_for_fewer_repeats(self):
+        """Test that swaps only happen when the repeats saved outweigh the balance lost"""
+        # Arrange
+        rng = random.Random(5)
+        scores = [rng.randint(4, 40) for _ in range(12)]
+        start = exact_split(scores, 6)
+        weights = np.zeros((12, 12), dtype=np.int64)
+        for a, b in combinations(start, 2):
+            weights[a, b] = weights[b, a] = rng.randint(0, 3)
+        
+        def cost(team, penalty):
+            return split_difference(scores, team) + penalty * repeated_pairs(team, weights)
+        
+        # Act
+        unchanged = refine_with_pair_penalty(scores, start, weights, 0)
+        refined = refine_with_pair_penalty(scores, start, weights, 2.0)
+        
+        # Assert
+        assert unchanged == start
+        assert len(refined) == 6
+        assert cost(refined, 2.0) < cost(start, 2.0)
+        assert repeated_pairs(refined, weights) < repeated_pairs(start, weights)
+    
+    def test_greedy_split_respects_team_size(self):
+        """Test that the greedy split hands the extra player to the right team"""
+        # Arrange
+        scores = [10, 9, 8, 7, 6, 5, 4]
+        
+        # Act
+        team = greedy_split(scores, 3)
+        
+        # Assert
+        assert len(team) == 3
 
 
+class TestBalanceCache:
+    """Test cases for the BalanceCache"""
+    
+    def _players(self, count=10):
+        return [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(attacking=1 + i % 10, defending=6, goalkeeping=3, energy=8))
+            for i in range(count)
+        ]
+    
+    def test_repeat_balance_is_served_from_cache(self):
+        """Test that balancing the same players again, in any order, hits the cache"""
+        # Arrange
+        cache = BalanceCache()
+        balancer = TeamBalancer(strategy="exact", cache=cache)
+        players = self._players()
+        
+        # Act
+        first = balancer.balance_teams(players)
+        second = balancer.balance_teams(list(reversed(players)))
+        
+        # Assert
+        assert second is first
+        assert cache.hits == 1
+        assert cache.misses == 1
+    
+    def test_strategy_is_part_of_the_key(self):
+        """Test that different strategies do not share cached results"""
+        # Arrange
+        cache = BalanceCache()
+        players = self._players()
+        
+        # Act
+        TeamBalancer(strategy="exact", cache=cache).balance_teams(players)
+        TeamBalancer(strategy="greedy", cache=cache).balance_teams(players)
+        
+        # Assert
+        assert len(cache) == 2
+        assert cache.hits == 0
+    
+    def test_changed_attributes_invalidate_entries(self):
+        """Test that saving a player with new attributes drops results that used the old ones"""
+        # Arrange
+        cache = BalanceCache()
+        balancer = TeamBalancer(cache=cache)
+        players = self._players()
+        balancer.balance_teams(players)
+        unchanged = players[0].model_copy(update={"available": False})
+        changed = Player(name="Player 0", attributes=PlayerAttributes(attacking=10, defending=10, goalkeeping=10, energy=10))
+        
+        # Act & Assert
+        cache.invalidate_player(unchanged)
+        assert len(cache) == 1
+        cache.invalidate_player(changed)
+        assert len(cache) == 0
+    
+    def test_cache_is_size_bounded(self):
+        """Test that the least recently used entry is evicted when full"""
+        # Arrange
+        cache = BalanceCache(maxsize=2)
+        balancer = TeamBalancer(cache=cache)
+        
+        # Act
+        for count in (10, 11, 12):
+            balancer.balance_teams(self._players(count))
+        
+        # Assert
+        assert len(cache) == 2
+        balancer.balance_teams(self._players(10))
+        assert cache.hits == 0
+
 class TestGameRecorder:
     """Test cases for the GameRecorder service"""
     
@@ -209,4 +634,1015 @@ class TestGameRecorder:
         assert stats["total_games"] == 2
         assert stats["wins"] == 1
         assert stats["losses"] == 1
-        assert stats["win_rate"] == 0.5 
\ No newline at end of file
+        assert stats["win_rate"] == 0.5 
+    
+    def test_draws_are_counted_separately(self):
+        """Test that a drawn game is neither a win nor a loss"""
+        # Arrange
+        recorder = GameRecorder()
+        red_team = Team(name="Red", players=[Player(name="Player1", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))])
+        yellow_team = Team(name="Yellows", players=[Player(name="Player2", attributes=PlayerAttributes(attacking=6, defending=7, goalkeeping=4, energy=7))])
+        
+        # Act
+        recorder.record_game("2024-01-15", red_team, yellow_team, GameScore(red_score=2, yellow_score=2))
+        stats = recorder.get_player_performance_stats("Player2")
+        
+        # Assert
+        assert stats["total_games"] == 1
+        assert stats["wins"] == 0
+        assert stats["losses"] == 0
+        assert stats["draws"] == 1
+    
+    def test_database_backed_recorder_persists_games_and_stats(self):
+        """Test that games recorded through the database survive a new recorder and keep stats in step"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            database = DatabaseService(db_path)
+            recorder = GameRecorder(database)
+            player1 = Player(name="Player1", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))
+            player2 = Player(name="Player2", attributes=PlayerAttributes(attacking=6, defending=7, goalkeeping=4, energy=7))
+            red_team = Team(name="Red", players=[player1])
+            yellow_team = Team(name="Yellows", players=[player2])
+            
+            # Act
+            recorder.record_game("2024-01-22", red_team, yellow_team, GameScore(red_score=1, yellow_score=4))
+            recorder.record_game("2024-01-15", red_team, yellow_team, GameScore(red_score=3, yellow_score=2))
+            recorder.record_game("2024-01-29", red_team, yellow_team, GameScore(red_score=0, yellow_score=0))
+            reopened = GameRecorder(DatabaseService(db_path))
+            
+            # Assert
+            assert [game.date for game in reopened.get_game_history()] == ["2024-01-15", "2024-01-22", "2024-01-29"]
+            stats = reopened.get_player_performance_stats("Player1")
+            assert stats["total_games"] == 3
+            assert stats["wins"] == 1
+            assert stats["losses"] == 1
+            assert stats["draws"] == 1
+            assert stats["win_rate"] == 1 / 3
+            assert reopened.get_player_performance_stats("Nobody")["total_games"] == 0
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_rebuild_stats_recomputes_aggregates(self):
+        """Test that rebuilding recomputes the aggregates from the raw games"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            database = DatabaseService(db_path)
+            recorder = GameRecorder(database)
+            red_team = Team(name="Red", players=[Player(name="Player1", attributes=PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8))])
+            yellow_team = Team(name="Yellows", players=[Player(name="Player2", attributes=PlayerAttributes(attacking=6, defending=7, goalkeeping=4, energy=7))])
+            recorder.record_game("2024-01-15", red_team, yellow_team, GameScore(red_score=3, yellow_score=2))
+            expected = recorder.get_player_performance_stats("Player2")
+            with database._pool.transaction() as conn:
+                conn.execute("UPDATE player_stats SET wins = 99")
+            
+            # Act
+            players = recorder.rebuild_stats()
+            
+            # Assert
+            assert players == 2
+            assert recorder.get_player_performance_stats("Player2") == expected
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_rebuild_stats_rebuilds_partnerships_and_recent_pairs(self):
+        """Test that rebuilding brings teammate counts and recent teammates in line with the games table"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        attributes = PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)
+        def team(name, *players):
+            return Team(name=name, players=[Player(name=p, attributes=attributes) for p in players])
+        
+        try:
+            database = DatabaseService(db_path)
+            recorder = GameRecorder(database)
+            recorder.record_game("2024-01-15", team("Red", "A", "B"), team("Yellows", "C", "D"), GameScore(red_score=1, yellow_score=0))
+            # Recorded through another recorder, as another process would, so this one has not seen it
+            GameRecorder(database).record_game("2024-01-22", team("Red", "A", "C"), team("Yellows", "B", "D"),
+                                               GameScore(red_score=2, yellow_score=0))
+            
+            # Act
+            recorder.rebuild_stats()
+            
+            # Assert
+            assert recorder.recent_pairs.count("A", "C") == 1
+            assert recorder.recent_pairs.count("A", "B") == 1
+            pairs = recorder.partnerships.top_partnerships(k=10, min_games=1)
+            games = {tuple(sorted(pair["players"])): pair["games"] for pair in pairs}
+            assert games[("A", "C")] == 1 and games[("A", "B")] == 1 and games[("B", "D")] == 1
+            assert recorder.ratings.rating("A")["games"] == 2
+            database.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_team_correlation_stats(self):
+        """Test that partnerships are ranked by win rate with a minimum sample"""
+        # Arrange
+        recorder = GameRecorder()
+        attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+        def team(name, *players):
+            return Team(name=name, players=[Player(name=p, attributes=attributes) for p in players])
+        
+        for _ in range(3):
+            recorder.record_game("2024-01-15", team("Red", "Ann", "Bea"), team("Yellows", "Cat", "Dee"), GameScore(red_score=2, yellow_score=1))
+        recorder.record_game("2024-01-22", team("Red", "Ann", "Cat"), team("Yellows", "Bea", "Dee"), GameScore(red_score=0, yellow_score=1))
+        
+        # Act
+        stats = recorder.get_team_correlation_stats(top_k=1, min_games=3)
+        
+        # Assert
+        assert stats["strong_partnerships"] == [{"players": ["Ann", "Bea"], "games": 3, "wins": 3, "win_rate": 1.0}]
+        assert stats["weak_partnerships"][0]["players"] == ["Cat", "Dee"]
+        assert stats["weak_partnerships"][0]["win_rate"] == 0.0
+        assert len(stats["recommendations"]) == 2
+    
+    def test_partnerships_load_from_database_history(self):
+        """Test that a database-backed recorder rebuilds partnership counts from history"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            attributes = PlayerAttributes(attacking=7, defending=6, goalkeeping=3, energy=8)
+            recorder = GameRecorder(DatabaseService(db_path))
+            red_team = Team(name="Red", players=[Player(name="Ann", attributes=attributes), Player(name="Bea", attributes=attributes)])
+            yellow_team = Team(name="Yellows", players=[Player(name="Cat", attributes=attributes)])
+            recorder.record_game("2024-01-15", red_team, yellow_team, GameScore(red_score=1, yellow_score=0))
+            
+            # Act
+            reopened = GameRecorder(DatabaseService(db_path))
+            stats = reopened.get_team_correlation_stats(min_games=1)
+            
+            # Assert
+            assert stats["strong_partnerships"] == [{"players": ["Ann", "Bea"], "games": 1, "wins": 1, "win_rate": 1.0}]
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+
+class TestPartnershipMatrix:
+    """Test cases for the PartnershipMatrix"""
+    
+    def test_matrix_grows_past_initial_capacity(self):
+        """Test that new players beyond the initial capacity are tracked"""
+        # Arrange
+        matrix = PartnershipMatrix(capacity=2)
+        
+        # Act
+        matrix.record_teams(["A", "B", "C"], ["D", "E"], 1, 0)
+        matrix.record_teams(["A", "B"], ["C", "D", "E"], 1, 0)
+        
+        # Assert
+        assert matrix.together.shape[0] >= 5
+        top = matrix.top_partnerships(k=1, min_games=2)
+        assert top == [{"players": ["A", "B"], "games": 2, "wins": 2, "win_rate": 1.0}]
+        assert matrix.together[matrix.player_ids["D"], matrix.player_ids["E"]] == 2
+        assert matrix.won[matrix.player_ids["D"], matrix.player_ids["E"]] == 0
+
+
+class TestRecentPairs:
+    """Test cases for RecentPairs"""
+    
+    def test_counts_only_the_latest_games_by_date(self):
+        """Test that old games leave the window and late-recorded old games are ignored"""
+        # Arrange
+        pairs = RecentPairs(lookback=2)
+        
+        # Act
+        pairs.record_teams("2024-03-01", ["A", "B"], ["C", "D"])
+        pairs.record_teams("2024-03-08", ["A", "B"], ["C", "E"])
+        pairs.record_teams("2024-03-15", ["A", "C"], ["B", "D"])
+        pairs.record_teams("2024-02-01", ["A", "B"], ["C", "D"])
+        
+        # Assert
+        assert pairs.count("A", "B") == 1
+        assert pairs.count("A", "C") == 1
+        assert pairs.count("C", "D") == 0
+        assert pairs.count("A", "Nobody") == 0
+        weights = pairs.weights(["A", "B", "C", "Nobody"])
+        assert weights.tolist() == [[0, 1, 1, 0], [1, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 0]]
+    
+    def test_recorder_fills_window_from_database(self):
+        """Test that a recorder restarted on an existing database knows the recent teammates"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp:
+            db_path = tmp.name
+        try:
+            database = DatabaseService(db_path)
+            first = GameRecorder(database, lookback=2)
+            for day, (red, yellow) in enumerate([("AB", "CD"), ("AC", "BD"), ("AC", "BE")], start=1):
+                first.record_game(
+                    f"2024-04-0{day}",
+                    Team(name="Red", players=[Player(name=n, attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)) for n in red]),
+                    Team(name="Yellows", players=[Player(name=n, attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)) for n in yellow]),
+                    GameScore(red_score=1, yellow_score=0)
+                )
+            
+            # Act
+            restarted = GameRecorder(database, lookback=2)
+            
+            # Assert
+            for recorder in (first, restarted):
+                assert recorder.recent_pairs.count("A", "C") == 2
+                assert recorder.recent_pairs.count("A", "B") == 0
+                assert recorder.recent_pairs.count("B", "D") == 1
+            database.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+
+class TestRatingEngine:
+    """Test cases for the RatingEngine"""
+    
+    def _history(self, game_count=300):
+        # Players with a lower number are stronger
+        rng = random.Random(3)
+        names = [f"P{i}" for i in range(10)]
+        games = []
+        for _ in range(game_count):
+            picked = rng.sample(names, 6)
+            red, yellow = picked[:3], picked[3:]
+            margin = sum(names.index(p) for p in yellow) - sum(names.index(p) for p in red) + rng.gauss(0, 3)
+            games.append({
+                "red_players": red,
+                "yellow_players": yellow,
+                "red_score": 2 if margin > 0 else 1,
+                "yellow_score": 1 if margin > 0 else 2
+            })
+        return games
+    
+    def test_winners_gain_and_uncertainty_shrinks(self):
+        """Test that one game moves winners up, losers down and shrinks every sigma"""
+        # Arrange
+        engine = RatingEngine()
+        
+        # Act
+        engine.record_teams(["A", "B"], ["C", "D"], 3, 1)
+        
+        # Assert
+        winner, loser = engine.rating("A"), engine.rating("C")
+        assert winner["mu"] > engine.mu > loser["mu"]
+        assert winner["sigma"] < engine.sigma and loser["sigma"] < engine.sigma
+        assert winner["games"] == 1
+        assert engine.rating("Nobody") == {"mu": engine.mu, "sigma": engine.sigma,
+                                           "conservative": engine.mu - 3 * engine.sigma, "games": 0}
+    
+    def test_draw_pulls_ratings_together(self):
+        """Test that a draw moves the stronger-rated team down"""
+        # Arrange
+        engine = RatingEngine()
+        engine.record_teams(["A"], ["B"], 1, 0)
+        before = engine.rating("A")["mu"]
+        
+        # Act
+        engine.record_teams(["A"], ["B"], 2, 2)
+        
+        # Assert
+        assert engine.rating("A")["mu"] < before
+    
+    def test_replay_matches_incremental_updates(self):
+        """Test that replaying history gives the same ratings as recording game by game"""
+        # Arrange
+        games = self._history()
+        incremental = RatingEngine()
+        for game in games:
+            incremental.record_teams(game["red_players"], game["yellow_players"],
+                                     game["red_score"], game["yellow_score"])
+        
+        # Act
+        replayed = RatingEngine()
+        replayed.replay(games)
+        
+        # Assert
+        for expected, actual in zip(incremental.ratings(), replayed.ratings()):
+            assert actual["name"] == expected["name"]
+            assert actual["mu"] == pytest.approx(expected["mu"])
+            assert actual["sigma"] == pytest.approx(expected["sigma"])
+        ranked = [row["name"] for row in replayed.ratings()]
+        assert ranked.index("P0") < ranked.index("P9")
+    
+    def test_replay_batch_runs_each_parameter_set(self):
+        """Test that a batch replay matches single replays with the same parameters"""
+        # Arrange
+        games = self._history()
+        engine = RatingEngine()
+        
+        # Act
+        result = engine.replay_batch(games, beta=[2.0, 6.0], tau=[0.1, 0.1], draw_probability=[0.1, 0.2])
+        
+        # Assert
+        assert result["mu"].shape == (2, 10)
+        assert len(engine.ratings()) == 0
+        for row, (beta, draw_probability) in enumerate([(2.0, 0.1), (6.0, 0.2)]):
+            single = RatingEngine(beta=beta, tau=0.1, draw_probability=draw_probability)
+            single.replay(games)
+            expected = [single.rating(name)["mu"] for name in result["names"]]
+            assert result["mu"][row] == pytest.approx(expected)
+            assert result["accuracy"][row] > 0.6
+    
+    def test_replay_batch_rejects_mismatched_parameters(self):
+        """Test that each parameter set needs every parameter"""
+        with pytest.raises(ValueError):
+            RatingEngine().replay_batch([], beta=[1.0, 2.0], tau=[0.1], draw_probability=[0.1])
+    
+    def test_balancer_can_use_ratings(self):
+        """Test balancing on learned ratings instead of attributes"""
+        # Arrange
+        engine = RatingEngine()
+        engine.replay(self._history())
+        attributes = PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)
+        players = [Player(name=name, attributes=attributes) for name in ("P0", "P1", "P8", "P9")]
+        
+        # Act
+        balancer = TeamBalancer(strategy="exact", score_source="rating", ratings=engine)
+        red_team, yellow_team = balancer.balance_teams(players)
+        
+        # Assert: the two strong players are split up despite identical attributes
+        red_names = {p.name for p in red_team.players}
+        assert ("P0" in red_names) != ("P1" in red_names)
+        with pytest.raises(ValueError):
+            TeamBalancer(score_source="rating")
+
+
+class TestBoundedExecutor:
+    """Test cases for the BoundedExecutor"""
+    
+    def test_run_returns_result_off_the_event_loop(self):
+        """Test that calls run on a worker thread and return their result"""
+        # Arrange
+        executor = BoundedExecutor(max_workers=2)
+        
+        # Act
+        thread_name = asyncio.run(executor.run(lambda: threading.current_thread().name))
+        
+        # Assert
+        assert thread_name.startswith("blocking")
+        assert executor.pending == 0
+        executor.shutdown()
+    
+    def test_full_queue_rejects_calls(self):
+        """Test that calls beyond workers + queue depth fail fast and slots are released"""
+        # Arrange
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        
+        async def scenario():
+            running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with pytest.raises(ExecutorSaturated):
+                await executor.run(release.wait)
+            release.set()
+            await asyncio.gather(*running)
+            return await executor.run(lambda: "ok")
+        
+        # Act
+        result = asyncio.run(scenario())
+        
+        # Assert
+        assert result == "ok"
+        assert executor.rejected == 1
+        assert executor.pending == 0
+        executor.shutdown()
+    
+    def test_errors_propagate_to_the_caller(self):
+        """Test that an exception raised in a worker reaches the awaiting handler"""
+        # Arrange
+        executor = BoundedExecutor(max_workers=1)
+        
+        # Act / Assert
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run(exact_split, [1.0] * 40, 20))
+        assert executor.pending == 0
+        executor.shutdown()
+
+
+class TestResponseCache:
+    """Test cases for the ResponseCache"""
+    
+    def test_newer_version_drops_every_entry(self):
+        """Test that entries are only served for the data version they were rendered at"""
+        # Arrange
+        cache = ResponseCache()
+        cache.put(("db", 1), "players", (b"[]", {}))
+        
+        # Act
+        cache.put(("db", 2), "games", (b"[1]", {}))
+        
+        # Assert
+        assert cache.get(("db", 1), "players") is None
+        assert cache.get(("db", 2), "players") is None
+        assert cache.get(("db", 2), "games") == (b"[1]", {})
+        assert len(cache) == 1
+    
+    def test_late_render_of_older_version_is_ignored(self):
+        """Test that a slow render finishing after a newer write does not replace newer entries"""
+        # Arrange
+        cache = ResponseCache()
+        cache.put(("db", 5), "players", (b"new", {}))
+        
+        # Act
+        cache.put(("db", 4), "players", (b"old", {}))
+        
+        # Assert
+        assert cache.get(("db", 5), "players") == (b"new", {})
+    
+    def test_cache_is_bounded_by_bytes(self):
+        """Test that the least recently used entries are evicted past the byte limit"""
+        # Arrange
+        cache = ResponseCache(maxsize=10, max_bytes=10)
+        
+        # Act
+        for key in "abc":
+            cache.put(("db", 1), key, (b"xxxx", {}))
+        
+        # Assert
+        assert cache.get(("db", 1), "a") is None
+        assert cache.get(("db", 1), "c") is not None
+        assert len(cache) == 2
+
+
+class TestRoster:
+    """Test cases for the columnar Roster"""
+    
+    def _players(self, count=10):
+        return [
+            Player(name=f"Player {i}", attributes=PlayerAttributes(attacking=1 + i % 10, defending=6, goalkeeping=3, energy=8),
+                   available=i != 3)
+            for i in range(count)
+        ]
+    
+    def test_columns_follow_database_writes(self):
+        """Test that a roster registered as a player listener stays in step with the players table"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        
+        try:
+            db = DatabaseService(db_path)
+            roster = Roster(capacity=2)
+            db.add_player_listener(roster.upsert)
+            
+            # Act
+            db.save_players(self._players())
+            db.set_availability({"Player 3": True, "Player 4": False})
+            db.save_player(Player(name="Player 0", attributes=PlayerAttributes(attacking=10, defending=1, goalkeeping=1, energy=1)))
+            
+            # Assert
+            assert len(roster) == 10
+            assert roster.players(roster.ids(["Player 0"]))[0] == db.get_player("Player 0")
+            available = {player.name for player in db.get_all_players() if player.available}
+            assert {roster.index.names[i] for i in roster.available_ids()} == available
+            with pytest.raises(KeyError, match="Nobody"):
+                roster.ids(["Player 1", "Nobody"])
+            db.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_balance_roster_matches_and_shares_cache_with_balance_teams(self):
+        """Test that balancing from the columns gives the same teams as balancing the models"""
+        # Arrange
+        players = [player.model_copy(update={"available": True}) for player in self._players(12)]
+        roster = Roster()
+        roster.load(players)
+        cache = BalanceCache()
+        balancer = TeamBalancer(strategy="exact", cache=cache)
+        
+        # Act
+        from_roster = balancer.balance_roster(roster, roster.ids([player.name for player in players]))
+        from_models = balancer.balance_teams(players)
+        
+        # Assert
+        assert from_models is from_roster
+        assert cache.hits == 1
+        uncached = TeamBalancer(strategy="exact").balance_teams(players)
+        assert [p.name for p in from_roster[0].players] == [p.name for p in uncached[0].players]
+
+
+class TestMatchSimulator:
+    """Test cases for the MatchSimulator"""
+    
+    def _teams(self):
+        attributes = PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)
+        red = Team(name="Red", players=[Player(name=name, attributes=attributes) for name in ("A", "B", "E")])
+        yellow = Team(name="Yellows", players=[Player(name=name, attributes=attributes) for name in ("C", "D", "F")])
+        return red, yellow
+    
+    def _ratings(self):
+        ratings = RatingEngine()
+        for _ in range(20):
+            ratings.record_teams(["A", "B"], ["C", "D"], 3, 1)
+        return ratings
+    
+    def test_stronger_team_is_favoured_and_seed_is_reproducible(self):
+        """Test that the better-rated team wins more often and a seed fixes the result"""
+        # Arrange
+        simulator = MatchSimulator(self._ratings(), processes=1)
+        red, yellow = self._teams()
+        
+        # Act
+        first = simulator.simulate(red, yellow, simulations=5000, seed=7)
+        second = simulator.simulate(red, yellow, simulations=5000, seed=7)
+        swapped = simulator.simulate(yellow, red, simulations=5000, seed=7)
+        
+        # Assert
+        assert first == second
+        assert first["red_win"] > 0.6 > first["yellow_win"]
+        assert first["expected_goal_difference"] > 0
+        assert first["red_win"] + first["draw"] + first["yellow_win"] == pytest.approx(1.0)
+        assert swapped["yellow_win"] == pytest.approx(first["red_win"], abs=0.03)
+    
+    def test_process_pool_matches_inline_results(self):
+        """Test that fanning chunks out to worker processes gives exactly the inline result"""
+        # Arrange
+        ratings = self._ratings()
+        red, yellow = self._teams()
+        pooled = MatchSimulator(ratings, processes=2)
+        
+        # Act
+        try:
+            from_pool = pooled.simulate(red, yellow, simulations=30000, seed=3, budget=None)
+        finally:
+            pooled.close()
+        inline = MatchSimulator(ratings, processes=1).simulate(red, yellow, simulations=30000, seed=3)
+        
+        # Assert
+        assert from_pool == inline
+        assert from_pool["simulations"] == 30000
+    
+    def test_budget_keeps_a_seeded_prefix_of_chunks(self):
+        """Test that a batch cut short by its budget returns the chunks a shorter seeded batch would"""
+        # Arrange
+        ratings = self._ratings()
+        red, yellow = self._teams()
+        pooled = MatchSimulator(ratings, processes=2)
+        
+        # Act
+        try:
+            # The pool is started before the budget runs, so the first batch is cut short like any other
+            cut_short = pooled.simulate(red, yellow, simulations=200000, seed=42, budget=0)
+        finally:
+            pooled.close()
+        inline = MatchSimulator(ratings, processes=1).simulate(red, yellow, simulations=cut_short["simulations"], seed=42)
+        
+        # Assert
+        assert cut_short["simulations"] < 200000
+        assert cut_short == inline
+    
+    def test_invalid_requests_are_rejected(self):
+        """Test that empty teams and out-of-range batch sizes raise ValueError"""
+        # Arrange
+        simulator = MatchSimulator(processes=1)
+        red, yellow = self._teams()
+        
+        # Act & Assert
+        with pytest.raises(ValueError):
+            simulator.simulate(red, Team(name="Yellows", players=[]))
+        with pytest.raises(ValueError):
+            simulator.simulate(red, yellow, simulations=0)
+
+
+class TestMetrics:
+    """Test cases for the metrics registry and instrumentation"""
+    
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test the Prometheus text rendering of a labelled histogram"""
+        # Arrange
+        registry = metrics.Registry(enabled=True)
+        family = registry.histogram("query_seconds", "Query time", ("method",), buckets=(0.1, 1.0))
+        
+        # Act
+        for value in (0.05, 0.5, 0.5, 3.0):
+            family.labels('get "all"').observe(value)
+        text = registry.render()
+        
+        # Assert
+        assert text.splitlines() == [
+            "# HELP query_seconds Query time",
+            "# TYPE query_seconds histogram",
+            'query_seconds_bucket{method="get \\"all\\"",le="0.1"} 1',
+            'query_seconds_bucket{method="get \\"all\\"",le="1.0"} 3',
+            'query_seconds_bucket{method="get \\"all\\"",le="+Inf"} 4',
+            'query_seconds_sum{method="get \\"all\\""} 4.05',
+            'query_seconds_count{method="get \\"all\\""} 4',
+        ]
+    
+    def test_instrumentation_only_wraps_when_enabled(self):
+        """Test that disabled metrics leave functions untouched and enabled ones time every call"""
+        # Arrange
+        enabled = metrics.Registry(enabled=True).histogram("enabled_seconds", "Timed", ("method",))
+        disabled = metrics.Registry(enabled=False).histogram("disabled_seconds", "Timed", ("method",))
+        
+        class Service:
+            def fetch(self, value):
+                return value * 2
+        
+        def fetch(value):
+            return value * 2
+        
+        # Act
+        untouched = metrics.timed(disabled, "fetch")(fetch)
+        Instrumented = metrics.instrument(enabled)(Service)
+        results = [Instrumented().fetch(i) for i in range(3)]
+        
+        # Assert
+        assert untouched is fetch
+        assert metrics.instrument(disabled)(int) is int
+        assert results == [0, 2, 4]
+        assert sum(enabled.labels("fetch").counts) == 3
+    
+    def test_middleware_records_route_templates(self):
+        """Test that requests are recorded per route template, method and status"""
+        # Arrange
+        from fastapi import FastAPI, HTTPException
+        from fastapi.testclient import TestClient
+        latency = metrics.Registry(enabled=True).histogram("latency_seconds", "Latency", ("method", "route", "status"))
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware, latency=latency)
+        
+        @app.get("/players/{name}")
+        async def get_player(name: str):
+            if name == "Nobody":
+                raise HTTPException(status_code=404)
+            return {"name": name}
+        
+        client = TestClient(app)
+        
+        # Act
+        for name in ("Dermot", "Tom", "Nobody"):
+            client.get(f"/players/{name}")
+        client.get("/missing")
+        
+        # Assert
+        recorded = {labels: sum(series.counts) for labels, series in latency.series.items()}
+        assert recorded == {
+            ("GET", "/players/{name}", "200"): 2,
+            ("GET", "/players/{name}", "404"): 1,
+            ("GET", "unmatched", "404"): 1,
+        }
+
+
+
+def _spin_until(event: threading.Event):
+    while not event.is_set():
+        sum(range(1000))
+
+
+class TestProfiler:
+    """Test cases for the sampling profiler and per-request traces"""
+    
+    def test_sampling_sees_busy_worker_threads(self):
+        """Test that collapsed stacks include a busy thread's function under its thread name"""
+        # Arrange
+        sampler = profiler.SamplingProfiler()
+        stop = threading.Event()
+        worker = threading.Thread(target=_spin_until, args=(stop,), name="busy-worker")
+        worker.start()
+        
+        # Act
+        try:
+            stacks, rounds = sampler.sample(0.2, interval=0.001)
+        finally:
+            stop.set()
+            worker.join()
+        lines = profiler.collapsed(stacks).splitlines()
+        
+        # Assert
+        assert rounds > 0
+        busy = [line for line in lines if line.startswith("busy-worker;")]
+        assert busy and all("_spin_until" in line for line in busy)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        # Idle waits are dropped unless asked for
+        assert not any(line.endswith(("selectors:BaseSelector.select", "threading:Condition.wait"))
+                       for line in (line.rsplit(" ", 1)[0] for line in lines))
+    
+    def test_one_sampling_run_at_a_time(self):
+        """Test that a second sampling run is refused while one is in progress"""
+        # Arrange
+        sampler = profiler.SamplingProfiler()
+        worker = threading.Thread(target=sampler.sample, args=(0.3,))
+        worker.start()
+        
+        # Act / Assert
+        try:
+            while not sampler._lock.locked():
+                pass
+            with pytest.raises(profiler.ProfilerBusy):
+                sampler.sample(0.1)
+        finally:
+            worker.join()
+    
+    def test_executor_calls_join_the_request_profile(self):
+        """Test that blocking calls made while a request is traced are profiled on the worker thread"""
+        # Arrange
+        executor = BoundedExecutor(max_workers=1)
+        request_profile = profiler.RequestProfile()
+        
+        async def traced():
+            token = profiler._current_profile.set(request_profile)
+            try:
+                return await executor.run(exact_split, [float(i) for i in range(12)], 6)
+            finally:
+                profiler._current_profile.reset(token)
+        
+        # Act
+        try:
+            result = asyncio.run(traced())
+            untraced = asyncio.run(executor.run(exact_split, [float(i) for i in range(12)], 6))
+        finally:
+            executor.shutdown()
+        summary = request_profile.summary()
+        
+        # Assert
+        assert result == untraced
+        assert "exact_split" in summary
+        assert "cumulative" in summary
+
+
+class TestResources:
+    """Test cases for the lazily built app resources and settings"""
+    
+    def test_settings_from_environment(self):
+        """Test reading settings from FOOTBALL_* variables, with defaults for the rest"""
+        # Act
+        defaults = Settings.from_env({})
+        configured = Settings.from_env({"FOOTBALL_DB_PATH": "/data/teams.db", "FOOTBALL_WORKERS": "4"})
+        
+        # Assert
+        assert defaults == Settings()
+        assert configured.db_path == "/data/teams.db"
+        assert configured.workers == 4
+        with pytest.raises(ValueError):
+            Settings.from_env({"FOOTBALL_WORKERS": "0"})
+        with pytest.raises(ValueError):
+            Settings.from_env({"FOOTBALL_WORKERS": "many"})
+    
+    def test_nothing_is_opened_until_first_use(self):
+        """Test that creating resources leaves the database alone until something needs it"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        db_path = os.path.join(directory, "lazy.db")
+        
+        try:
+            # Act
+            resources = Resources(Settings(db_path=db_path, simulator_processes=1))
+            created_early = os.path.exists(db_path)
+            players = len(resources.roster)
+            
+            # Assert
+            assert not created_early
+            assert resources.loaded
+            assert os.path.exists(db_path)
+            assert players == 0
+            resources.close()
+            assert not resources.loaded
+        finally:
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+    
+    def test_teammate_counts_only_hold_players_from_games(self):
+        """Test that a large stored roster does not size the teammate matrices, only the players in games do"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        attributes = PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)
+        players = [Player(name=f"P{i}", attributes=attributes) for i in range(5000)]
+        
+        try:
+            resources = Resources(Settings(db_path=db_path, simulator_processes=1))
+            resources.database.save_players(players)
+            
+            # Act
+            resources.game_recorder.record_game("2024-01-01", Team(name="Red", players=players[4990:4995]),
+                                                Team(name="Yellows", players=players[4995:]),
+                                                GameScore(red_score=2, yellow_score=1))
+            partnerships = resources.game_recorder.partnerships
+            
+            # Assert
+            assert len(resources.roster) == 5000
+            assert len(partnerships.index) == 10
+            assert partnerships.together.shape == (64, 64)
+            assert partnerships.won[partnerships.player_ids["P4990"], partnerships.player_ids["P4994"]] == 1
+            resources.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def test_sync_catches_up_on_writes_by_another_process(self):
+        """Test that sync applies only the games another process recorded, without rebuilding the state"""
+        # Arrange
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp:
+            db_path = tmp.name
+        settings = Settings(db_path=db_path, workers=2, simulator_processes=1)
+        players = [Player(name=f"P{i}", attributes=PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5))
+                   for i in range(4)]
+        
+        try:
+            resources = Resources(settings)
+            other = Resources(settings)
+            resources.load()
+            first_state = resources.game_recorder
+            
+            # Act
+            resources.database.save_players(players[:2])
+            own_write_changed = resources.changed()
+            resources.sync()
+            state_after_own_write = resources.game_recorder
+            resources.game_recorder.record_game("2024-01-01", Team(name="Red", players=players[:1]),
+                                                Team(name="Yellows", players=players[1:2]),
+                                                GameScore(red_score=2, yellow_score=2))
+            other.game_recorder.record_game("2024-01-02", Team(name="Red", players=players[:1]),
+                                            Team(name="Yellows", players=players[1:2]),
+                                            GameScore(red_score=1, yellow_score=0))
+            other_write_changed = resources.changed()
+            resources.sync()
+            
+            # Assert
+            assert own_write_changed
+            assert state_after_own_write is first_state
+            assert not resources.changed()
+            assert other_write_changed
+            assert resources.game_recorder is first_state
+            assert resources.game_recorder.get_player_performance_stats("P0")["total_games"] == 2
+            # The game recorded here is applied once, the other process's game once more
+            assert resources.game_recorder.ratings.rating("P0")["games"] == 2
+            assert resources.game_recorder.ratings.rating("P0")["mu"] > resources.game_recorder.ratings.rating("P1")["mu"]
+            assert "P1" in resources.roster and "P2" not in resources.roster
+            resources.close()
+            other.close()
+        finally:
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+
+class TestLeagues:
+    """Test cases for the per-league databases and their open-league cache"""
+    
+    def test_least_recently_used_and_idle_leagues_are_closed(self):
+        """Test that the cache stays within its limit, evicts idle leagues and never closes a leased one"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        now = [0.0]
+        settings = Settings(leagues_dir=directory, simulator_processes=1, max_open_leagues=2, league_idle_seconds=60)
+        executor = BoundedExecutor(max_workers=1)
+        leagues = Leagues(settings, executor, clock=lambda: now[0])
+        
+        try:
+            for name in ("a", "b", "c"):
+                leagues.create(name)
+            
+            # Act
+            first = leagues.acquire("a")
+            loaded = first.loaded
+            leagues.release("a")
+            leagues.acquire("b")
+            leagues.release("b")
+            leagues.acquire("c")
+            bounded = leagues.open_leagues()
+            now[0] = 100.0
+            idle_closed = leagues.evict_idle()
+            leagues.release("c")
+            
+            # Assert
+            assert leagues.names() == ["a", "b", "c"]
+            assert loaded
+            assert bounded == ["b", "c"]
+            assert not first.loaded
+            assert idle_closed == 1
+            assert leagues.open_leagues() == ["c"]
+            assert first.executor is executor
+            with pytest.raises(LeagueNotFound):
+                leagues.acquire("d")
+            with pytest.raises(ValueError):
+                leagues.create("../escape")
+        finally:
+            leagues.close()
+            executor.shutdown()
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+    
+    def test_leagues_share_one_simulation_pool(self):
+        """Test that every league's simulator runs in the same worker processes, which closing a league leaves running"""
+        # Arrange
+        directory = tempfile.mkdtemp()
+        settings = Settings(leagues_dir=directory, max_open_leagues=1)
+        executor = BoundedExecutor(max_workers=1)
+        pool = SimulationPool(processes=2)
+        leagues = Leagues(settings, executor, simulation_pool=pool)
+        
+        try:
+            for name in ("a", "b"):
+                leagues.create(name)
+            started = pool.executor()
+            
+            # Act
+            first = leagues.acquire("a").simulator
+            leagues.release("a")
+            # Only one league stays open, so this closes the first
+            second = leagues.acquire("b").simulator
+            leagues.release("b")
+            leagues.close()
+            
+            # Assert
+            assert first.pool is pool and second.pool is pool
+            assert pool.executor() is started
+        finally:
+            pool.close()
+            executor.shutdown()
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+class TestEventHub:
+    """Test cases for pushing change events to connected clients"""
+    
+    def test_events_reach_subscribers_and_are_replayed_after_reconnecting(self):
+        """Test that events published from another thread reach subscribers, and Last-Event-ID replays missed ones"""
+        # Arrange
+        hub = EventHub()
+        
+        async def scenario():
+            subscription = hub.subscribe()
+            publisher = threading.Thread(target=lambda: [hub.publish("player", {"name": name})
+                                                         for name in ("Alice", "Bob")])
+            publisher.start()
+            publisher.join()
+            received = b""
+            while received.count(b"event: player") < 2:
+                received += await subscription.next_frames(1.0)
+            hub.unsubscribe(subscription)
+            first_id = f"{hub.epoch}:1"
+            replayed = await hub.subscribe(first_id).next_frames(1.0)
+            forgotten = await hub.subscribe("elsewhere:1").next_frames(1.0)
+            current = await hub.subscribe(hub.last_event_id).next_frames(0.01)
+            return received, replayed, forgotten, current
+        
+        # Act
+        received, replayed, forgotten, current = asyncio.run(scenario())
+        
+        # Assert
+        assert received == hub.encode(1, "player", {"name": "Alice"}) + hub.encode(2, "player", {"name": "Bob"})
+        assert replayed == hub.encode(2, "player", {"name": "Bob"})
+        # Events from another hub, e.g. before a restart, cannot be replayed
+        assert forgotten == hub.encode(2, RESYNC, {})
+        assert current == b""
+    
+    def test_slow_subscriber_gets_one_resync_instead_of_a_backlog(self):
+        """Test that a subscriber falling too far behind has its queue dropped for a single resync"""
+        # Arrange
+        hub = EventHub(queue_size=3)
+        
+        async def scenario():
+            slow = hub.subscribe()
+            fast = hub.subscribe()
+            caught_up = b""
+            for number in range(10):
+                hub.publish("player", {"number": number})
+                # Let the loop fan out, as it would between requests
+                await asyncio.sleep(0)
+                caught_up += await fast.next_frames(1.0)
+            return await slow.next_frames(1.0), caught_up
+        
+        # Act
+        lagged, caught_up = asyncio.run(scenario())
+        
+        # Assert
+        assert lagged == hub.encode(10, RESYNC, {})
+        assert caught_up.count(b"event: player") == 10
+    
+    def test_stream_ends_after_its_duration(self):
+        """Test that a stream sends a retry hint and keepalives, then ends and unsubscribes"""
+        # Arrange
+        hub = EventHub()
+        
+        async def scenario():
+            chunks = [chunk async for chunk in await hub.stream(duration=0.1, keepalive=0.04)]
+            return chunks, hub.subscribers
+        
+        # Act
+        chunks, subscribers = asyncio.run(scenario())
+        
+        # Assert
+        assert chunks[0].startswith(b"retry: ")
+        assert set(chunks[1:]) == {b": keepalive\n\n"}
+        assert subscribers == 0
\ No newline at end of file
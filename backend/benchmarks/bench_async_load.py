@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Latency percentiles of the API under concurrent mixed reads and writes, with
+blocking calls made inline on the event loop versus on the bounded executor.
+
+The "inline" server replays the original handlers, which called the database
+directly from async code, so every slow query stalled every other request in
+flight. Each server runs under uvicorn in its own process. Requests arrive
+on a fixed schedule whether or not earlier ones have finished, and latency is
+measured from the scheduled time, so a stalled server cannot hide its stalls
+by slowing the client down.
+
+Run from the backend directory:
+    python -m benchmarks.bench_async_load
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from app.models.game import GameScore, Team
+from app.models.player import Player, PlayerAttributes
+from app.services.database import DatabaseService
+from app.services.game_recorder import GameRecorder
+
+
+PLAYERS = 60
+GAMES = 2000
+RATE = 20  # requests per second
+DURATION = 15  # seconds
+PORT = 8765
+
+# Share of requests per endpoint; the history reads are the slow ones
+MIX = (
+    ("GET /players/", 0.55),
+    ("GET /players/{name}/stats", 0.2),
+    ("GET /games/?limit=200", 0.1),
+    ("POST /games/", 0.15),
+)
+
+
+class InlineExecutor:
+    """Runs calls directly on the event loop, like the handlers used to"""
+    
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def make_player(i):
+    return Player(
+        name=f"Player {i}",
+        attributes=PlayerAttributes(attacking=1 + i % 10, defending=1 + (i * 3) % 10,
+                                    goalkeeping=1 + (i * 7) % 10, energy=1 + (i * 9) % 10)
+    )
+
+
+def game_body(rng, players):
+    picked = rng.sample(players, 10)
+    return {
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "red_team": {"name": "Red", "players": [p.model_dump() for p in picked[:5]]},
+        "yellow_team": {"name": "Yellows", "players": [p.model_dump() for p in picked[5:]]},
+        "score": {"red_score": rng.randint(0, 5), "yellow_score": rng.randint(0, 5)}
+    }
+
+
+def build_database(db_path, players):
+    database = DatabaseService(db_path)
+    recorder = GameRecorder(database)
+    for player in players:
+        database.save_player(player)
+    rng = random.Random(0)
+    for _ in range(GAMES):
+        body = game_body(rng, players)
+        recorder.record_game(body["date"], Team(**body["red_team"]), Team(**body["yellow_team"]),
+                             GameScore(**body["score"]))
+    database.close()
+
+
+def serve(mode, db_path, port):
+    import uvicorn
+    from app import main as api
+    
+    api.database.close()
+    api.database = DatabaseService(db_path)
+    api.game_recorder = GameRecorder(api.database)
+    if mode == "inline":
+        api.executor = InlineExecutor()
+    uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def send(client, kind, rng, players):
+    if kind == "GET /players/":
+        return await client.get("/players/")
+    if kind == "GET /players/{name}/stats":
+        return await client.get(f"/players/{rng.choice(players).name}/stats")
+    if kind == "GET /games/?limit=200":
+        return await client.get("/games/", params={"limit": 200})
+    return await client.post("/games/", json=game_body(rng, players))
+
+
+async def load(base_url, players):
+    rng = random.Random(1)
+    kinds = [kind for kind, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    latencies = defaultdict(list)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def request(kind, scheduled):
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await send(client, kind, rng, players)
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - scheduled)
+        
+        # Poisson arrivals at RATE requests per second
+        start = time.perf_counter() + 0.5
+        scheduled, tasks = start, []
+        while scheduled < start + DURATION:
+            tasks.append(asyncio.ensure_future(request(rng.choices(kinds, weights)[0], scheduled)))
+            scheduled += rng.expovariate(RATE)
+        await asyncio.gather(*tasks)
+    return latencies
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))] * 1000
+
+
+def wait_until_up(base_url, server):
+    for _ in range(200):
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            httpx.get(base_url + "/", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("Server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--serve", choices=("inline", "executor"), help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=PORT, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.db, args.port)
+        return
+    
+    players = [make_player(i) for i in range(PLAYERS)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, "template.db")
+        build_database(template, players)
+        for mode in ("inline", "executor"):
+            # Each server starts from the same history
+            db_path = os.path.join(directory, f"{mode}.db")
+            shutil.copy(template, db_path)
+            server = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.bench_async_load", "--serve", mode, "--db", db_path],
+                cwd=directory, env={**os.environ, "PYTHONPATH": os.getcwd()}
+            )
+            try:
+                base_url = f"http://127.0.0.1:{PORT}"
+                wait_until_up(base_url, server)
+                results[mode] = asyncio.run(load(base_url, players))
+            finally:
+                server.terminate()
+                server.wait()
+    
+    print(f"{RATE} req/s for {DURATION}s against {GAMES} recorded games")
+    print(f"{'endpoint':>26} {'inline p50':>11} {'inline p99':>11} {'pool p50':>9} {'pool p99':>9}  (ms)")
+    for kind, _ in MIX:
+        inline, pooled = results["inline"][kind], results["executor"][kind]
+        print(f"{kind:>26} {percentile(inline, 0.5):>11.1f} {percentile(inline, 0.99):>11.1f} "
+              f"{percentile(pooled, 0.5):>9.1f} {percentile(pooled, 0.99):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Requests/sec of DatabaseService with a connection per call versus the pooled
+WAL connections.
+
+The "before" numbers replay the original access pattern: open a connection
+with default pragmas, run one statement, close it.
+
+Run from the backend directory:
+    python -m benchmarks.bench_database
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.player import Player, PlayerAttributes
+from app.services.database import DatabaseService
+
+
+PLAYERS = 200
+OPERATIONS = 4000
+THREADS = 8
+
+
+def make_player(i):
+    return Player(
+        name=f"Player {i}",
+        attributes=PlayerAttributes(attacking=1 + i % 10, defending=1 + (i * 3) % 10,
+                                    goalkeeping=1 + (i * 7) % 10, energy=1 + (i * 9) % 10)
+    )
+
+
+def unpooled_get_player(db_path, name):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('''
+            SELECT name, attacking, defending, goalkeeping, energy, available
+            FROM players WHERE name = ?
+        ''', (name,)).fetchone()
+    finally:
+        conn.close()
+
+
+def unpooled_save_player(db_path, player):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO players
+                (name, attacking, defending, goalkeeping, energy, available)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (player.name, player.attributes.attacking, player.attributes.defending,
+                  player.attributes.goalkeeping, player.attributes.energy, player.available))
+    finally:
+        conn.close()
+
+
+def requests_per_second(operation, count, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(count):
+            operation(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(operation, range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    players = [make_player(i) for i in range(PLAYERS)]
+    with tempfile.TemporaryDirectory() as directory:
+        before_path = os.path.join(directory, "before.db")
+        after_path = os.path.join(directory, "after.db")
+        
+        # The "before" database keeps SQLite's default rollback journal
+        DatabaseService(before_path).close()
+        conn = sqlite3.connect(before_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        database = DatabaseService(after_path)
+        for player in players:
+            unpooled_save_player(before_path, player)
+            database.save_player(player)
+        
+        workloads = {
+            "get_player": (
+                lambda i: unpooled_get_player(before_path, players[i % PLAYERS].name),
+                lambda i: database.get_player(players[i % PLAYERS].name),
+            ),
+            "save_player": (
+                lambda i: unpooled_save_player(before_path, players[i % PLAYERS]),
+                lambda i: database.save_player(players[i % PLAYERS]),
+            ),
+        }
+        
+        print(f"{'operation':>12} {'threads':>7} {'before req/s':>13} {'after req/s':>12} {'speedup':>8}")
+        for name, (before, after) in workloads.items():
+            for threads in (1, THREADS):
+                before_rate = requests_per_second(before, OPERATIONS, threads)
+                after_rate = requests_per_second(after, OPERATIONS, threads)
+                print(f"{name:>12} {threads:>7} {before_rate:>13.0f} {after_rate:>12.0f} "
+                      f"{after_rate / before_rate:>7.1f}x")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Time to turn stored players and games into response bytes, re-validating
+every row through the pydantic models versus the trusted-row path.
+
+The "validated" numbers replay the original read path: build each row with
+the validating model constructors, then let FastAPI validate the list again
+against the response model and encode it with jsonable_encoder and json.dumps.
+"model_construct" builds the same models without validation and encodes them
+with a TypeAdapter; "records" goes from rows to plain dicts to fast_json.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization
+"""
+import json
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.game import Game, GameScore, Team
+from app.models.player import Player, PlayerAttributes
+from app.services import fast_json
+from app.services.database import DatabaseService
+
+
+PLAYERS = 10000
+GAMES = 5000
+ROUNDS = 5
+
+PLAYER_LIST = TypeAdapter(List[Player])
+GAME_LIST = TypeAdapter(List[Game])
+
+
+def make_player(i):
+    return Player(
+        name=f"Player {i}",
+        attributes=PlayerAttributes(attacking=1 + i % 10, defending=1 + (i * 3) % 10,
+                                    goalkeeping=1 + (i * 7) % 10, energy=1 + (i * 9) % 10)
+    )
+
+
+def validated_player(row):
+    return Player(
+        name=row[0],
+        attributes=PlayerAttributes(attacking=row[1], defending=row[2], goalkeeping=row[3], energy=row[4]),
+        available=bool(row[5])
+    )
+
+
+def validated_games(game_rows, participant_rows):
+    teams = {}
+    for game_id, team, *player_row in participant_rows:
+        teams.setdefault((game_id, team), []).append(validated_player(player_row))
+    return [
+        Game(id=game_id, date=date,
+             red_team=Team(name="Red", players=teams.get((game_id, "red"), [])),
+             yellow_team=Team(name="Yellows", players=teams.get((game_id, "yellow"), [])),
+             score=GameScore(red_score=red_score, yellow_score=yellow_score))
+        for game_id, date, red_score, yellow_score in game_rows
+    ]
+
+
+def fastapi_response(adapter, values):
+    # What a response_model endpoint did: validate, dump, jsonable_encoder, json.dumps
+    content = jsonable_encoder(adapter.dump_python(adapter.validate_python(values), mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fetch_players(database):
+    with database._pool.transaction() as conn:
+        return conn.execute("SELECT name, attacking, defending, goalkeeping, energy, available FROM players").fetchall()
+
+
+def fetch_games(database):
+    with database._pool.transaction() as conn:
+        return database._query_full_game_page(conn, None, GAMES, None, None, None)
+
+
+def milliseconds(func):
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    players = [make_player(i) for i in range(PLAYERS)]
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        database = DatabaseService(os.path.join(directory, "bench.db"))
+        database.save_players(players)
+        for i in range(GAMES):
+            picked = rng.sample(players[:60], 10)
+            database.save_game(Game(date=f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                                    red_team=Team(name="Red", players=picked[:5]),
+                                    yellow_team=Team(name="Yellows", players=picked[5:]),
+                                    score=GameScore(red_score=rng.randint(0, 5), yellow_score=rng.randint(0, 5))))
+        
+        paths = {
+            f"{PLAYERS} players": (
+                lambda: fastapi_response(PLAYER_LIST, [validated_player(row) for row in fetch_players(database)]),
+                lambda: PLAYER_LIST.dump_json(database.get_all_players()),
+                lambda: fast_json.dumps(database.get_all_player_records()),
+            ),
+            f"{GAMES} games": (
+                lambda: fastapi_response(GAME_LIST, validated_games(*fetch_games(database))),
+                lambda: GAME_LIST.dump_json(database.list_games(limit=GAMES)),
+                lambda: fast_json.dumps(database.list_game_records(limit=GAMES)),
+            ),
+        }
+        
+        print(f"encoder: {'orjson' if fast_json.orjson else 'json'}")
+        print(f"{'':>14} {'validated':>10} {'model_construct':>16} {'records':>8} {'speedup':>8}  (ms, incl. query)")
+        for label, (validated, constructed, records) in paths.items():
+            # Every path has to produce the same document
+            assert json.loads(validated()) == json.loads(constructed()) == json.loads(records())
+            before, middle, after = milliseconds(validated), milliseconds(constructed), milliseconds(records)
+            print(f"{label:>14} {before:>10.1f} {middle:>16.1f} {after:>8.1f} {before / after:>7.1f}x")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Latency of the match simulator per batch size, in the calling thread versus
+fanned out over the process pool.
+
+The first pooled batch pays for starting the worker processes and is
+reported separately. With a single CPU the pool cannot beat inline runs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_simulator
+"""
+import os
+import statistics
+import time
+
+from app.models.game import Team
+from app.models.player import Player, PlayerAttributes
+from app.services.rating import RatingEngine
+from app.services.simulator import MatchSimulator
+
+
+BATCH_SIZES = (10_000, 50_000, 200_000, 1_000_000)
+RUNS = 5
+
+
+def make_team(name, prefix):
+    attributes = PlayerAttributes(attacking=5, defending=5, goalkeeping=5, energy=5)
+    return Team(name=name, players=[Player(name=f"{prefix} {i}", attributes=attributes) for i in range(7)])
+
+
+def median_ms(simulator, red, yellow, simulations):
+    timings = []
+    for run in range(RUNS):
+        start = time.perf_counter()
+        simulator.simulate(red, yellow, simulations, seed=run, budget=None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    ratings = RatingEngine()
+    red, yellow = make_team("Red", "R"), make_team("Yellows", "Y")
+    for _ in range(50):
+        ratings.record_teams([p.name for p in red.players], [p.name for p in yellow.players], 4, 3)
+    
+    inline = MatchSimulator(ratings, processes=1)
+    pooled = MatchSimulator(ratings, processes=max(2, os.cpu_count() or 1))
+    try:
+        start = time.perf_counter()
+        pooled.simulate(red, yellow, 50_000, seed=0, budget=None)
+        print(f"{os.cpu_count()} CPUs, {pooled.processes} workers, "
+              f"first pooled batch {(time.perf_counter() - start) * 1000:.0f} ms (process start-up)")
+        print(f"{'simulations':>11} {'inline ms':>10} {'pool ms':>8}")
+        for simulations in BATCH_SIZES:
+            print(f"{simulations:>11} {median_ms(inline, red, yellow, simulations):>10.1f} "
+                  f"{median_ms(pooled, red, yellow, simulations):>8.1f}")
+    finally:
+        pooled.close()
+
+
+if __name__ == "__main__":
+    main()
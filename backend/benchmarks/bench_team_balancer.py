@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Latency of the team split engines per squad size.
+
+Run from the backend directory:
+    python -m benchmarks.bench_team_balancer
+"""
+import random
+import statistics
+import time
+
+from app.services.split_search import exact_split, greedy_split, split_difference
+
+
+SQUAD_SIZES = range(10, 32, 2)
+RUNS = 5
+
+
+def time_split(split, scores, team_size):
+    """Median wall time of a split engine in milliseconds"""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        team = split(scores, team_size)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), team
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'players':>7} {'greedy ms':>10} {'greedy diff':>12} {'exact ms':>10} {'exact diff':>11}")
+    for size in SQUAD_SIZES:
+        # Total skill is the sum of four 1-10 attributes
+        scores = [sum(rng.randint(1, 10) for _ in range(4)) for _ in range(size)]
+        greedy_ms, greedy_team = time_split(greedy_split, scores, size // 2)
+        exact_ms, exact_team = time_split(exact_split, scores, size // 2)
+        print(f"{size:>7} {greedy_ms:>10.3f} {split_difference(scores, greedy_team):>12} "
+              f"{exact_ms:>10.3f} {split_difference(scores, exact_team):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic players and multi-season game histories for the benchmarks.
+
+Everything is generated from a seed, so two runs at the same scale see the
+same data and their timings can be compared.
+"""
+import datetime
+import math
+import random
+from typing import Dict, Iterator, List, NamedTuple
+
+from app.models.game import Game, GameScore, Team
+from app.models.player import Player, PlayerAttributes
+from app.services.database import INSERT_PARTICIPANT, DatabaseService
+
+
+class Scale(NamedTuple):
+    players: int
+    games: int
+    seasons: int
+    # Players picked for one game, e.g. for the balancing benchmarks
+    squad: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(players=100, games=1_000, seasons=3, squad=14),
+    "medium": Scale(players=1_000, games=10_000, seasons=5, squad=20),
+    "large": Scale(players=10_000, games=100_000, seasons=10, squad=28),
+}
+
+# A season runs from early September for this many weekly match days
+WEEKS_PER_SEASON = 40
+
+# Share of a season's players who also played the season before
+RETAINED = 0.7
+
+
+def make_player(i: int, rng: random.Random) -> Player:
+    """One player with attributes spread around the middle of the 1-10 range"""
+    def attribute(mean: float) -> int:
+        return max(1, min(10, round(rng.gauss(mean, 2))))
+    
+    return Player(
+        name=f"Player {i:06d}",
+        attributes=PlayerAttributes(attacking=attribute(5.5), defending=attribute(5.5),
+                                    # Most players are poor in goal
+                                    goalkeeping=attribute(3.5), energy=attribute(6)),
+        available=rng.random() < 0.75
+    )
+
+
+def make_players(count: int, seed: int = 0) -> List[Player]:
+    """A squad of players, roughly three in four of them available"""
+    rng = random.Random(seed)
+    return [make_player(i, rng) for i in range(count)]
+
+
+def make_history(players: List[Player], games: int, seasons: int, seed: int = 0) -> Iterator[Game]:
+    """
+    Generate games in date order over several seasons of weekly match days.
+    
+    Each season has its own pool of regulars; most carry over from the
+    season before and the rest are new faces, so partnerships and ratings
+    drift the way a real club's do. Bigger histories get more pitches per
+    match day rather than more seasons. Scores follow the teams' total
+    skill with plenty of noise.
+    """
+    rng = random.Random(seed)
+    match_days = seasons * WEEKS_PER_SEASON
+    pool_size = max(14, min(len(players), math.ceil(len(players) / seasons)))
+    pool = rng.sample(players, pool_size)
+    first_day = datetime.date(2015, 9, 5)
+    current_season = 0
+    
+    for game_index in range(games):
+        season, week = divmod(game_index * match_days // games, WEEKS_PER_SEASON)
+        if season != current_season:
+            # New season: keep most regulars, replace the rest
+            current_season = season
+            kept = rng.sample(pool, int(pool_size * RETAINED))
+            kept_names = {player.name for player in kept}
+            newcomers = [player for player in players if player.name not in kept_names]
+            pool = kept + rng.sample(newcomers, min(len(newcomers), pool_size - len(kept)))
+        date = first_day + datetime.timedelta(days=364 * season + 7 * week)
+        
+        squad = rng.sample(pool, min(len(pool), rng.choice((10, 12, 14))))
+        half = len(squad) // 2
+        red, yellow = squad[:half], squad[half:]
+        edge = (sum(map(_score, red)) - sum(map(_score, yellow))) / (4 * half)
+        yield Game(
+            date=date.isoformat(),
+            red_team=Team(name="Red", players=red),
+            yellow_team=Team(name="Yellows", players=yellow),
+            score=GameScore(red_score=_goals(rng, 3 + edge), yellow_score=_goals(rng, 3 - edge))
+        )
+
+
+def build_database(db_path: str, scale: Scale, seed: int = 0) -> DatabaseService:
+    """
+    Create a database holding a generated squad and history.
+    
+    Rows are written in one transaction and the player_stats totals are
+    rebuilt once at the end, which is far quicker than save_game per game.
+    """
+    players = make_players(scale.players, seed)
+    database = DatabaseService(db_path)
+    database.save_players(players)
+    with database._pool.transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        for game in make_history(players, scale.games, scale.seasons, seed):
+            cursor.execute('INSERT INTO games (date, red_score, yellow_score) VALUES (?, ?, ?)',
+                           (game.date, game.score.red_score, game.score.yellow_score))
+            game_id = cursor.lastrowid
+            cursor.executemany(INSERT_PARTICIPANT, [
+                (game_id, p.name, team, position, p.attributes.attacking, p.attributes.defending,
+                 p.attributes.goalkeeping, p.attributes.energy, p.available)
+                for team, members in (("red", game.red_team.players), ("yellow", game.yellow_team.players))
+                for position, p in enumerate(members)
+            ])
+        conn.commit()
+    database.rebuild_player_stats()
+    return database
+
+
+def _score(player: Player) -> int:
+    attributes = player.attributes
+    return attributes.attacking + attributes.defending + attributes.goalkeeping + attributes.energy
+
+
+def _goals(rng: random.Random, mean: float) -> int:
+    # Poisson by inversion; means stay small
+    mean = max(mean, 0.3)
+    goals, threshold, product = 0, math.exp(-mean), rng.random()
+    while product > threshold:
+        goals += 1
+        product *= rng.random()
+    return goals
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Regression benchmarks for the balancer, database and API hot paths.
+
+Micro-benchmarks time single service calls against a generated database;
+API benchmarks send concurrent requests to every route of the app in
+process, through httpx's ASGI transport, so no server or network is
+involved. Results are written as JSON and compared against a stored
+baseline, failing when anything got slower than the threshold allows.
+
+Run from the backend directory:
+    python -m benchmarks.suite run --scale small              # print results
+    python -m benchmarks.suite run --scale small --save       # store as benchmarks/baselines/small.json
+    python -m benchmarks.suite run --scale small --compare    # exit 1 on regressions against that baseline
+    python -m benchmarks.suite compare OLD.json NEW.json      # compare two stored runs
+
+Baselines only mean something on the machine that recorded them; record a
+fresh one before comparing on different hardware.
+"""
+import argparse
+import asyncio
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.services import fast_json
+from app.services.game_recorder import GameRecorder
+from app.services.rating import RatingEngine
+from app.services.roster import Roster
+from app.services.team_balancer import STRATEGIES, TeamBalancer
+from benchmarks.data import SCALES, Scale, build_database, make_history, make_players
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# A benchmark may be this much slower than its baseline before it counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Changes smaller than this are timer noise, however large they are relatively
+NOISE_FLOOR_MS = 0.05
+
+# Each benchmark runs at least MIN_RUNS times and then until MIN_SECONDS have passed,
+# but stops after MAX_SECONDS so the slowest calls at large scale stay affordable;
+# API benchmarks send API_REQUESTS requests within the same MAX_SECONDS
+MIN_RUNS = 5
+MIN_SECONDS = 0.5
+MAX_SECONDS = 10.0
+
+# Requests per route and how many are in flight at once in the API benchmarks
+API_REQUESTS = 200
+API_CONCURRENCY = 8
+
+
+class Context:
+    """Generated data shared by every benchmark of one run"""
+    
+    def __init__(self, scale: Scale, directory: str, seed: int = 0):
+        self.scale = scale
+        self.directory = directory
+        self.players = make_players(scale.players, seed)
+        self.database = build_database(os.path.join(directory, "bench.db"), scale, seed)
+        available = [player for player in self.players if player.available]
+        self.squad = available[:scale.squad]
+        self.names = [player.name for player in self.players]
+        self.rng = random.Random(seed)
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # Builds the call to time from the shared context
+    setup: Callable[[Context], Callable[[], Any]]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def micro(name: str):
+    """Register a micro-benchmark; the decorated function returns the call to time"""
+    def register(setup: Callable[[Context], Callable[[], Any]]):
+        BENCHMARKS.append(Benchmark(f"micro.{name}", setup))
+        return setup
+    return register
+
+
+for _strategy in STRATEGIES:
+    @micro(f"balancer.balance_teams.{_strategy}")
+    def _balance_teams(context: Context, strategy=_strategy):
+        # The exhaustive strategies get the squad; differencing is meant for the whole club
+        players = context.players if strategy == "differencing" else context.squad
+        balancer = TeamBalancer(strategy=strategy)
+        return lambda: balancer.balance_teams(players)
+
+
+@micro("balancer.top_splits")
+def _top_splits(context: Context):
+    balancer = TeamBalancer()
+    return lambda: balancer.top_splits(context.squad, k=5)
+
+
+@micro("balancer.balance_roster")
+def _balance_roster(context: Context):
+    roster = Roster()
+    roster.load(context.players)
+    ids = roster.ids([player.name for player in context.squad])
+    balancer = TeamBalancer(strategy="exact")
+    return lambda: balancer.balance_roster(roster, ids)
+
+
+@micro("database.get_all_players")
+def _get_all_players(context: Context):
+    return context.database.get_all_players
+
+
+@micro("database.get_all_player_records+encode")
+def _get_all_player_records(context: Context):
+    return lambda: fast_json.dumps(context.database.get_all_player_records())
+
+
+@micro("database.get_all_games")
+def _get_all_games(context: Context):
+    return context.database.get_all_games
+
+
+@micro("database.list_game_records.page")
+def _list_game_records(context: Context):
+    return lambda: context.database.list_game_records(limit=100)
+
+
+@micro("database.list_games.player")
+def _list_player_games(context: Context):
+    return lambda: context.database.list_games(limit=100, player=context.rng.choice(context.names))
+
+
+@micro("database.get_player_stats")
+def _get_player_stats(context: Context):
+    return lambda: context.database.get_player_stats(context.rng.choice(context.names))
+
+
+@micro("database.save_game")
+def _save_game(context: Context):
+    # More games than any run will save
+    games = make_history(context.players, 1_000_000, 1, seed=1)
+    return lambda: context.database.save_game(next(games))
+
+
+@micro("recorder.load_history")
+def _load_history(context: Context):
+    return lambda: GameRecorder(context.database)
+
+
+@micro("rating.replay")
+def _rating_replay(context: Context):
+    summaries = list(context.database.iter_game_summaries())
+    return lambda: RatingEngine().replay(summaries)
+
+
+def _player_body(context: Context) -> Dict[str, Any]:
+    return context.rng.choice(context.players).model_dump()
+
+
+def _game_body(context: Context) -> Dict[str, Any]:
+    squad = context.rng.sample(context.squad, 10)
+    return {
+        "date": "2030-01-05",
+        "red_team": {"name": "Red", "players": [player.model_dump() for player in squad[:5]]},
+        "yellow_team": {"name": "Yellows", "players": [player.model_dump() for player in squad[5:]]},
+        "score": {"red_score": context.rng.randint(0, 5), "yellow_score": context.rng.randint(0, 5)}
+    }
+
+
+def _put_player(context: Context) -> Tuple[str, str, Dict[str, Any]]:
+    body = _player_body(context)
+    return "PUT", f"/players/{body['name']}", {"json": body}
+
+
+def _squad_body(context: Context, **extra) -> Dict[str, Any]:
+    return {"players": [player.model_dump() for player in context.squad], **extra}
+
+
+# Request builders per route: context -> (method, url, httpx request keyword arguments)
+ROUTES: Dict[str, Callable[[Context], Tuple[str, str, Dict[str, Any]]]] = {
+    "GET /": lambda c: ("GET", "/", {}),
+    "GET /players/": lambda c: ("GET", "/players/", {}),
+    "POST /players/": lambda c: ("POST", "/players/", {"json": _player_body(c)}),
+    "POST /players/bulk": lambda c: ("POST", "/players/bulk", {
+        "json": [player.model_dump() for player in c.rng.sample(c.players, min(50, len(c.players)))]
+    }),
+    "PATCH /players/availability": lambda c: ("PATCH", "/players/availability", {
+        "json": [{"name": name, "available": c.rng.random() < 0.75} for name in c.rng.sample(c.names, 20)]
+    }),
+    "GET /players/export": lambda c: ("GET", "/players/export", {}),
+    "PUT /players/{name}": lambda c: _put_player(c),
+    "GET /players/{name}/stats": lambda c: ("GET", f"/players/{c.rng.choice(c.names)}/stats", {}),
+    "GET /stats/partnerships": lambda c: ("GET", "/stats/partnerships", {}),
+    "GET /ratings/": lambda c: ("GET", "/ratings/", {}),
+    "POST /teams/balance": lambda c: ("POST", "/teams/balance", {"json": _squad_body(c, strategy="exact")}),
+    "POST /teams/balance/top": lambda c: ("POST", "/teams/balance/top", {"json": _squad_body(c, k=5)}),
+    "POST /teams/balance/available": lambda c: ("POST", "/teams/balance/available", {
+        "json": {"names": [player.name for player in c.squad], "strategy": "exact"}
+    }),
+    "POST /teams/partition": lambda c: ("POST", "/teams/partition", {"json": _squad_body(c, num_teams=2)}),
+    "POST /teams/simulate": lambda c: ("POST", "/teams/simulate", {"json": {
+        "red_team": {"name": "Red", "players": [p.model_dump() for p in c.squad[::2]]},
+        "yellow_team": {"name": "Yellows", "players": [p.model_dump() for p in c.squad[1::2]]},
+        "simulations": 10000
+    }}),
+    "POST /games/": lambda c: ("POST", "/games/", {"json": _game_body(c)}),
+    "GET /games/": lambda c: ("GET", "/games/", {"params": {"limit": 100}}),
+    "GET /games/?player": lambda c: ("GET", "/games/", {"params": {"limit": 100, "player": c.rng.choice(c.names)}}),
+    "GET /games/export": lambda c: ("GET", "/games/export", {}),
+}
+
+
+def bind_app(context: Context):
+    """Build an app serving the generated database"""
+    from app import main as api
+    from app.settings import Settings
+    
+    return api.create_app(Settings(db_path=context.database.db_path, simulator_processes=1))
+
+
+async def _load_route(app, context: Context, build: Callable[[Context], Tuple[str, str, Dict[str, Any]]],
+                      requests: int) -> List[float]:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        issued = 0
+        
+        async def worker():
+            nonlocal issued
+            while issued < requests and time.perf_counter() - started < MAX_SECONDS:
+                issued += 1
+                method, url, kwargs = build(context)
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{method} {url} answered {response.status_code}: {response.text[:200]}")
+        
+        await asyncio.gather(*(worker() for _ in range(API_CONCURRENCY)))
+    return latencies
+
+
+def _summary(latencies: List[float], elapsed: Optional[float] = None) -> Dict[str, float]:
+    milliseconds = np.array(latencies) * 1000
+    summary = {
+        "median_ms": round(float(np.median(milliseconds)), 4),
+        "p95_ms": round(float(np.percentile(milliseconds, 95)), 4),
+        "runs": len(latencies),
+    }
+    if elapsed:
+        summary["requests_per_s"] = round(len(latencies) / elapsed, 1)
+    return summary
+
+
+def time_call(func: Callable[[], Any]) -> Dict[str, float]:
+    """Time a call repeatedly after one warm-up run"""
+    func()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MIN_RUNS or (time.perf_counter() - started < MIN_SECONDS and len(timings) < 10000):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if time.perf_counter() - started > MAX_SECONDS:
+            break
+    return _summary(timings)
+
+
+def run(scale_name: str, pattern: str = "*", seed: int = 0) -> Dict[str, Any]:
+    """
+    Run every benchmark whose name matches the pattern.
+    
+    Returns:
+        Document with the scale, the environment and a result per benchmark
+    """
+    scale = SCALES[scale_name]
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        context = Context(scale, directory, seed)
+        print(f"generated {scale.players} players and {scale.games} games in "
+              f"{time.perf_counter() - start:.1f}s", file=sys.stderr)
+        
+        for benchmark in BENCHMARKS:
+            if fnmatch.fnmatch(benchmark.name, pattern):
+                results[benchmark.name] = time_call(benchmark.setup(context))
+                _report(benchmark.name, results[benchmark.name])
+        
+        routes = [route for route in ROUTES if fnmatch.fnmatch(f"api.{route}", pattern)]
+        if routes:
+            app = bind_app(context)
+            for route in routes:
+                # One request first, so route compilation and cold caches stay out of the numbers
+                asyncio.run(_load_route(app, context, ROUTES[route], 1))
+                start = time.perf_counter()
+                latencies = asyncio.run(_load_route(app, context, ROUTES[route], API_REQUESTS))
+                results[f"api.{route}"] = _summary(latencies, time.perf_counter() - start)
+                _report(f"api.{route}", results[f"api.{route}"])
+            app.state.resources.close()
+        context.database.close()
+    
+    return {
+        "scale": scale_name,
+        "scale_parameters": scale._asdict(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers depend on besides the code"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "json_encoder": "orjson" if fast_json.orjson else "json",
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            metric: str = "median_ms") -> Tuple[List[Tuple[str, Optional[float], Optional[float], str]], int]:
+    """
+    Compare two runs benchmark by benchmark.
+    
+    Args:
+        baseline: Results document of the reference run
+        current: Results document of the run to check
+        threshold: Allowed relative slowdown, e.g. 0.25 for 25%
+        metric: Result field to compare
+    
+    Returns:
+        Rows of (name, baseline value, current value, status) and the number of regressions
+    """
+    rows = []
+    regressions = 0
+    old, new = baseline["results"], current["results"]
+    for name in sorted(set(old) | set(new)):
+        before = old.get(name, {}).get(metric)
+        after = new.get(name, {}).get(metric)
+        if before is None:
+            status = "new"
+        elif after is None:
+            status = "missing"
+        elif after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS:
+            status = "REGRESSED"
+            regressions += 1
+        elif after < before / (1 + threshold) and before - after > NOISE_FLOOR_MS:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, before, after, status))
+    return rows, regressions
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, metric: str) -> int:
+    """Print a comparison table and return the number of regressions"""
+    if baseline.get("scale") != current.get("scale"):
+        print(f"warning: comparing scale {current.get('scale')} against a {baseline.get('scale')} baseline")
+    if baseline.get("environment") != current.get("environment"):
+        print("warning: the baseline was recorded in a different environment:")
+        for key, value in baseline.get("environment", {}).items():
+            if current.get("environment", {}).get(key) != value:
+                print(f"  {key}: {value} -> {current.get('environment', {}).get(key)}")
+    
+    rows, regressions = compare(baseline, current, threshold, metric)
+    width = max(len(name) for name, *_ in rows) if rows else 10
+    print(f"{'benchmark':<{width}} {'baseline':>10} {'current':>10} {'change':>8}  ({metric})")
+    for name, before, after, status in rows:
+        change = f"{(after / before - 1) * 100:+.0f}%" if before and after is not None else ""
+        print(f"{name:<{width}} {_number(before):>10} {_number(after):>10} {change:>8}  {status}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def _number(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def _report(name: str, result: Dict[str, float]):
+    print(f"{name:<50} median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  "
+          f"runs {result['runs']}", file=sys.stderr)
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    run_parser.add_argument("--only", default="*", help="glob over benchmark names, e.g. 'api.*' or 'micro.database.*'")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="write the results document to this file")
+    run_parser.add_argument("--save", action="store_true", help="store the results as the baseline for the scale")
+    run_parser.add_argument("--compare", nargs="?", const="", metavar="BASELINE",
+                            help="compare against a results file, by default the stored baseline for the scale")
+    
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    
+    for command in (run_parser, compare_parser):
+        command.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help="allowed relative slowdown (default %(default)s)")
+        command.add_argument("--metric", choices=("median_ms", "p95_ms"), default="median_ms")
+    
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return 1 if print_comparison(_load(args.baseline), _load(args.current), args.threshold, args.metric) else 0
+    
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.scale}.json")
+    if args.compare is not None:
+        # Read it now, so a missing baseline fails before the benchmarks run
+        baseline = _load(args.compare or baseline_path)
+    results = run(args.scale, args.only, args.seed)
+    for path in filter(None, (args.output, baseline_path if args.save else None)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"wrote {path}", file=sys.stderr)
+    if args.compare is not None:
+        return 1 if print_comparison(baseline, results, args.threshold, args.metric) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
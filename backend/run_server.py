@@ -1,14 +1,53 @@
 #!/usr/bin/env python3
 """
 Startup script for the Football Team Selector API
+
+Development, reloading on code changes:
+    python run_server.py
+Production, one worker process per core:
+    python run_server.py --workers 4 [--db /var/lib/football/teams.db]
 """
+import argparse
+import os
 import uvicorn
 
-if __name__ == "__main__":
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Football Team Selector API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("FOOTBALL_WORKERS") or 1),
+                        help="Worker processes (default FOOTBALL_WORKERS or 1)")
+    parser.add_argument("--reload", action=argparse.BooleanOptionalAction, default=None,
+                        help="Restart on code changes (default on for a single worker)")
+    parser.add_argument("--db", help="Path to the SQLite database (default FOOTBALL_DB_PATH or football_teams.db)")
+    args = parser.parse_args(argv)
+    
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    reload = args.reload if args.reload is not None else args.workers == 1
+    if reload and args.workers > 1:
+        parser.error("--reload only works with a single worker")
+    
+    # Workers are started as fresh processes that import the app themselves,
+    # so settings reach them through the environment. Each opens its own
+    # database connections and loads its own in-memory state at startup.
+    os.environ["FOOTBALL_WORKERS"] = str(args.workers)
+    if args.db:
+        os.environ["FOOTBALL_DB_PATH"] = args.db
+    
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=reload,
+        # Event streams only end on their own after minutes; clients reconnect
+        # and catch up, so cut them off rather than delay restarts
+        timeout_graceful_shutdown=10,
         log_level="info"
-    ) 
\ No newline at end of file
+    )
+
+
+if __name__ == "__main__":
+    main()
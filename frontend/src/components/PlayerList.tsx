@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getPlayers, createPlayer, updatePlayer } from '../services/api';
+import { getPlayers, createPlayer, updatePlayer, subscribeToEvents } from '../services/api';
 
 const columnStyles = [
   { width: '25%' }, // Name
@@ -16,14 +16,30 @@ export const PlayerList: React.FC = () => {
   const [editForm, setEditForm] = useState({ name: '', attacking: 5, defending: 5, goalkeeping: 5, energy: 5 });
   const [loading, setLoading] = useState(false);
 
-  const fetchPlayers = async () => {
-    setLoading(true);
+  const refreshPlayers = async () => {
     const res = await getPlayers();
     setPlayers(res.data);
+  };
+
+  const fetchPlayers = async () => {
+    setLoading(true);
+    await refreshPlayers();
     setLoading(false);
   };
 
-  useEffect(() => { fetchPlayers(); }, []);
+  // Replace a player in place, or add a new one at the end as the server lists them
+  const upsertPlayer = (player: any) => {
+    setPlayers(ps => (ps.some(p => p.name === player.name)
+      ? ps.map(p => (p.name === player.name ? player : p))
+      : [...ps, player]));
+  };
+
+  useEffect(() => {
+    fetchPlayers();
+    // Changes from every organiser arrive as they are saved; the whole list
+    // is only refetched when the stream missed some
+    return subscribeToEvents({ player: upsertPlayer, resync: refreshPlayers });
+  }, []);
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const { name, value } = e.target;
@@ -37,7 +53,7 @@ export const PlayerList: React.FC = () => {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
-    await createPlayer({
+    const res = await createPlayer({
       name: form.name,
       attributes: {
         attacking: Number(form.attacking),
@@ -47,7 +63,7 @@ export const PlayerList: React.FC = () => {
       },
     });
     setForm({ name: '', attacking: 5, defending: 5, goalkeeping: 5, energy: 5 });
-    fetchPlayers();
+    upsertPlayer(res.data);
   };
 
   const startEditing = (player: any) => {
@@ -69,7 +85,7 @@ export const PlayerList: React.FC = () => {
   const handleSaveEdit = async () => {
     if (!editingPlayer) return;
     
-    await updatePlayer(editingPlayer, {
+    const res = await updatePlayer(editingPlayer, {
       name: editForm.name,
       attributes: {
         attacking: Number(editForm.attacking),
@@ -81,7 +97,7 @@ export const PlayerList: React.FC = () => {
     
     setEditingPlayer(null);
     setEditForm({ name: '', attacking: 5, defending: 5, goalkeeping: 5, energy: 5 });
-    fetchPlayers();
+    upsertPlayer(res.data);
   };
 
   return (
@@ -17,4 +17,27 @@ export const balanceTeams = (players: any[]) => api.post('/teams/balance', { pla
 
 // Game APIs
 export const recordGame = (game: any) => api.post('/games/', game);
-export const getGames = () => api.get('/games/'); 
\ No newline at end of file
+// GET /games/ returns one page of games at a time, oldest first, with an
+// X-Next-Cursor header while there are more; follow it for the whole history
+export const getGames = async () => {
+  const games: any[] = [];
+  let cursor: string | undefined;
+  do {
+    const res = await api.get('/games/', { params: { limit: 1000, cursor } });
+    games.push(...res.data);
+    cursor = res.headers['x-next-cursor'];
+  } while (cursor);
+  return { data: games };
+};
+
+// Live changes: 'player' (a saved player), 'balance' and 'game' events as
+// they happen, and 'resync' when some were missed and data should be
+// refetched. EventSource reconnects by itself and the server replays what
+// was missed meanwhile. Returns a function that closes the stream.
+export const subscribeToEvents = (handlers: Record<string, (data: any) => void>) => {
+  const source = new EventSource(`${API_BASE}/events`);
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, e => handler(JSON.parse((e as MessageEvent).data)));
+  });
+  return () => source.close();
+}; 
\ No newline at end of file